@@ -0,0 +1,87 @@
+"""
+Analytics fast path: intent checks and per-question latency.
+
+    python -m benchmarks.bench_analytics                    # data/ (shipped inbox)
+    python -m benchmarks.bench_analytics --data-dir inbox --repeat 200
+
+Extracts the inbox, builds a TxnTable and checks that every question in
+INTENT_CHECKS routes as expected: an aggregate op answered from the table,
+or None for questions left to RAG (open-ended ones, and money coming in,
+which the debit-only table cannot answer). Reports the median
+answer_aggregate time per question.
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+INTENT_CHECKS = [
+    ("total spent on transport in October 2025", "sum"),
+    ("how much did I pay for rent", "sum"),
+    ("how many uber rides by month", "count"),
+    ("average grocery bill per month", "avg"),
+    ("biggest purchase in September", "max"),
+    ("what did I spend the most on?", "sum"),
+    ("how much did I spend on my credit card", "sum"),
+    ("why is my food spending so high?", None),
+    ("How much did I get paid in salary?", None),
+    ("How much money came in this month?", None),
+    ("total refunds in October", None),
+    ("how much did I earn in 2025", None),
+    ("how many deposits in september", None),
+]
+
+def _table(data_dir: str):
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.cleaning_node import clean_text
+    from nodes.extraction_node import run_extract
+    from nodes.analytics_node import TxnTable
+
+    return TxnTable(run_extract(clean_text(run_ocr(read_inputs(data_dir)))).extracted)
+
+def run(data_dir: str = "data", repeat: int = 50) -> Dict[str, Any]:
+    from nodes.analytics_node import parse_intent, answer_aggregate
+
+    table = _table(data_dir)
+    res: Dict[str, Any] = {"rows": len(table), "failed": [], "ms_p50": {}}
+    for q, want in INTENT_CHECKS:
+        intent = parse_intent(q, table)
+        got = intent["op"] if intent else None
+        if got != want:
+            res["failed"].append({"query": q, "want": want, "got": got})
+
+        t = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            answer_aggregate(table, q)
+            t.append(time.perf_counter() - t0)
+        res["ms_p50"][q] = round(median(t) * 1000, 3)
+    res["intent_ok"] = not res["failed"]
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Analytics fast-path intent checks and latency.")
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.data_dir, args.repeat)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0 if res["intent_ok"] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
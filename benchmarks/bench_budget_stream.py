@@ -0,0 +1,96 @@
+"""
+Streaming budget alerts vs re-running run_budget.
+
+    python -m benchmarks.bench_budget_stream
+    python -m benchmarks.bench_budget_stream --rows 50000 --arrivals 200
+
+Extracts a synthetic inbox, then measures the cost of noticing a violation
+when one more transaction arrives: a full run_budget pass over every row so
+far, against one BudgetMonitor.ingest (with and without the persisted
+journal). Also checks that replaying all rows through the monitor gives
+run_budget's budget_results exactly, and that alerts fire on the row that
+crosses each limit.
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools.instrumentation import percentiles
+
+LIMITS = {"food": 150, "groceries": 300, "transport": 80, "entertainment": 40, "shopping": 200, "rent": 1500}
+
+def _us(values: List[float]) -> Dict[str, float]:
+    return {k: round(v * 1e6, 2) for k, v in percentiles(values, (50, 95)).items()}
+
+def run(rows: int = 20000, arrivals: int = 50, seed: int = 0) -> Dict[str, Any]:
+    from state.input_state import State
+    from tools.synth_data import generate_dataset
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.cleaning_node import clean_text
+    from nodes.extraction_node import run_extract
+    from nodes.budget_node import run_budget
+    from nodes.budget_alert_node import BudgetMonitor, replay
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_dataset(str(Path(tmp) / "inbox"), rows, seed=seed)
+        txns = run_extract(clean_text(run_ocr(read_inputs(str(Path(tmp) / "inbox"))))).extracted
+        base, tail = txns[:-arrivals], txns[-arrivals:]
+
+        full = []
+        for i in range(len(tail)):
+            s = State()
+            s.extracted = base + tail[:i + 1]
+            t0 = time.perf_counter()
+            run_budget(s, budget_cfg=LIMITS, use_llm=False)
+            full.append(time.perf_counter() - t0)
+
+        out = {"rows": len(txns), "arrivals": arrivals, "run_budget_us": _us(full)}
+        for name, path in (("monitor_us", None), ("monitor_persisted_us", str(Path(tmp) / "budget.json"))):
+            mon = BudgetMonitor(LIMITS, path=path)
+            mon.ingest_many(base)
+            inc = []
+            for t in tail:
+                t0 = time.perf_counter()
+                mon.ingest(t)
+                inc.append(time.perf_counter() - t0)
+            mon.close()
+            out[name] = _us(inc)
+
+        s = State()
+        s.extracted = txns
+        run_budget(s, budget_cfg=LIMITS, use_llm=False)
+        mon = BudgetMonitor(LIMITS)
+        alerts = mon.ingest_many(txns)
+        out["replay_identical"] = replay(txns, LIMITS).results() == s.budget_results
+        out["violations"] = len(s.budget_results["violations"])
+        out["alerts"] = len(alerts)
+        out["speedup_p50"] = round(out["run_budget_us"]["p50"] / max(out["monitor_us"]["p50"], 1e-3), 1)
+
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Streaming budget alert benchmark.")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--arrivals", type=int, default=50, help="transactions timed one at a time")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.rows, args.arrivals)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
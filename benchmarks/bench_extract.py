@@ -0,0 +1,133 @@
+"""
+Extraction golden-output check and throughput benchmark.
+
+    python -m benchmarks.bench_extract                # check golden, then time run_extract
+    python -m benchmarks.bench_extract --rows 100000  # larger throughput run
+    python -m benchmarks.bench_extract --workers 4    # same, through the process-pool path
+    python -m benchmarks.bench_extract --update       # re-record the golden file
+
+The golden file holds run_extract output for the shipped data/ samples plus a
+small seeded synthetic inbox (with a PDF), recorded from the original parser,
+so any rewrite of nodes/extraction_node.py must reproduce it row for row.
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from tools.synth_data import generate_dataset
+
+GOLDEN = Path(__file__).resolve().parent / "golden" / "extract_golden.json"
+GOLDEN_SEED = 11
+GOLDEN_ROWS = 400
+GOLDEN_PDF_ROWS = 120
+
+def _extract_dir(data_dir: str, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.extraction_node import run_extract
+
+    s = read_inputs(data_dir)
+    s.raw_files = sorted(f for f in s.raw_files if Path(f).suffix.lower() in (".txt", ".pdf"))
+    s = run_extract(run_ocr(s), workers=workers)
+    out = []
+    for r in s.extracted:
+        r = dict(r)
+        r["file"] = Path(r["file"]).name
+        out.append(r)
+
+    return out
+
+def golden_outputs(workers: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Current run_extract output for the golden inputs, with file paths reduced to names.
+    """
+
+    out = {"shipped": _extract_dir(str(ROOT / "data"), workers)}
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_dataset(tmp, GOLDEN_ROWS, seed=GOLDEN_SEED, pdf_rows=GOLDEN_PDF_ROWS)
+        out["synthetic"] = _extract_dir(tmp, workers)
+
+    return out
+
+def check_golden(workers: Optional[int] = None) -> List[str]:
+    """
+    Differences between current output and the golden file (empty when identical).
+    """
+
+    want = json.loads(GOLDEN.read_text(encoding="utf-8"))
+    got = json.loads(json.dumps(golden_outputs(workers)))
+    diffs = []
+    for name, rows in want.items():
+        cur = got.get(name, [])
+        if len(cur) != len(rows):
+            diffs.append(f"{name}: {len(cur)} rows, golden has {len(rows)}")
+        for i, (a, b) in enumerate(zip(cur, rows)):
+            if a != b:
+                diffs.append(f"{name}[{i}]: got {a} want {b}")
+
+    return diffs
+
+def throughput(rows: int, seed: int = 0, repeat: int = 3, workers: Optional[int] = None,
+               pdf_rows: int = 0) -> Dict[str, Any]:
+    """
+    Best-of-repeat run_extract throughput on an in-memory synthetic inbox.
+    """
+
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.extraction_node import run_extract
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_dataset(tmp, rows, seed=seed, pdf_rows=pdf_rows)
+        base = run_ocr(read_inputs(tmp))
+        best = None
+        n = 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            s = run_extract(base, workers=workers)
+            dt = time.perf_counter() - t0
+            n = s.extracted_count
+            best = dt if best is None else min(best, dt)
+
+    total = rows + pdf_rows
+    return {"rows": total, "workers": workers or 1, "extracted": n, "best_s": round(best, 4),
+            "rows_per_sec": round(total / best, 1)}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Extraction golden check and throughput.")
+    ap.add_argument("--update", action="store_true", help="re-record the golden file from the current parser")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--pdf-rows", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=None, help="run_extract process-pool size")
+    args = ap.parse_args(argv)
+
+    if args.update:
+        GOLDEN.parent.mkdir(parents=True, exist_ok=True)
+        GOLDEN.write_text(json.dumps(golden_outputs(), indent=1, ensure_ascii=False), encoding="utf-8")
+        print(f"wrote {GOLDEN}")
+        return 0
+
+    diffs = check_golden(args.workers)
+    if diffs:
+        print(f"golden: {len(diffs)} differences")
+        for d in diffs[:20]:
+            print(" ", d)
+        return 1
+    print("golden: ok")
+
+    print(json.dumps(throughput(args.rows, repeat=args.repeat, workers=args.workers, pdf_rows=args.pdf_rows)))
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+"""
+Import-time budget for the pipeline entry point.
+
+    python -m benchmarks.bench_import                  # check budgets, print slowest imports
+    python -m benchmarks.bench_import --budget-ms 150  # tighter import budget
+
+Runs `python -X importtime -c "import graph"` in a fresh interpreter and
+fails (exit 1) when the cumulative import time of graph exceeds the budget,
+when any heavy dependency is imported eagerly, or when `python graph.py
+--help` takes longer than the CLI budget.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Dependencies that must only load on first use.
+HEAVY = ["langgraph", "langchain_core", "openai", "sentence_transformers", "torch", "chromadb",
+         "pypdf", "jsonschema", "dotenv", "matplotlib", "numpy", "pyarrow"]
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+def _python(args: List[str], extra: Optional[List[str]] = None) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+
+    return subprocess.run([sys.executable] + (extra or []) + args, cwd=str(ROOT), env=env,
+                          capture_output=True, text=True)
+
+def import_profile(module: str = "graph") -> Dict[str, Any]:
+    """
+    Cumulative import time of module (us), its slowest top-level imports,
+    and which HEAVY packages it pulled in.
+    """
+
+    check = "import sys, json; import {m}; print(json.dumps(sorted(set(k.split('.')[0] for k in sys.modules))))"
+    proc = _python(["-c", check.format(m=module)], ["-X", "importtime"])
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    rows = []
+    total = None
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, cum_us, indent, name = int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)
+        if name == "site" and indent <= 1:
+            # interpreter startup, not part of the import being measured
+            rows = []
+            continue
+        rows.append((cum_us, self_us, indent, name))
+        if name == module and indent <= 1:
+            total = cum_us
+
+    loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+    top = sorted((r for r in rows if 1 < r[2] <= 3), reverse=True)[:10]
+
+    return {"module": module, "total_ms": round((total or 0) / 1000, 1),
+            "slowest": [{"name": n, "cum_ms": round(c / 1000, 1)} for c, _, _, n in top],
+            "heavy_loaded": [h for h in HEAVY if h in loaded]}
+
+def cli_startup(repeat: int = 3) -> float:
+    """
+    Best-of-repeat wall time (s) of `python graph.py --help`.
+    """
+
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = _python(["graph.py", "--help"])
+        dt = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip())
+        best = dt if best is None else min(best, dt)
+
+    return best
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Import-time budget for graph.py.")
+    ap.add_argument("--budget-ms", type=float, default=300.0, help="max cumulative import time of graph")
+    ap.add_argument("--cli-budget-s", type=float, default=1.0, help="max wall time of `python graph.py --help`")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    prof = import_profile("graph")
+    cli_s = cli_startup(args.repeat)
+    prof["cli_help_s"] = round(cli_s, 3)
+    print(json.dumps(prof, indent=1))
+
+    failures = []
+    if prof["total_ms"] > args.budget_ms:
+        failures.append(f"import graph took {prof['total_ms']} ms (budget {args.budget_ms} ms)")
+    if prof["heavy_loaded"]:
+        failures.append(f"import graph eagerly loaded: {', '.join(prof['heavy_loaded'])}")
+    if cli_s > args.cli_budget_s:
+        failures.append(f"graph.py --help took {cli_s:.3f} s (budget {args.cli_budget_s} s)")
+
+    for f in failures:
+        print("FAIL:", f)
+    if not failures:
+        print("import budget: ok")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
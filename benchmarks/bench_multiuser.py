@@ -0,0 +1,130 @@
+"""
+Multi-user pipeline throughput.
+
+    python -m benchmarks.bench_multiuser                    # 8 users x 400 rows
+    python -m benchmarks.bench_multiuser --users 16 --cpu-workers 4 --llm-latency 0.3
+
+Generates one synthetic inbox per user, then runs every user's pipeline
+(parse, embed with the hashing stub embeddings from bench_nodes, budget,
+and one question each, half aggregate and half answered by the mock
+streaming LLM) through PipelineService: once one user at a time, once all
+users concurrently. Reports wall time, users/s, rows/s and the service's
+per-stage run and queue latencies, and checks that tenant ids which share
+a prefix or a slug ("a" / "a__b", "alice@x.com" / "alice.x.com") never see
+each other's vectors.
+"""
+
+import sys
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools.synth_data import generate_dataset
+from benchmarks.bench_nodes import _patches
+
+QUESTIONS = ["total spent on food by month", "which amazon orders look unusual?"]
+
+def _jobs(root: Path, users: int, rows: int) -> List[Dict[str, Any]]:
+    jobs = []
+    for u in range(users):
+        inbox = root / f"user{u}"
+        generate_dataset(str(inbox), rows, seed=u)
+        jobs.append({"user_id": f"user{u}", "data_dir": str(inbox), "budget_cfg": {"food": 200.0},
+                     "query": QUESTIONS[u % len(QUESTIONS)]})
+
+    return jobs
+
+ISOLATION_TENANTS = ["a", "a__b", "a__b__2024-01", "alice@x.com", "alice.x.com"]
+
+def _isolation(persist_dir: str) -> bool:
+    """
+    One row per tenant under a shared file name: each tenant must count, query
+    and delete only its own row.
+    """
+
+    from nodes.vector_db_node import PartitionedStore
+
+    stores = {t: PartitionedStore(persist_dir, tenant=t) for t in ISOLATION_TENANTS}
+    for i, (t, st) in enumerate(stores.items()):
+        st.upsert([t], [[1.0, float(i)]], [t], [{"file": "shared.txt", "date": "2024-01-0%d" % (i + 1)}])
+
+    ok = all(st.partitions() == ["2024-01"] and st.count() == 1
+             and [r["id"] for r in st.query_by_embedding([1.0, 0.0], n_results=10)] == [t]
+             for t, st in stores.items())
+    first = stores[ISOLATION_TENANTS[0]]
+    first.delete_files(["shared.txt"])
+
+    return ok and first.count() == 0 and all(st.count() == 1 for t, st in stores.items() if st is not first)
+
+async def _serial(svc, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import time
+
+    t0 = time.perf_counter()
+    results = {j["user_id"]: await svc.run_user(**j) for j in jobs}
+
+    return svc.metrics(results, time.perf_counter() - t0)
+
+def run(users: int = 8, rows: int = 400, cpu_workers: Optional[int] = None, embed_slots: int = 1,
+        llm_slots: int = 4, llm_latency: float = 0.2) -> Dict[str, Any]:
+    from pipeline_service import PipelineService
+    from tools.mock_llm import MockAsyncChatClient
+
+    res: Dict[str, Any] = {"users": users, "rows_per_user": rows, "llm_latency_s": llm_latency}
+    keep = ("wall_s", "users_per_s", "rows_per_s", "failed", "slots", "utilisation")
+
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        _patches(stack)
+        jobs = _jobs(Path(tmp) / "inbox", users, rows)
+
+        for mode in ("serial", "concurrent"):
+            svc = PipelineService(persist_dir=str(Path(tmp) / f"store-{mode}"), cpu_workers=cpu_workers,
+                                  embed_slots=embed_slots, llm_slots=llm_slots,
+                                  llm_client=MockAsyncChatClient(latency_s=llm_latency, token_delay_s=0.005))
+            try:
+                if mode == "serial":
+                    m = asyncio.run(_serial(svc, jobs))
+                else:
+                    out = asyncio.run(svc.run_many(jobs))
+                    m = out["metrics"]
+                    res["routes"] = sorted({r["last_rag"].get("route") for r in out["results"].values() if r.get("ok")})
+                    res["tenants"] = len({r["tenant"] for r in out["results"].values() if r.get("ok")})
+                    res["stage_ms"] = {k: {"p50": v["p50"], "p95": v["p95"]} for k, v in m["stage_ms"].items()}
+                    res["queue_ms"] = {k: {"p50": v["p50"], "p95": v["p95"]} for k, v in m["queue_ms"].items()}
+            finally:
+                svc.close()
+            res[mode] = {k: m[k] for k in keep}
+
+        res["tenant_isolation"] = _isolation(str(Path(tmp) / "store-isolation"))
+
+    res["speedup"] = round(res["serial"]["wall_s"] / res["concurrent"]["wall_s"], 2)
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Multi-user async pipeline benchmark.")
+    ap.add_argument("--users", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=400, help="transactions per user")
+    ap.add_argument("--cpu-workers", type=int, default=None)
+    ap.add_argument("--embed-slots", type=int, default=1)
+    ap.add_argument("--llm-slots", type=int, default=4)
+    ap.add_argument("--llm-latency", type=float, default=0.2, help="mock LLM time to first token (s)")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.users, args.rows, args.cpu_workers, args.embed_slots, args.llm_slots, args.llm_latency)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+"""
+Per-node benchmark over synthetic inboxes of increasing size.
+
+    python -m benchmarks.bench_nodes --sizes 1000,10000,100000,1000000 --out benchmarks/baseline.json
+    python -m benchmarks.bench_nodes --sizes 10000 --compare benchmarks/baseline.json
+
+Embeddings use a deterministic hashing stub and the budget LLM calls go to a
+local mock, so numbers measure this code rather than model or network latency.
+"""
+
+import sys
+import json
+import math
+import time
+import hashlib
+import platform
+import tempfile
+from pathlib import Path
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools.synth_data import generate_dataset
+from tools.instrumentation import measure, count_items
+
+NODES = ["input", "ocr", "clean", "extract", "embed", "retrieve", "budget", "trend"]
+STUB_DIM = 64
+
+def stub_embeds(texts: List[str], model: str = None) -> List[List[float]]:
+    """
+    Deterministic bag-of-hashed-tokens embedding, normalised to unit length.
+    """
+
+    out = []
+    for t in texts:
+        v = [0.0] * STUB_DIM
+        for tok in str(t).lower().split():
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=4).digest(), "little")
+            v[h % STUB_DIM] += 1.0 if h & 1 else -1.0
+        n = math.sqrt(sum(x * x for x in v)) or 1.0
+        out.append([x / n for x in v])
+
+    return out
+
+def mock_llm(system_prompt: str, user_content: str, model: str = None) -> str:
+    """
+    Stand-in for tools.budget_llm_tool._call_llm_system.
+    """
+
+    try:
+        payload = json.loads(user_content)
+    except Exception:
+        payload = None
+
+    if isinstance(payload, list):
+        return json.dumps([{"vendor": v, "category": "other"} for v in payload])
+
+    return json.dumps({"answer": "Synthetic summary.", "recommendations": ["Spend less."]})
+
+def _patches(stack: ExitStack) -> None:
+    import tools.budget_llm_tool as llm
+
+    stack.enter_context(mock.patch.object(llm, "_client", lambda: object()))
+    stack.enter_context(mock.patch.object(llm, "_call_llm_system", mock_llm))
+    stack.enter_context(mock.patch.object(llm, "_load_cache", lambda: {}))
+    stack.enter_context(mock.patch.object(llm, "_save_cache", lambda d: None))
+
+    import nodes.embedding_node as emb
+    import nodes.retrieval_node as ret
+
+    stack.enter_context(mock.patch.object(emb, "_sbert_embeds", stub_embeds))
+    stack.enter_context(mock.patch.object(ret, "_sbert_embeds", stub_embeds))
+
+def bench_size(n: int, nodes: List[str], seed: int = 0, pdf_rows: int = 0) -> Dict[str, Any]:
+    """
+    Generate an n-row inbox and time each selected node once, in pipeline order.
+    """
+
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.cleaning_node import clean_text
+    from nodes.extraction_node import run_extract
+    from nodes.budget_node import run_budget
+    from nodes.trend_node import build_trends
+
+    res: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        _patches(stack)
+        data_dir = Path(tmp) / "inbox"
+        store_dir = str(Path(tmp) / "vectorstore")
+
+        t0 = time.perf_counter()
+        generate_dataset(str(data_dir), n, seed=seed, pdf_rows=pdf_rows)
+        res["_generate_s"] = round(time.perf_counter() - t0, 3)
+
+        # Upstream nodes always run (their output feeds the rest) but are only recorded if selected.
+        with measure("input") as m:
+            s = read_inputs(str(data_dir))
+            m["items_out"] = count_items(s.raw_files)
+        res["input"] = m
+
+        with measure("ocr") as m:
+            m["items_in"] = count_items(s.raw_files)
+            s = run_ocr(s)
+            m["items_out"] = sum((v or "").count("\n") for v in s.ocr_output.values())
+        res["ocr"] = m
+
+        with measure("clean") as m:
+            m["items_in"] = count_items(s.ocr_output)
+            s = clean_text(s)
+            m["items_out"] = count_items(s.clean_records)
+        res["clean"] = m
+
+        with measure("extract") as m:
+            m["items_in"] = count_items(s.clean_records)
+            s = run_extract(s)
+            m["items_out"] = count_items(s.extracted)
+        res["extract"] = m
+
+        if "embed" in nodes or "retrieve" in nodes:
+            try:
+                from nodes.embedding_node import run_embeddings
+                from nodes.retrieval_node import run_retrieval
+                from nodes.vector_db_node import VectorStore
+
+                # chromadb is imported on first use; fail here rather than inside the timing.
+                VectorStore(persist_dir=store_dir)
+            except ImportError as e:
+                res["embed"] = res["retrieve"] = {"skipped": str(e)}
+            else:
+                with measure("embed") as m:
+                    m["items_in"] = count_items(s.extracted)
+                    s = run_embeddings(s, persist_dir=store_dir, batch_size=1024)
+                    m["items_out"] = count_items(s.embedded_count)
+                res["embed"] = m
+
+                with measure("retrieve") as m:
+                    for q in ("pizza", "rent payment", "uber ride", "netflix subscription", "grocery order"):
+                        hits = run_retrieval(s, q, top_k=10, persist_dir=store_dir)
+                        m["items_in"] += 1
+                        m["items_out"] += len(hits)
+                res["retrieve"] = m
+
+        with measure("budget") as m:
+            m["items_in"] = count_items(s.extracted)
+            s = run_budget(s, budget_cfg={"food": 100.0, "groceries": 300.0}, use_llm=True)
+            m["items_out"] = count_items(s.budget_results.get("count_indexed_txns"))
+        res["budget"] = m
+
+        with measure("trend") as m:
+            m["items_in"] = count_items(s.extracted)
+            s = build_trends(s)
+            m["items_out"] = count_items(s.trend_data.get("months"))
+        res["trend"] = m
+
+    keep = {"_generate_s"} | set(nodes)
+    out = {}
+    for k, v in res.items():
+        if k not in keep:
+            continue
+        out[k] = {f: v.get(f) for f in ("wall_s", "cpu_s", "items_in", "items_out", "rows_per_sec", "skipped") if v.get(f) is not None} if isinstance(v, dict) else v
+
+    return out
+
+def compare(cur: Dict[str, Any], base: Dict[str, Any]) -> List[str]:
+    """
+    Lines describing wall-time change per (size, node) against a baseline file.
+    """
+
+    lines = []
+    for size, nodes in cur.get("results", {}).items():
+        bnodes = base.get("results", {}).get(size, {})
+        for node, m in nodes.items():
+            b = bnodes.get(node)
+            if not isinstance(m, dict) or not isinstance(b, dict) or not b.get("wall_s") or "wall_s" not in m:
+                continue
+            ratio = m["wall_s"] / b["wall_s"]
+            lines.append(f"{size:>8} {node:<9} {b['wall_s']:>9.4f}s -> {m['wall_s']:>9.4f}s  x{ratio:.2f}")
+
+    return lines
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Benchmark pipeline nodes on synthetic data.")
+    ap.add_argument("--sizes", default="1000,10000,100000,1000000")
+    ap.add_argument("--nodes", default=",".join(NODES), help=f"comma-separated subset of {NODES}")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--pdf-rows", type=int, default=0)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    ap.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    args = ap.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    nodes = [x.strip() for x in args.nodes.split(",") if x.strip()]
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "pdf_rows": args.pdf_rows,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+
+    for n in sizes:
+        r = bench_size(n, nodes, seed=args.seed, pdf_rows=args.pdf_rows)
+        report["results"][str(n)] = r
+        for node in nodes:
+            m = r.get(node)
+            if isinstance(m, dict) and "wall_s" in m:
+                print(f"{n:>8} {node:<9} {m['wall_s']:>9.4f}s  {m.get('rows_per_sec') or 0:>12.1f} rows/s")
+            elif isinstance(m, dict):
+                print(f"{n:>8} {node:<9} skipped: {m.get('skipped')}")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"wrote {args.out}")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        for ln in compare(report, base):
+            print(ln)
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""
+Recurring-payment detection at scale.
+
+    python -m benchmarks.bench_recurring
+    python -m benchmarks.bench_recurring --rows 100000 1000000 --subs 2000
+
+Builds transaction rows in memory: `subs` planted recurring payments
+(weekly / biweekly / monthly / quarterly / yearly, with a few days of
+jitter, an occasional skipped payment and small amount drift) mixed into
+one-off purchases and a biweekly payroll credit (which must not be
+reported), then times detect_recurring and reports recall and
+precision against the planted set.
+"""
+
+import sys
+import json
+import time
+import random
+import datetime as dt
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+_WORDS = ["NORTH", "CITY", "PRIME", "BLUE", "RIVER", "STAR", "METRO", "GOLD", "OAK", "SUN", "CLOUD", "PEAK"]
+_KINDS = ["STREAMING", "GYM", "INSURANCE", "CLOUD", "RENT", "PHONE", "NEWS", "MUSIC", "STORAGE", "CLUB"]
+_PERIODS = [("weekly", 7), ("biweekly", 14), ("monthly", 0), ("quarterly", 0), ("yearly", 0)]
+
+def _add_months(d: dt.date, n: int) -> dt.date:
+    y, m = divmod(d.month - 1 + n, 12)
+
+    return dt.date(d.year + y, m + 1, min(d.day, 28))
+
+def synth_rows(rows: int, subs: int, years: int = 2, seed: int = 0) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    """
+    (rows, planted vendor names); one-off rows fill up to `rows`.
+    """
+
+    rng = random.Random(seed)
+    start = dt.date(2023, 1, 1)
+    span = 365 * years
+    out: List[Dict[str, Any]] = []
+    planted = set()
+
+    for i in range(subs):
+        vendor = f"{rng.choice(_WORDS)} {rng.choice(_KINDS)} {i}X"
+        planted.add(vendor)
+        period, days = rng.choice(_PERIODS)
+        amount = round(rng.uniform(5, 1500), 2)
+        d0 = start + dt.timedelta(days=rng.randrange(30))
+        k = 0
+        while True:
+            if period in ("monthly", "quarterly", "yearly"):
+                d = _add_months(d0, k * {"monthly": 1, "quarterly": 3, "yearly": 12}[period])
+            else:
+                d = d0 + dt.timedelta(days=k * days)
+            k += 1
+            if (d - start).days >= span:
+                break
+            if rng.random() < 0.05:
+                continue  # skipped payment
+            jitter = rng.randint(-1, 1) if period in ("weekly", "biweekly") else rng.randint(-3, 3)
+            out.append({"date": (d + dt.timedelta(days=jitter)).isoformat(), "vendor": vendor,
+                        "amount": round(amount * rng.uniform(0.98, 1.02), 2), "source": "bank"})
+
+    for k in range(0, span, 14):
+        out.append({"date": (start + dt.timedelta(days=k)).isoformat(), "vendor": "EMPLOYER PAYROLL",
+                    "amount": 2500.0, "source": "bank", "credit": True})
+
+    shops = [f"{rng.choice(_WORDS)} SHOP {j}" for j in range(max(50, rows // 200))]
+    while len(out) < rows:
+        out.append({"date": (start + dt.timedelta(days=rng.randrange(span))).isoformat(),
+                    "vendor": f"{rng.choice(shops)} #{rng.randrange(1000)}",
+                    "amount": round(rng.uniform(1, 300), 2), "source": "bank"})
+    rng.shuffle(out)
+
+    return out, planted
+
+def run(sizes: List[int], subs: int = 1000, seed: int = 0) -> Dict[str, Any]:
+    from nodes.recurring_node import detect_recurring
+
+    res: Dict[str, Any] = {"subs": subs, "runs": []}
+    for n in sizes:
+        rows, planted = synth_rows(n, subs, seed=seed)
+        t0 = time.perf_counter()
+        out = detect_recurring(rows)
+        dt_s = time.perf_counter() - t0
+        found = {r["vendor"] for r in out["subscriptions"]}
+        res["runs"].append({
+            "rows": len(rows),
+            "detect_s": round(dt_s, 3),
+            "rows_per_s": round(len(rows) / dt_s),
+            "detected": out["count"],
+            "recall": round(len(found & planted) / len(planted), 4),
+            "precision": round(len(found & planted) / max(1, len(found)), 4),
+        })
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Recurring-payment detection benchmark.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    ap.add_argument("--subs", type=int, default=1000, help="planted recurring payments")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.rows, args.subs)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""
+Retrieval quality and latency: plain vector top-k vs the two-stage cascade.
+
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --rows 5000 --candidates 60 --top-k 6
+
+Indexes a synthetic inbox (hashing stub embeddings from bench_nodes unless
+--real-embeddings) and asks QUERIES, each with the vendor strings that make
+a row relevant. For every strategy it reports precision (share of the
+rows handed to the LLM that are relevant), the packed context size in
+tokens, and p50/p95 latency per stage. vector@wide_k is the "just raise
+top_k" baseline the cascade replaces.
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools.instrumentation import percentiles
+from benchmarks.bench_nodes import _patches
+from benchmarks.bench_service import _build_store
+
+# (question, substrings of vendor/desc that mark a relevant row)
+QUERIES: List[Tuple[str, List[str]]] = [
+    ("netflix subscription charges", ["netflix"]),
+    ("pizza dinners", ["pizza"]),
+    ("uber eats food delivery", ["uber eats", "ubereats"]),
+    ("pharmacy purchases at cvs", ["cvs"]),
+    ("gas station fill ups", ["shell"]),
+    ("rent paid to the landlord", ["landlord"]),
+    ("coffee at starbucks", ["starbucks"]),
+    ("flights with delta airlines", ["delta"]),
+    ("spotify premium", ["spotify"]),
+    ("concert tickets", ["ticketmaster"]),
+    ("lyft rides", ["lyft"]),
+    ("groceries from trader joes", ["trader jo"]),
+]
+
+def _relevant(r: Dict[str, Any], keys: List[str]) -> bool:
+    meta = r.get("meta") or {}
+    text = f"{meta.get('vendor') or ''} {meta.get('desc') or ''}".lower()
+
+    return any(k in text for k in keys)
+
+def _strategies(top_k: int, candidates: int, wide_k: int) -> Dict[str, Dict[str, Any]]:
+    return {
+        f"vector@{top_k}": {"top_k": top_k},
+        f"vector@{wide_k}": {"top_k": wide_k},
+        f"cascade {candidates}->{top_k} lexical": {"top_k": top_k, "candidates": candidates, "rerank_method": "lexical"},
+        f"cascade {candidates}->{top_k} auto": {"top_k": top_k, "candidates": candidates, "rerank_method": "auto"},
+    }
+
+def evaluate(vs, top_k: int = 6, candidates: int = 40, wide_k: int = 20, repeats: int = 3) -> Dict[str, Any]:
+    from state.input_state import State
+    from nodes.retrieval_node import run_retrieval, embed_query
+    from tools.context_packer import pack_context
+
+    embs = {q: embed_query(q) for q, _ in QUERIES}
+    out = {}
+    for name, kw in _strategies(top_k, candidates, wide_k).items():
+        prec, tokens, total, vec, rr = [], [], [], [], []
+        method = None
+        for _ in range(repeats):
+            for q, keys in QUERIES:
+                s = State()
+                t0 = time.perf_counter()
+                res = run_retrieval(s, q, vs=vs, emb=embs[q], **kw)
+                total.append(time.perf_counter() - t0)
+                cas = s.last_query.get("cascade")
+                if cas:
+                    vec.append(cas["vector_ms"] / 1000)
+                    rr.append(cas["rerank"].get("ms", 0.0) / 1000)
+                    method = cas["rerank"].get("method")
+                prec.append(sum(_relevant(r, keys) for r in res) / max(1, len(res)))
+                tokens.append(pack_context(res, token_budget=10 ** 6)[1]["used"])
+
+        row = {
+            "precision": round(sum(prec) / len(prec), 3),
+            "context_tokens": round(sum(tokens) / len(tokens), 1),
+            "total_ms": {k: round(v * 1000, 3) for k, v in percentiles(total, (50, 95)).items()},
+        }
+        if vec:
+            row["vector_ms"] = {k: round(v * 1000, 3) for k, v in percentiles(vec, (50, 95)).items()}
+            row["rerank_ms"] = {k: round(v * 1000, 3) for k, v in percentiles(rr, (50, 95)).items()}
+            row["rerank_method"] = method
+        out[name] = row
+
+    return out
+
+def run(rows: int = 3000, top_k: int = 6, candidates: int = 40, wide_k: int = 20, seed: int = 0,
+        real_embeddings: bool = False) -> Dict[str, Any]:
+    from nodes.vector_db_node import VectorStore
+
+    res: Dict[str, Any] = {"rows": rows, "queries": len(QUERIES), "embeddings": "sbert" if real_embeddings else "stub"}
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        if not real_embeddings:
+            _patches(stack)
+        paths = _build_store(rows, tmp, seed)
+        vs = VectorStore(persist_dir=paths["store"])
+        res["strategies"] = evaluate(vs, top_k, candidates, wide_k)
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Vector vs cascade retrieval benchmark.")
+    ap.add_argument("--rows", type=int, default=3000)
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--candidates", type=int, default=40)
+    ap.add_argument("--wide-k", type=int, default=20, help="top_k of the plain vector baseline")
+    ap.add_argument("--real-embeddings", action="store_true", help="use the SentenceTransformer model")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.rows, args.top_k, args.candidates, args.wide_k, real_embeddings=args.real_embeddings)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+"""
+Load test for the query service against a mock LLM.
+
+    python -m benchmarks.bench_service                          # TCP, 200 requests per endpoint
+    python -m benchmarks.bench_service --socket --concurrency 16
+    python -m benchmarks.bench_service --mock-latency 0.05      # simulate LLM latency
+
+Indexes a synthetic inbox with the hashing stub embeddings from bench_nodes,
+starts query_service in-process, fires concurrent requests at /retrieve,
+/rag and /budget, and reports client-side p50/p95/p99 alongside the
+service's own /stats. "rag_cached" repeats the /rag load with the answer
+cache enabled (the query set repeats, so most requests hit). A "cold" row times run_rag opening a fresh vector
+store and client per call, as a one-shot invocation would.
+"""
+
+import sys
+import json
+import time
+import socket
+import tempfile
+import threading
+import http.client
+from pathlib import Path
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools.synth_data import generate_dataset
+from tools.instrumentation import percentiles
+from benchmarks.bench_nodes import _patches
+
+QUERIES = ["pizza", "rent payment", "uber ride", "netflix subscription", "grocery order",
+           "how much did I spend on food", "amazon orders", "electricity bill"]
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+def _connect(addr) -> http.client.HTTPConnection:
+    if isinstance(addr, str):
+        return _UnixHTTPConnection(addr)
+
+    return http.client.HTTPConnection(addr[0], addr[1])
+
+def _build_store(rows: int, tmp: str, seed: int) -> Dict[str, str]:
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.cleaning_node import clean_text
+    from nodes.extraction_node import run_extract
+    from nodes.dedup_node import run_dedup
+    from nodes.embedding_node import run_embeddings
+
+    inbox = str(Path(tmp) / "inbox")
+    store = str(Path(tmp) / "vectorstore")
+    generate_dataset(inbox, rows, seed=seed)
+    s = run_dedup(run_extract(clean_text(run_ocr(read_inputs(inbox)))))
+    run_embeddings(s, persist_dir=store, batch_size=1024)
+
+    return {"inbox": inbox, "store": store}
+
+def _load(addr, endpoint: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Send requests POSTs to endpoint from concurrency threads, each on its own
+    keep-alive connection. Returns client-side latency percentiles in ms.
+    """
+
+    lat: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        conn = _connect(addr)
+        mine = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+
+            body = {"budget_cfg": {"food": 200.0}} if endpoint == "budget" else {"query": QUERIES[i % len(QUERIES)]}
+            t0 = time.perf_counter()
+            conn.request("POST", f"/{endpoint}", body=json.dumps(body), headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            mine.append(time.perf_counter() - t0)
+            if resp.status != 200:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            lat.extend(mine)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    ms = [x * 1000 for x in lat]
+    out = {k: round(v, 3) for k, v in percentiles(ms).items()}
+
+    return dict(requests=len(ms), errors=errors[0], rps=round(len(ms) / wall, 1), **out)
+
+def _cold_rag(store: str, n: int) -> Dict[str, Any]:
+    """
+    run_rag with a new vector store handle and client on every call.
+    """
+
+    from state.input_state import State
+    from nodes.rag_node import run_rag
+    from nodes.vector_db_node import VectorStore
+    from tools.mock_llm import MockChatClient
+
+    ms = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        vs = VectorStore(persist_dir=store)
+        run_rag(State(), QUERIES[i % len(QUERIES)], vs=vs, client=MockChatClient())
+        ms.append((time.perf_counter() - t0) * 1000)
+
+    return dict(requests=n, **{k: round(v, 3) for k, v in percentiles(ms).items()})
+
+def run(rows: int = 2000, requests: int = 200, concurrency: int = 8, use_socket: bool = False,
+        mock_latency: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+    from query_service import QueryService, make_server
+    from tools.mock_llm import MockChatClient
+    from tools.answer_cache import AnswerCache
+
+    res: Dict[str, Any] = {"rows": rows, "requests": requests, "concurrency": concurrency,
+                           "transport": "unix" if use_socket else "tcp", "mock_latency_s": mock_latency}
+
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        _patches(stack)
+        paths = _build_store(rows, tmp, seed)
+
+        service = QueryService(persist_dir=paths["store"], data_dir=paths["inbox"],
+                               llm_client=MockChatClient(latency_s=mock_latency), max_concurrency=concurrency)
+        res["warm"] = service.warm()
+
+        sock_path = str(Path(tmp) / "svc.sock") if use_socket else None
+        srv = make_server(service, port=0, socket_path=sock_path)
+        th = threading.Thread(target=srv.serve_forever, daemon=True)
+        th.start()
+        addr = sock_path or srv.server_address[:2]
+
+        try:
+            res["client_ms"] = {ep: _load(addr, ep, requests, concurrency) for ep in ("retrieve", "rag", "budget")}
+            res["server"] = service.stats()["latency_ms"]
+
+            service.cache = AnswerCache(str(Path(tmp) / "answers.sqlite"))
+            res["client_ms"]["rag_cached"] = _load(addr, "rag", requests, concurrency)
+            res["answer_cache"] = service.cache.stats()
+        finally:
+            srv.shutdown()
+            srv.server_close()
+
+        res["cold_rag_ms"] = _cold_rag(paths["store"], min(requests, 20))
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Query service load test (mock LLM).")
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--socket", action="store_true", help="serve on a Unix socket instead of TCP")
+    ap.add_argument("--mock-latency", type=float, default=0.0)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.rows, args.requests, args.concurrency, args.socket, args.mock_latency)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
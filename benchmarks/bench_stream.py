@@ -0,0 +1,148 @@
+"""
+Streaming RAG against a mock streaming LLM.
+
+    python -m benchmarks.bench_stream
+    python -m benchmarks.bench_stream --concurrency 32 --latency 0.3 --token-delay 0.02
+
+Indexes a synthetic inbox with the hashing stub embeddings from bench_nodes,
+then compares blocking run_rag (the answer is visible only when complete)
+with arun_rag streaming on one event loop: time to first answer token,
+time to full answer, and wall time for `concurrency` questions at once.
+Also checks that cancelling mid-stream and hitting the timeout both close
+the LLM stream.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools.instrumentation import percentiles
+from benchmarks.bench_nodes import _patches, stub_embeds
+from benchmarks.bench_service import QUERIES, _build_store
+
+def _ms(values: List[float]) -> Dict[str, float]:
+    return {k: round(v * 1000, 1) for k, v in percentiles(values).items()}
+
+def _blocking(vs, n: int, latency: float, token_delay: float) -> Dict[str, Any]:
+    """
+    run_rag with a client that returns the whole reply after the same total delay.
+    """
+
+    from state.input_state import State
+    from nodes.rag_node import run_rag
+    from tools.mock_llm import MockChatClient
+
+    reply_chunks = 40
+    client = MockChatClient(latency_s=latency + token_delay * reply_chunks)
+    t = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        run_rag(State(), QUERIES[i % len(QUERIES)], vs=vs, client=client)
+        t.append(time.perf_counter() - t0)
+
+    return {"first_token_ms": _ms(t), "total_ms": _ms(t)}
+
+async def _streaming(vs, concurrency: int, latency: float, token_delay: float) -> Dict[str, Any]:
+    from state.input_state import State
+    from nodes.rag_node import arun_rag
+    from tools.mock_llm import MockAsyncChatClient
+
+    client = MockAsyncChatClient(latency_s=latency, token_delay_s=token_delay)
+    first: List[float] = []
+    total: List[float] = []
+    answers = []
+
+    async def one(i: int):
+        t0 = time.perf_counter()
+        seen = []
+
+        def on_token(delta: str):
+            if not seen:
+                first.append(time.perf_counter() - t0)
+            seen.append(delta)
+
+        res = await arun_rag(State(), QUERIES[i % len(QUERIES)], vs=vs, client=client, on_token=on_token)
+        total.append(time.perf_counter() - t0)
+        answers.append(("".join(seen), res["answer"]))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    return {"first_token_ms": _ms(first), "total_ms": _ms(total), "wall_s": round(wall, 3),
+            "streamed_matches_answer": all(a == b for a, b in answers)}
+
+async def _cancel_and_timeout(vs, latency: float, token_delay: float) -> Dict[str, Any]:
+    from state.input_state import State
+    from nodes.rag_node import arun_rag
+    from tools.mock_llm import MockAsyncChatClient
+
+    client = MockAsyncChatClient(latency_s=latency, token_delay_s=max(token_delay, 0.01))
+    got_token = asyncio.Event()
+    task = asyncio.create_task(arun_rag(State(), "rent payment", vs=vs, client=client,
+                                        on_token=lambda d: got_token.set()))
+    await got_token.wait()
+    task.cancel()
+    try:
+        await task
+        cancelled = False
+    except asyncio.CancelledError:
+        cancelled = True
+    stream = client.streams[-1]
+    out = {"cancelled": cancelled, "cancel_closed_stream": stream.closed, "chunks_before_cancel": stream.sent}
+
+    try:
+        await arun_rag(State(), "rent payment", vs=vs, client=client, timeout=latency + 0.05)
+        out["timed_out"] = False
+    except asyncio.TimeoutError:
+        out["timed_out"] = True
+    out["timeout_closed_stream"] = client.streams[-1].closed
+
+    return out
+
+def run(rows: int = 1000, concurrency: int = 16, latency: float = 0.2, token_delay: float = 0.01,
+        seed: int = 0) -> Dict[str, Any]:
+    from nodes.vector_db_node import VectorStore
+
+    res: Dict[str, Any] = {"rows": rows, "concurrency": concurrency, "latency_s": latency, "token_delay_s": token_delay}
+
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        _patches(stack)
+        paths = _build_store(rows, tmp, seed)
+        vs = VectorStore(persist_dir=paths["store"])
+        vs.query_by_embedding(stub_embeds(["warm-up"])[0], n_results=1)
+
+        res["blocking"] = _blocking(vs, min(concurrency, 8), latency, token_delay)
+        res["streaming"] = asyncio.run(_streaming(vs, concurrency, latency, token_delay))
+        res["cancellation"] = asyncio.run(_cancel_and_timeout(vs, latency, token_delay))
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Streaming RAG benchmark (mock LLM).")
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--latency", type=float, default=0.2, help="mock time to first token (s)")
+    ap.add_argument("--token-delay", type=float, default=0.01, help="mock delay between chunks (s)")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.rows, args.concurrency, args.latency, args.token_delay)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
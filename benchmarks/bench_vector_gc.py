@@ -0,0 +1,115 @@
+"""
+Vector store garbage collection after dedup drops rows of an unchanged file.
+
+    python -m benchmarks.bench_vector_gc                     # data/sms.txt + data/bank.txt
+    python -m benchmarks.bench_vector_gc --data-dir inbox --partition-by-month
+
+Embeds the SMS file alone, then adds the bank file, dedups (which merges SMS
+alerts into their bank rows) and embeds only the new file, the way an
+incremental run does. "stable" keys rows by their txn_id and syncs the
+unchanged file; "legacy" strips txn_id first, so rows are numbered by their
+position after dedup (the pre-txn_id behaviour) and the SMS vectors end up
+under IDs that now name other rows. run_vector_gc then runs on each store
+and the check reads back every stored document: the store must hold exactly
+one vector per row, under its ID and with its text. Embeddings use the
+hashing stub from bench_nodes.
+"""
+
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.bench_nodes import _patches
+
+def _extract(data_dir: str):
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.cleaning_node import clean_text
+    from nodes.extraction_node import run_extract
+
+    return run_extract(clean_text(run_ocr(read_inputs(data_dir))))
+
+def _legacy(s) -> None:
+    s.extracted = [{k: v for k, v in t.items() if k != "txn_id"} for t in s.extracted]
+
+def _stored_docs(vs) -> Dict[str, str]:
+    out = {}
+    for _, col in vs._collections():
+        got = col.get(include=["documents"])
+        out.update(zip(got["ids"], got["documents"]))
+
+    return out
+
+def run_mode(mode: str, data_dir: Path, tmp: Path, partition_by_month: bool = False) -> Dict[str, Any]:
+    from nodes.dedup_node import run_dedup
+    from nodes.embedding_node import run_embeddings, run_vector_gc, _numbered, _text_for_embed
+    from nodes.vector_db_node import open_store
+
+    inbox = tmp / f"inbox-{mode}"
+    inbox.mkdir()
+    store = str(tmp / f"store-{mode}")
+    part = {"persist_dir": store, "tenant": "bench" if partition_by_month else None,
+            "partition_by_month": partition_by_month}
+
+    shutil.copy(data_dir / "sms.txt", inbox)
+    s = _extract(str(inbox))
+    if mode == "legacy":
+        _legacy(s)
+    run_embeddings(s, **part)
+    old = sorted({t.get("file") for t in s.extracted})
+
+    shutil.copy(data_dir / "bank.txt", inbox)
+    s = _extract(str(inbox))
+    rows = len(s.extracted)
+    run_dedup(s)
+    if mode == "legacy":
+        _legacy(s)
+    new = sorted({t.get("file") for t in s.extracted} - set(old))
+    run_embeddings(s, only_files=new, sync_files=old if mode == "stable" else None, **part)
+
+    run_vector_gc(s, **part)
+    gc = s.vector_gc
+
+    # Compaction swaps the collections, so read them back through a fresh handle.
+    vs = open_store(store, "transactions", tenant=part["tenant"], partition_by_month=partition_by_month)
+    want = {tid: _text_for_embed(t) for tid, t in _numbered(s.extracted)}
+    got = _stored_docs(vs)
+
+    return {"rows": rows, "deduped": len(s.extracted), "vectors_before_gc": gc["before"]["vectors"],
+            "gc": {k: gc[k] for k in ("deleted", "stale", "reembedded", "before", "after")},
+            "content_ok": got == want}
+
+def run(data_dir: str = "data", partition_by_month: bool = False) -> Dict[str, Any]:
+    res: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        _patches(stack)
+        for mode in ("stable", "legacy"):
+            res[mode] = run_mode(mode, Path(data_dir), Path(tmp), partition_by_month)
+
+    return res
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Vector GC benchmark and content check.")
+    ap.add_argument("--data-dir", default="data", help="directory holding sms.txt and bank.txt")
+    ap.add_argument("--partition-by-month", action="store_true")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    res = run(args.data_dir, args.partition_by_month)
+    txt = json.dumps(res, indent=1)
+    print(txt)
+    if args.out:
+        Path(args.out).write_text(txt, encoding="utf-8")
+
+    return 0 if all(r["content_ok"] for r in res.values()) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,9 @@
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from functools import lru_cache
 import os
-from langgraph.graph import StateGraph, END
+
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
 
 try:
     from state.graph_state import GraphState, initialize_state as initialize_graph_state
@@ -15,127 +18,588 @@ from nodes.input_node import read_inputs
 from nodes.ocr_node import run_ocr
 from nodes.cleaning_node import clean_text
 from nodes.extraction_node import run_extract
-from nodes.embedding_node import run_embeddings
-from nodes.retrieval_node import run_retrieval
-from nodes.rag_node import run_rag
 from nodes.budget_node import run_budget
 from nodes.trend_node import build_trends
-from nodes.chart_node import make_charts
 
-def build_graph() -> StateGraph:
+from tools.checkpoint_store import CheckpointStore, input_hash, file_fingerprint
+from tools.instrumentation import measure, count_items, write_chrome_trace
+from tools.ingest_manifest import IngestManifest
+from tools.lazy_import import load_env
+
+# langgraph is imported by build_graph and the embedding, retrieval, rag and
+# chart nodes inside the steps that use them; heavier dependencies (openai,
+# sentence-transformers, chromadb, pypdf, jsonschema, matplotlib) load on
+# first use inside the nodes. `python graph.py --help` imports none of them
+# (benchmarks/bench_import.py keeps it that way).
+
+class _StateView:
+    """
+    Attribute view over a graph state dict so State-style nodes can run inside the graph.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        object.__setattr__(self, "_data", dict(data))
+        object.__setattr__(self, "_dirty", set())
+
+    def __getattr__(self, k):
+        try:
+            return self._data[k]
+        except KeyError:
+            raise AttributeError(k)
+
+    def __setattr__(self, k, v):
+        self._data[k] = v
+        self._dirty.add(k)
+
+    def get(self, k, default=None):
+        return self._data.get(k, default)
+
+    def updates(self) -> Dict[str, Any]:
+        """
+        Return only the keys written by the node, as a LangGraph partial update.
+        """
+
+        return {k: self._data[k] for k in self._dirty}
+
+
+def _manifest_fingerprint(o: Dict[str, Any]) -> list:
+    return file_fingerprint([o["manifest_path"]]) if o.get("manifest_path") else []
+
+# State keys / options each node reads; the checkpoint key is a hash of these.
+# chart and report are cheap and write files, so they always run.
+_NODE_INPUTS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Any]] = {
+    "input": lambda st, o: (o.get("data_dir"), file_fingerprint(read_inputs(o.get("data_dir") or "data").raw_files),
+                            _manifest_fingerprint(o)),
+    "ocr": lambda st, o: file_fingerprint(st.get("raw_files") or []),
+    "clean": lambda st, o: (st.get("ocr_output"), st.get("ocr_pages")),
+    "extract": lambda st, o: (st.get("clean_records"), st.get("ingest"), _manifest_fingerprint(o)),
+    "dedup": lambda st, o: (st.get("extracted"), o.get("dedup_window_days"), o.get("dedup_threshold")),
+    "embed": lambda st, o: (st.get("extracted"), o.get("tenant"), o.get("partition_by_month"), o.get("vector_gc")),
+    "retrieve": lambda st, o: (o.get("query"), o.get("top_k"), st.get("indexed_ids"), o.get("tenant"),
+                               o.get("partition_by_month"), o.get("date_from"), o.get("date_to"),
+                               o.get("rerank_candidates")),
+    "rag": lambda st, o: (o.get("query"), o.get("top_k"), o.get("rag_model"), st.get("retrieved_docs"),
+                          o.get("date_from"), o.get("date_to"), o.get("rerank_candidates")),
+    "analytics": lambda st, o: (o.get("query"), st.get("extracted")),
+    "budget": lambda st, o: (st.get("extracted"), o.get("budget_cfg"), o.get("use_llm")),
+    "trend": lambda st, o: (st.get("extracted"), st.get("budget_vendor_map"), st.get("budget_category_map")),
+    "recurring": lambda st, o: (st.get("extracted"), st.get("budget_vendor_map")),
+}
+
+
+# Primary input / output of each node, used for item counts and rows/sec.
+_NODE_ITEMS: Dict[str, tuple] = {
+    "input": (lambda st: None, lambda st: st.get("raw_files")),
+    "ocr": (lambda st: st.get("raw_files"), lambda st: st.get("ocr_output")),
+    "clean": (lambda st: st.get("ocr_output"), lambda st: st.get("clean_records")),
+    "extract": (lambda st: st.get("clean_records"), lambda st: st.get("extracted")),
+    "load": (lambda st: None, lambda st: st.get("extracted")),
+    "dedup": (lambda st: st.get("extracted"), lambda st: st.get("extracted")),
+    "embed": (lambda st: st.get("extracted"), lambda st: st.get("embedded_count")),
+    "retrieve": (lambda st: st.get("indexed_ids"), lambda st: st.get("retrieved_docs")),
+    "rag": (lambda st: st.get("retrieved_docs"), lambda st: (st.get("last_rag") or {}).get("sources")),
+    "analytics": (lambda st: st.get("extracted"), lambda st: (st.get("last_rag") or {}).get("sources")),
+    "budget": (lambda st: st.get("extracted"), lambda st: (st.get("budget_results") or {}).get("count_indexed_txns")),
+    "trend": (lambda st: st.get("extracted"), lambda st: (st.get("trend_data") or {}).get("months")),
+    "recurring": (lambda st: st.get("extracted"), lambda st: (st.get("recurring_payments") or {}).get("subscriptions")),
+    "chart": (lambda st: (st.get("trend_data") or {}).get("months"), lambda st: st.get("chart_paths")),
+}
+
+
+def _node(name: str, step: Callable[[Any, Dict[str, Any]], None],
+          restore: Optional[Callable[[Any, Dict[str, Any]], None]] = None):
+    """
+    Wrap a pipeline step as a LangGraph node returning a partial state update.
+
+    Every run is measured (wall/CPU time, item counts, rows/sec and, with
+    options["trace_memory"], peak memory) into state["node_metrics"].
+    When options["checkpoint_path"] is set, the node's output is stored under
+    a hash of its inputs; with options["resume"] a matching checkpoint is
+    returned instead of running the step, and restore (if given) re-runs the
+    step's side effects (files it writes) on top of it.
+    """
+
+    in_items, out_items = _NODE_ITEMS.get(name, (lambda st: None, lambda st: None))
+
+    def _run(state: Dict[str, Any]) -> Dict[str, Any]:
+        opts = state.get("options") or {}
+
+        with measure(name, trace_memory=bool(opts.get("trace_memory"))) as m:
+            m["items_in"] = count_items(in_items(state))
+            out = _run_step(state, opts)
+            m["items_out"] = count_items(out_items({**state, **out}))
+            m["cached"] = out.pop("_cached", False)
+            m["failed"] = out.pop("_failed", False)
+
+        out["node_timings"] = {name: round(m["wall_s"], 4)}
+        out["node_metrics"] = {name: m}
+
+        return out
+
+    def _run_step(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+        store = key = None
+        if opts.get("checkpoint_path") and name in _NODE_INPUTS:
+            try:
+                store = CheckpointStore(opts["checkpoint_path"])
+                key = input_hash(name, _NODE_INPUTS[name](state, opts))
+            except Exception:
+                store = None
+
+        if store is not None and opts.get("resume"):
+            hit = store.get(name, key)
+            if hit is not None:
+                out = dict(hit)
+                if restore is not None:
+                    view = _StateView({**state, **out})
+                    try:
+                        restore(view, opts)
+                    except Exception as e:
+                        return {"logs": [f"{name} node failed: {e}"], "_failed": True}
+                    out.update(view.updates())
+                out["logs"] = [f"{name}: restored from checkpoint"]
+                out["_cached"] = True
+
+                return out
+
+        view = _StateView(state)
+
+        try:
+            step(view, opts)
+        except Exception as e:
+            return {"logs": [f"{name} node failed: {e}"], "_failed": True}
+
+        out = view.updates()
+        if store is not None:
+            try:
+                store.put(name, key, out)
+            except Exception:
+                pass
+
+        out["logs"] = [f"{name}: done"]
+
+        return out
+
+    _run.__name__ = f"{name}_node"
+
+    return _run
+
+
+def _input_step(s, opts):
+    files = read_inputs(opts.get("data_dir") or "data").raw_files
+
+    if opts.get("manifest_path"):
+        s.ingest = IngestManifest(opts["manifest_path"]).diff(files)
+        files = s.ingest["new"] + s.ingest["modified"]
+
+    s.raw_files = files
+
+def _extract_step(s, opts):
+    run_extract(s, workers=opts.get("extract_workers"))
+    _extract_outputs(s, opts)
+
+def _extract_outputs(s, opts):
+    """
+    Merge with the ingest manifest and write the pending manifest and the
+    snapshot. Also run when extract is restored from a checkpoint, where
+    s.extracted already holds the merged rows and merging again keeps them.
+    """
+
+    ingest = s.get("ingest")
+    if opts.get("manifest_path") and ingest:
+        manifest = IngestManifest(opts["manifest_path"])
+        s.extracted = manifest.merge(ingest, s.extracted)
+        s.extracted_count = len(s.extracted)
+        # Committed by the report node once the rows are embedded.
+        manifest.save(pending=True)
+
+    if opts.get("snapshot_path"):
+        from tools.snapshot import write_snapshot
+
+        write_snapshot(s.extracted, opts["snapshot_path"])
+
+def _load_step(s, opts):
+    from tools.snapshot import load_snapshot
+
+    load_snapshot(opts["from_snapshot"], s)
+
+def _dedup_step(s, opts):
+    from nodes.dedup_node import run_dedup
+
+    run_dedup(s, window_days=opts.get("dedup_window_days", 2), threshold=opts.get("dedup_threshold", 0.5))
+
+def _embed_step(s, opts):
+    from nodes.embedding_node import run_embeddings
+
+    ingest = s.get("ingest")
+    part = {"tenant": opts.get("tenant"), "partition_by_month": opts.get("partition_by_month", False)}
+    if ingest:
+        run_embeddings(s, only_files=ingest["new"] + ingest["modified"],
+                       drop_files=ingest["modified"] + ingest["deleted"],
+                       sync_files=ingest["unchanged"], **part)
+    else:
+        run_embeddings(s, **part)
+    if opts.get("vector_gc"):
+        from nodes.embedding_node import run_vector_gc
+
+        run_vector_gc(s, **part)
+
+def _retrieve_step(s, opts):
+    from nodes.retrieval_node import run_retrieval
+
+    s.retrieved_docs = run_retrieval(s, opts["query"], top_k=opts.get("top_k", 6), tenant=opts.get("tenant"),
+                                     partition_by_month=opts.get("partition_by_month", False),
+                                     date_from=opts.get("date_from"), date_to=opts.get("date_to"),
+                                     candidates=opts.get("rerank_candidates"))
+
+def _rag_step(s, opts):
+    from nodes.rag_node import run_rag
+
+    cache = None
+    if opts.get("answer_cache_path"):
+        from tools.answer_cache import AnswerCache
+
+        cache = AnswerCache(opts["answer_cache_path"])
+    vs = None
+    if opts.get("tenant") or opts.get("partition_by_month"):
+        from nodes.vector_db_node import open_store
+
+        vs = open_store(tenant=opts.get("tenant"), partition_by_month=True)
+    res = run_rag(s, opts["query"], top_k=opts.get("top_k", 6), model=opts.get("rag_model") or "gpt-4.1-mini",
+                  cache=cache, vs=vs, date_from=opts.get("date_from"), date_to=opts.get("date_to"),
+                  candidates=opts.get("rerank_candidates"))
+    s.last_rag = dict(s.last_rag, answer=res.get("answer"), sources=res.get("sources", []))
+
+def _analytics_step(s, opts):
+    from nodes.analytics_node import run_query
+
+    # budget runs alongside, so categories come from the keyword map here.
+    res = run_query(s, opts["query"], top_k=opts.get("top_k", 6), model=opts.get("rag_model") or "gpt-4.1-mini")
+    s.last_rag = dict(s.last_rag, answer=res.get("answer"), sources=res.get("sources", []),
+                      value=res.get("value"), groups=res.get("groups"))
+
+def _budget_step(s, opts):
+    run_budget(s, budget_cfg=opts.get("budget_cfg"), use_llm=opts.get("use_llm", False))
+
+def _recurring_step(s, opts):
+    from nodes.recurring_node import run_recurring
+
+    run_recurring(s)
+
+def _chart_step(s, opts):
+    from nodes.chart_node import make_charts
+
+    make_charts(s, out_dir=opts.get("chart_dir") or "data/charts", top_n=opts.get("top_n", 5),
+                per_category=opts.get("chart_per_category", False), workers=opts.get("chart_workers"))
+
+def _report_step(s, opts):
+    extracted = s.get("extracted") or []
+    timings = dict(s.get("node_timings") or {})
+    metrics = dict(s.get("node_metrics") or {})
+    if opts.get("manifest_path") and s.get("ingest"):
+        # Only once the new rows are embedded; a run without embed leaves them pending.
+        if all(n in metrics and not metrics[n].get("failed") for n in ("extract", "embed")):
+            IngestManifest(opts["manifest_path"]).commit()
+    s.report = {
+        "ok": True,
+        "files": s.get("raw_files", []),
+        "ocr_count": len(s.get("ocr_output") or {}),
+        "extracted_count": s.get("extracted_count") or len(extracted),
+        "dedup_stats": s.get("dedup_stats", {}),
+        "embedded_count": s.get("embedded_count", 0),
+        "vector_gc": s.get("vector_gc", {}),
+        "budget_results": s.get("budget_results", {}),
+        "recurring_payments": s.get("recurring_payments", {}),
+        "chart_paths": s.get("chart_paths", {}),
+        "chart_stats": s.get("chart_stats", {}),
+        "last_rag": s.get("last_rag", {}) if opts.get("enable_rag") else {},
+        "nodes_run": list(timings),
+        "node_timings": timings,
+        "metrics": metrics,
+        "ingest": {k: len(v) for k, v in (s.get("ingest") or {}).items() if k != "stats"},
+    }
+
+
+def _route_start(state: Dict[str, Any]) -> str:
+    return "load" if (state.get("options") or {}).get("from_snapshot") else "input"
+
+def _wants_rag(opts: Dict[str, Any]) -> bool:
+    return bool(opts.get("enable_rag") and opts.get("query"))
+
+def _wants_analytics(opts: Dict[str, Any]) -> bool:
+    """
+    Aggregate questions ("total spent on transport in October") skip retrieval
+    and the LLM and are answered from the extracted rows.
+    """
+
+    if not (_wants_rag(opts) and opts.get("enable_analytics", True)):
+        return False
+
+    from nodes.analytics_node import is_aggregate
+
+    return is_aggregate(opts["query"])
+
+def _route_after_extract(state: Dict[str, Any]) -> List[str]:
+    """
+    Merge cross-source duplicates first (options["enable_dedup"]), else fan out.
+    """
+
+    if (state.get("options") or {}).get("enable_dedup", True):
+        return ["dedup"]
+
+    return _route_fan_out(state)
+
+def _route_fan_out(state: Dict[str, Any]) -> List[str]:
+    """
+    Fan out to the budget branch and, when requested, the embedding/RAG branch
+    or the analytics node.
+    """
+
+    opts = state.get("options") or {}
+    out = ["budget"]
+    analytics = _wants_analytics(opts)
+
+    if opts.get("enable_embed", True):
+        out.append("embed")
+    elif _wants_rag(opts) and not analytics:
+        out.append("retrieve")
+    if analytics:
+        out.append("analytics")
+
+    return out
+
+def _route_after_embed(state: Dict[str, Any]) -> str:
+    opts = state.get("options") or {}
+
+    return "retrieve" if _wants_rag(opts) and not _wants_analytics(opts) else "report"
+
+def _route_after_retrieve(state: Dict[str, Any]) -> str:
+    return "rag" if (state.get("options") or {}).get("use_llm") else "report"
+
+def _route_after_budget(state: Dict[str, Any]) -> List[str]:
+    if (state.get("options") or {}).get("enable_recurring", True):
+        return ["trend", "recurring"]
+
+    return ["trend"]
+
+def _route_after_trend(state: Dict[str, Any]) -> str:
+    return "chart" if (state.get("options") or {}).get("enable_charts", True) else "report"
+
+
+def build_graph() -> "StateGraph":
     """
     Build and compile the processing graph.
+
+    After extraction the graph fans out into two independent branches that
+    LangGraph runs concurrently: embed -> retrieve -> rag and
+    budget -> trend -> chart. Conditional edges driven by state["options"]
+    (enable_embed, enable_rag, use_llm, enable_charts) cut each branch short,
+    and the deferred report node runs once both branches are finished.
+    With options["from_snapshot"] the graph starts at load, which reads a
+    columnar snapshot instead of running input -> ocr -> clean -> extract.
+    Unless options["enable_dedup"] is False, a dedup node merges bank rows
+    with their SMS/other-source duplicates before the fan-out.
+    Aggregate questions go to the analytics node instead of retrieve -> rag
+    (options["enable_analytics"]).
+    Recurring-payment detection runs beside trend once budget has
+    categorised vendors (options["enable_recurring"]).
     """
+    from langgraph.graph import StateGraph, START, END
+
     graph = StateGraph(StateType)
 
-    graph.add_node("input", read_inputs)
-    graph.add_node("ocr", run_ocr)
-    graph.add_node("clean", clean_text)
-    graph.add_node("extract", run_extract)
-    graph.add_node("embed", run_embeddings)
-    graph.add_node("retrieve", run_retrieval)
-    graph.add_node("rag", run_rag)
-    graph.add_node("budget", run_budget)
-    graph.add_node("trend", build_trends)
-    graph.add_node("chart", make_charts)
+    graph.add_node("load", _node("load", _load_step))
+    graph.add_node("input", _node("input", _input_step))
+    graph.add_node("ocr", _node("ocr", lambda s, o: run_ocr(s)))
+    graph.add_node("clean", _node("clean", lambda s, o: clean_text(s)))
+    graph.add_node("extract", _node("extract", _extract_step, restore=_extract_outputs))
+    graph.add_node("dedup", _node("dedup", _dedup_step))
+    graph.add_node("embed", _node("embed", _embed_step))
+    graph.add_node("retrieve", _node("retrieve", _retrieve_step))
+    graph.add_node("rag", _node("rag", _rag_step))
+    graph.add_node("analytics", _node("analytics", _analytics_step))
+    graph.add_node("budget", _node("budget", _budget_step))
+    graph.add_node("trend", _node("trend", lambda s, o: build_trends(s)))
+    graph.add_node("recurring", _node("recurring", _recurring_step))
+    graph.add_node("chart", _node("chart", _chart_step))
+    graph.add_node("report", _node("report", _report_step), defer=True)
 
     graph.add_edge("input", "ocr")
     graph.add_edge("ocr", "clean")
     graph.add_edge("clean", "extract")
-    graph.add_edge("extract", "embed")
-    graph.add_edge("embed", "retrieve")
-    graph.add_edge("retrieve", "rag")
-    graph.add_edge("rag", "budget")
-    graph.add_edge("budget", "trend")
-    graph.add_edge("trend", "chart")
-    graph.add_edge("chart", END)
-
-    graph.set_entry_point("input")
+
+    fan_out = ["budget", "embed", "retrieve", "analytics"]
+    graph.add_conditional_edges("extract", _route_after_extract, ["dedup"] + fan_out)
+    graph.add_conditional_edges("load", _route_after_extract, ["dedup"] + fan_out)
+    graph.add_conditional_edges("dedup", _route_fan_out, fan_out)
+
+    graph.add_conditional_edges("embed", _route_after_embed, ["retrieve", "report"])
+    graph.add_conditional_edges("retrieve", _route_after_retrieve, ["rag", "report"])
+    graph.add_edge("rag", "report")
+    graph.add_edge("analytics", "report")
+
+    graph.add_conditional_edges("budget", _route_after_budget, ["trend", "recurring"])
+    graph.add_edge("recurring", "report")
+    graph.add_conditional_edges("trend", _route_after_trend, ["chart", "report"])
+    graph.add_edge("chart", "report")
+
+    graph.add_edge("report", END)
+
+    graph.add_conditional_edges(START, _route_start, ["load", "input"])
     
     return graph.compile()
 
 
+@lru_cache(maxsize=1)
+def get_graph():
+    """
+    Return the compiled processing graph, compiling it only on first use.
+    """
+
+    return build_graph()
+
+
 def run_finance_pipeline(data_dir: Optional[str] = "data",
                          enable_rag: bool = False,
                          rag_model: Optional[str] = None,
-                         rag_top_k: int = 6) -> Dict[str, Any]:
+                         rag_top_k: int = 6,
+                         query: Optional[str] = None,
+                         budget_cfg: Optional[Dict[str, float]] = None,
+                         use_llm: bool = False,
+                         enable_embed: bool = True,
+                         enable_charts: bool = True,
+                         chart_per_category: bool = False,
+                         chart_workers: Optional[int] = None,
+                         checkpoint_path: Optional[str] = None,
+                         resume: bool = False,
+                         invalidate: Optional[List[str]] = None,
+                         trace_memory: bool = False,
+                         trace_path: Optional[str] = None,
+                         extract_workers: Optional[int] = None,
+                         manifest_path: Optional[str] = None,
+                         snapshot_path: Optional[str] = None,
+                         from_snapshot: Optional[str] = None,
+                         enable_dedup: bool = True,
+                         dedup_window_days: int = 2,
+                         dedup_threshold: float = 0.5,
+                         answer_cache_path: Optional[str] = None,
+                         enable_analytics: bool = True,
+                         tenant: Optional[str] = None,
+                         partition_by_month: bool = False,
+                         date_from: Optional[str] = None,
+                         date_to: Optional[str] = None,
+                         rerank_candidates: Optional[int] = None,
+                         vector_gc: bool = False,
+                         enable_recurring: bool = True) -> Dict[str, Any]:
     """
     Run the full financial document processing pipeline.
-    """
+    Nodes switched off by the flags are never entered, so a budget-only run
+    (enable_embed=False, enable_charts=False) loads no embedding model,
+    vector store or matplotlib.
 
-    if initialize_graph_state is not None:
-        state = initialize_graph_state(raw_files=None)
-    else:
-        state = StateType()
+    With checkpoint_path set every node's output is checkpointed; resume=True
+    skips nodes whose inputs hash to a stored checkpoint, and invalidate
+    drops the named nodes' checkpoints first so they are recomputed.
 
-    try:
-        if not getattr(state, "logs", None):
-            state.logs = []
-    except Exception:
-        try:
-            state["logs"] = []
-        except Exception:
-            pass
+    report["metrics"] holds per-node wall/CPU time, item counts and rows/sec
+    (plus tracemalloc peak with trace_memory=True); trace_path additionally
+    writes them as Chrome-trace JSON.
 
-    def _log(m: str):
-        """ 
-        Helper to log to state logs.
-        """
-        
-        try:
-            if hasattr(state, "logs"):
-                state.logs.append(m)
-            else:
-                state["logs"].append(m)
-        except Exception:
-            pass
-
-    _log("pipeline:start")
-
-    try:
-        pre = read_inputs(data_dir)
-        
-        try:
-            state.raw_files = getattr(pre, "raw_files", pre.raw_files if hasattr(pre, "raw_files") else pre.get("raw_files", []))
-        except Exception:
-            try:
-                state["raw_files"] = pre.get("raw_files", [])
-            except Exception:
-                pass
-        
-        _log(f"input: discovered {len(getattr(state, 'raw_files', state.get('raw_files', []) if isinstance(state, dict) else []))} files")
-    except Exception as e:
-        _log(f"input node failed: {e}")
+    Charts are only redrawn when their data changed; chart_per_category adds
+    one chart per category, rendered on chart_workers processes when there
+    are several to draw.
 
-    graph = build_graph()
-    final_state = graph.invoke(state)
+    extract_workers > 1 runs extraction on a process pool sharded by file
+    and PDF page range.
 
-    def _get(k, default=None):
-        """ 
-        Helper to get attribute or key from final state. 
-        """
-        
-        try:
-            return getattr(final_state, k)
-        except Exception:
-            try:
-                return final_state.get(k, default)
-            except Exception:
-                return default
+    With manifest_path set, only new or modified files are read, OCR'd,
+    extracted and embedded; rows of unchanged files are carried forward
+    from the manifest, and rows/vectors of deleted files are dropped. The
+    manifest is only updated once extraction and embedding both ran and
+    succeeded, so a failed run, or one with enable_embed=False, re-ingests
+    the same files next time.
 
-    report = {
-        "ok": True,
-        "files": _get("raw_files", []),
-        "ocr_count": len(_get("ocr_output", {}) or {}),
-        "extracted_count": _get("extracted_count", _get("extracted", []) and len(_get("extracted", [])) or 0),
-        "embedded_count": _get("embedded_count", 0),
-        "budget_results": _get("budget_results", {}),
-        "chart_paths": _get("chart_paths", {}),
-        "last_rag": _get("last_rag", {}) if enable_rag else {},
-        "logs": _get("logs", []),
+    snapshot_path writes the extracted rows as a Parquet/Arrow snapshot;
+    from_snapshot starts from such a snapshot and skips input..extract.
+
+    enable_dedup merges rows that record the same payment in two sources
+    (same amount, dates within dedup_window_days, vendor similarity at or
+    above dedup_threshold); report["dedup_stats"] has the counts.
+
+    answer_cache_path enables the RAG answer cache (tools.answer_cache) at
+    that SQLite path: near-duplicate queries reuse a stored answer until
+    the vector store is next written.
+
+    With enable_analytics, aggregate questions (sum/count/average/max/min
+    by category, vendor, month or date range) are answered from the
+    extracted rows without retrieval or an LLM call; report["last_rag"]
+    then has route="analytics".
+
+    tenant / partition_by_month index and search per-tenant, per-month
+    collections (vector_db_node.PartitionedStore); date_from / date_to
+    (ISO dates) then restrict retrieval to the overlapping partitions.
+
+    rerank_candidates > rag_top_k retrieves that many neighbours and
+    reranks them (tools.reranker) down to rag_top_k before the LLM call.
+
+    vector_gc deletes stored vectors that match no extracted row after
+    embedding and compacts the store; report["vector_gc"] has collection
+    size, disk use and query latency before and after.
+
+    enable_recurring detects recurring payments (rent, subscriptions,
+    memberships) into report["recurring_payments"], with each one's
+    period, amount and next expected date.
+    """
+
+    if checkpoint_path and invalidate:
+        CheckpointStore(checkpoint_path).invalidate(invalidate)
+
+    options = {
+        "data_dir": data_dir,
+        "enable_rag": enable_rag,
+        "rag_model": rag_model,
+        "top_k": rag_top_k,
+        "query": query if enable_rag else None,
+        "budget_cfg": budget_cfg,
+        "use_llm": use_llm,
+        "enable_embed": enable_embed,
+        "enable_charts": enable_charts,
+        "chart_per_category": chart_per_category,
+        "chart_workers": chart_workers,
+        "checkpoint_path": checkpoint_path,
+        "resume": resume,
+        "trace_memory": trace_memory,
+        "extract_workers": extract_workers,
+        "manifest_path": manifest_path,
+        "snapshot_path": snapshot_path,
+        "from_snapshot": from_snapshot,
+        "enable_dedup": enable_dedup,
+        "dedup_window_days": dedup_window_days,
+        "dedup_threshold": dedup_threshold,
+        "answer_cache_path": answer_cache_path,
+        "enable_analytics": enable_analytics,
+        "tenant": tenant,
+        "partition_by_month": partition_by_month,
+        "date_from": date_from,
+        "date_to": date_to,
+        "rerank_candidates": rerank_candidates,
+        "vector_gc": vector_gc,
+        "enable_recurring": enable_recurring,
     }
 
-    _log("pipeline:end")
+    if initialize_graph_state is not None:
+        state = initialize_graph_state(raw_files=None, options=options)
+    else:
+        state = {"options": options}
+
+    state["logs"] = ["pipeline:start"]
+    final_state = get_graph().invoke(state)
+
+    report = dict(final_state.get("report") or {})
+    report["metrics"] = dict(final_state.get("node_metrics") or {})
+    report["logs"] = list(final_state.get("logs", [])) + ["pipeline:end"]
+
+    if trace_path:
+        report["trace_path"] = write_chrome_trace(report["metrics"], trace_path)
     
     return report
 
@@ -149,6 +613,11 @@ def run_pipeline(data_dir: str = "data",
     Run the complete financial document processing pipeline step-by-step.
     """
 
+    from nodes.embedding_node import run_embeddings
+    from nodes.retrieval_node import run_retrieval
+    from nodes.chart_node import make_charts
+    from nodes.dedup_node import run_dedup
+
     state = read_inputs(data_dir)
     print(f"[1] read_inputs -> files: {len(state.raw_files)}")
 
@@ -156,11 +625,14 @@ def run_pipeline(data_dir: str = "data",
     print(f"[2] run_ocr -> ocr_output keys: {len(state.ocr_output)}")
 
     state = clean_text(state)
-    print(f"[3] clean_text -> sms blocks: {len(state.clean_text.get('sms', []))}, bank blocks: {len(state.clean_text.get('bank', []))}")
+    print(f"[3] clean_text -> records: {len(state.clean_records)} (sms: {len(state.clean_text.get('sms', []))}, bank: {len(state.clean_text.get('bank', []))})")
 
     state = run_extract(state)
     print(f"[4] run_extract -> extracted_count: {state.extracted_count}")
 
+    state = run_dedup(state)
+    print(f"[4b] run_dedup -> merged: {state.dedup_stats['merged']}, extracted_count: {state.extracted_count}")
+
     state = run_embeddings(state)
     print(f"[5] run_embeddings -> embedded_count: {state.embedded_count}")
 
@@ -171,6 +643,7 @@ def run_pipeline(data_dir: str = "data",
             m = r.get("meta", {})
             print(" -", m.get("txn_id"), "|", m.get("vendor"), "|", m.get("amount"))
 
+    load_env()
     if use_llm and not os.getenv("OPENAI_API_KEY"):
         print("Warning: use_llm=True but OPENAI_API_KEY not found, setting use_llm=False")
         use_llm = False
@@ -182,3 +655,84 @@ def run_pipeline(data_dir: str = "data",
     state = make_charts(state, out_dir="data/charts", top_n=5)
     
     return state
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command-line entry point: python graph.py [--resume] [--invalidate NODE ...]
+    """
+
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Run the personal finance pipeline.")
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--checkpoint-path", default="data/.cache/checkpoints.sqlite")
+    ap.add_argument("--resume", action="store_true", help="skip nodes whose inputs match a stored checkpoint")
+    ap.add_argument("--invalidate", nargs="*", default=None, metavar="NODE",
+                    help="drop checkpoints for these nodes (all nodes if none given)")
+    ap.add_argument("--no-embed", action="store_true")
+    ap.add_argument("--no-charts", action="store_true")
+    ap.add_argument("--per-category-charts", action="store_true", help="also draw one chart per category")
+    ap.add_argument("--no-recurring", action="store_true", help="skip recurring-payment detection")
+    ap.add_argument("--no-dedup", action="store_true", help="keep cross-source duplicate rows")
+    ap.add_argument("--llm", action="store_true")
+    ap.add_argument("--query", default=None)
+    ap.add_argument("--tenant", default=None, help="index/search this tenant's own month-partitioned collections")
+    ap.add_argument("--partition-by-month", action="store_true", help="one vector collection per month")
+    ap.add_argument("--date-from", default=None, metavar="YYYY-MM-DD", help="only retrieve rows on or after this date")
+    ap.add_argument("--date-to", default=None, metavar="YYYY-MM-DD", help="only retrieve rows on or before this date")
+    ap.add_argument("--rerank", type=int, default=None, metavar="N",
+                    help="retrieve N candidates and rerank them down to the top-k sent to the LLM")
+    ap.add_argument("--gc-vectors", action="store_true",
+                    help="delete orphaned vectors and compact the vector store after embedding")
+    ap.add_argument("--no-analytics", action="store_true", help="send aggregate questions through RAG too")
+    ap.add_argument("--answer-cache", nargs="?", const="data/.cache/answer_cache.sqlite", default=None,
+                    metavar="PATH", help="reuse answers to near-duplicate RAG queries, cached in PATH")
+    ap.add_argument("--incremental", nargs="?", const="data/.cache/ingest_manifest.json", default=None,
+                    metavar="MANIFEST", help="only process new/modified files, tracked in MANIFEST")
+    ap.add_argument("--snapshot", default=None, metavar="PATH", help="write extracted rows to PATH (.parquet or .arrow)")
+    ap.add_argument("--from-snapshot", default=None, metavar="PATH", help="start from a snapshot instead of raw files")
+    ap.add_argument("--extract-workers", type=int, default=None, help="process-pool size for extraction")
+    ap.add_argument("--trace-memory", action="store_true", help="record tracemalloc peak per node")
+    ap.add_argument("--trace", default=None, metavar="PATH", help="write Chrome-trace JSON of node metrics")
+    args = ap.parse_args(argv)
+
+    if args.invalidate is not None and not args.invalidate:
+        CheckpointStore(args.checkpoint_path).invalidate()
+
+    report = run_finance_pipeline(
+        data_dir=args.data_dir,
+        enable_rag=bool(args.query),
+        query=args.query,
+        use_llm=args.llm,
+        enable_embed=not args.no_embed,
+        enable_charts=not args.no_charts,
+        chart_per_category=args.per_category_charts,
+        checkpoint_path=args.checkpoint_path,
+        resume=args.resume,
+        invalidate=args.invalidate or None,
+        trace_memory=args.trace_memory,
+        trace_path=args.trace,
+        extract_workers=args.extract_workers,
+        manifest_path=args.incremental,
+        snapshot_path=args.snapshot,
+        from_snapshot=args.from_snapshot,
+        enable_dedup=not args.no_dedup,
+        answer_cache_path=args.answer_cache,
+        enable_analytics=not args.no_analytics,
+        tenant=args.tenant,
+        partition_by_month=args.partition_by_month,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        rerank_candidates=args.rerank,
+        vector_gc=args.gc_vectors,
+        enable_recurring=not args.no_recurring,
+    )
+    print(json.dumps(report, indent=2, default=str))
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
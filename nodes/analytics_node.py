@@ -0,0 +1,422 @@
+import re
+import calendar
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from state.input_state import State
+from .budget_node import _default_map, _cat_from_vendor_kw, _ym_from_date
+from tools.txn_ids import make_txn_id
+
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_name) if m}
+_MONTHS.update({m.lower(): i for i, m in enumerate(calendar.month_abbr) if m})
+_MONTHS["sept"] = 9
+
+# "may" needs a year after it ("may 2025"), otherwise "may I ..." would be a month.
+_MONTH_RE = re.compile(r"\b(" + "|".join(sorted((m for m in _MONTHS if m != "may"), key=len, reverse=True))
+                       + r")\b\.?(?:\s+(\d{4}))?|\bmay\s+(\d{4})\b")
+_DAY_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_ISO_MONTH_RE = re.compile(r"\b(\d{4})-(\d{2})\b(?!-)")
+_YEAR_RE = re.compile(r"\b(?:in|during|for)\s+(\d{4})\b")
+
+_OPS = [
+    ("count", re.compile(r"\bhow many\b|\bcount\b|\bnumber of\b")),
+    ("avg", re.compile(r"\baverage\b|\bavg\b|\bmean\b|\btypical\b")),
+    ("max", re.compile(r"\blargest\b|\bbiggest\b|\bhighest\b|\bmax(?:imum)?\b|\bmost expensive\b")),
+    ("min", re.compile(r"\bsmallest\b|\blowest\b|\bmin(?:imum)?\b|\bcheapest\b")),
+    ("sum", re.compile(r"\btotal\b|\bsum\b|\bhow much\b|\bspen[dt]\b|\bspending\b|\bpaid\b|\bpay\b")),
+]
+_GROUP_RE = re.compile(r"\b(?:by|per|each|every|for each)\s+(category|categories|month|vendor|vendors|merchant|merchants)\b"
+                       r"|\b(monthly)\b")
+# "What did I spend the most on?" / "where did I pay the least?": rank per-group totals.
+_RANK_RE = re.compile(r"\b(most|least)\b(?!\s+(?:expensive|recent|frequent))")
+_SPEND_RE = re.compile(r"\bspen[dt]\b|\bspending\b|\bpa(?:y|id)\b|\bmoney\b|\bcost\b")
+_RANK_VENDOR_RE = re.compile(r"\bwhere\b|\bat\b|\bvendors?\b|\bmerchants?\b|\bstores?\b|\bshops?\b|\bwho\b")
+# "Average per month" means the mean of monthly totals unless it asks about transactions.
+_TXN_RE = re.compile(r"\btransactions?\b|\bpurchases?\b|\bpayments?\b|\border\b|\borders\b")
+# Questions asking for judgement rather than a number go to RAG.
+_OPEN_RE = re.compile(r"\bwhy\b|\bshould\b|\brecommend|\badvice\b|\bexplain\b|\bsummar")
+# The table only holds debits, so money coming in is left to RAG.
+_INCOME_RE = re.compile(r"\bincome\b|\bsalar(?:y|ies)\b|\bpaychecks?\b|\bpayroll\b|\brefund|\bdeposit"
+                        r"|\bearn|\breimburs|\bcredit(?:s|ed)?\b(?!\s*cards?)|\b(?:came|come|coming) in\b"
+                        r"|\b(?:get|got|gets|getting|been|was|were|i'm|am) paid\b|\breceived?\b")
+
+_CAT_ALIASES = {
+    "grocery": "groceries", "utility": "utilities", "transportation": "transport", "dining": "food",
+    "restaurants": "food", "restaurant": "food", "movies": "entertainment", "flights": "travel",
+    "subscriptions": "entertainment",
+}
+
+def _month_span(y: int, m: int) -> Tuple[str, str]:
+    return f"{y:04d}-{m:02d}-01", f"{y:04d}-{m:02d}-{calendar.monthrange(y, m)[1]:02d}"
+
+def _word_in(word: str, q: str) -> bool:
+    return re.search(r"(?<![a-z0-9])" + re.escape(word) + r"(?![a-z0-9])", q) is not None
+
+class TxnTable:
+    """
+    Column-per-field view of the extracted transactions (date, month, amount,
+    category, lower-cased vendor+desc text, txn_id) with a month index, so
+    aggregate questions are answered with one pass over the matching months.
+    Categories follow run_budget (its vendor map when given, else keywords),
+    and like run_budget credits count as no amount, so they are never spending.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], vendor_map: Optional[Dict[str, str]] = None,
+                 cmap: Optional[Dict[str, List[str]]] = None):
+        self.cmap = cmap or _default_map()
+        vendor_map = vendor_map or {}
+
+        self.rows = rows
+        self.date: List[str] = []
+        self.month: List[str] = []
+        self.amount: List[Optional[float]] = []
+        self.category: List[str] = []
+        self.text: List[str] = []
+        self.vendor: List[str] = []
+        self.currency: List[Optional[str]] = []
+        self.txn_id: List[str] = []
+        self.by_month: Dict[str, List[int]] = defaultdict(list)
+
+        per_file: Dict[Any, int] = {}
+        for i, t in enumerate(rows):
+            fn = t.get("file", "nofile")
+            n = per_file.get(fn, 0)
+            per_file[fn] = n + 1
+
+            vendor = (t.get("vendor") or t.get("desc") or "").strip()
+            try:
+                amt = None if t.get("credit") else float(t.get("amount"))
+            except (TypeError, ValueError):
+                amt = None
+
+            ym = _ym_from_date(t.get("date"))
+            self.date.append(t.get("date") or "")
+            self.month.append(ym)
+            self.amount.append(amt)
+            self.category.append(vendor_map.get(vendor) or _cat_from_vendor_kw(vendor, self.cmap))
+            self.vendor.append(vendor)
+            self.text.append(f"{t.get('vendor') or ''} {t.get('desc') or ''}".lower())
+            self.currency.append(t.get("currency"))
+            self.txn_id.append(t.get("txn_id") or make_txn_id(fn, t.get("page"), n))
+            self.by_month[ym].append(i)
+
+        self.vendors = sorted({v.lower() for v in self.vendor if len(v) >= 3}, key=len, reverse=True)
+        self.last_date = max((d for d in self.date if d), default="")
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def meta(self, i: int) -> Dict[str, Any]:
+        t = self.rows[i]
+
+        return {"txn_id": self.txn_id[i], "date": t.get("date"), "vendor": t.get("vendor"), "amount": t.get("amount"),
+                "currency": t.get("currency"), "file": t.get("file"), "page": t.get("page"),
+                "source": t.get("source"), "desc": t.get("desc"), "category": self.category[i]}
+
+def _resolve_month(table: TxnTable, m: int, year: Optional[str]) -> Tuple[str, str]:
+    """
+    Span of month m; without a year, the latest year in the data that has that month.
+    """
+
+    if year:
+        return _month_span(int(year), m)
+
+    years = sorted({ym[:4] for ym in table.by_month if ym[5:7] == f"{m:02d}"})
+    y = int(years[-1]) if years else int((table.last_date or "2000")[:4])
+
+    return _month_span(y, m)
+
+def _parse_dates(q: str, table: TxnTable) -> Optional[Tuple[str, str]]:
+    days = _DAY_RE.findall(q)
+    if days:
+        return (min(days), max(days)) if len(days) > 1 else (days[0], days[0])
+
+    spans = []
+    for y, m in _ISO_MONTH_RE.findall(q):
+        if 1 <= int(m) <= 12:
+            spans.append(_month_span(int(y), int(m)))
+    for name, year, may_year in _MONTH_RE.findall(q):
+        spans.append(_resolve_month(table, _MONTHS[name] if name else 5, year or may_year or None))
+    if spans:
+        return min(s[0] for s in spans), max(s[1] for s in spans)
+
+    last = table.last_date
+    if last and re.search(r"\b(?:last|previous) month\b", q):
+        y, m = int(last[:4]), int(last[5:7]) - 1
+        return _month_span(y - 1, 12) if m == 0 else _month_span(y, m)
+    if last and re.search(r"\bthis month\b", q):
+        return _month_span(int(last[:4]), int(last[5:7]))
+
+    y = _YEAR_RE.search(q) or (re.search(r"\bthis year\b", q) and last and re.match(r"(\d{4})", last))
+    if y:
+        return f"{y.group(1)}-01-01", f"{y.group(1)}-12-31"
+
+    return None
+
+def date_range(query: str, table: TxnTable) -> Optional[Tuple[str, str]]:
+    """
+    (date_from, date_to) the query refers to ("in October", "2025-09", "last
+    month", explicit ISO dates), or None. Used to narrow retrieval as well.
+    """
+
+    return _parse_dates(" ".join(query.lower().split()), table)
+
+def _rank(q: str) -> Optional[str]:
+    m = _RANK_RE.search(q)
+    if m is None or not _SPEND_RE.search(q):
+        return None
+
+    return "max" if m.group(1) == "most" else "min"
+
+def _op(q: str) -> Optional[str]:
+    if _OPEN_RE.search(q) or _INCOME_RE.search(q):
+        return None
+    if _rank(q):
+        return "sum"
+
+    return next((name for name, rx in _OPS if rx.search(q)), None)
+
+def is_aggregate(query: str) -> bool:
+    """
+    True when query asks for a sum/count/average/max/min rather than an open-ended answer.
+    """
+
+    return _op(" ".join(query.lower().split())) is not None
+
+def parse_intent(query: str, table: TxnTable) -> Optional[Dict[str, Any]]:
+    """
+    Aggregate intent of query, or None when it is open-ended.
+
+    Returns {"op": sum|count|avg|max|min, "category", "vendor", "date_from",
+    "date_to", "group_by": category|month|vendor|None, "rank": max|min|None,
+    "per_month": bool}; unset filters are None. "rank" asks for the group with
+    the largest / smallest total ("what did I spend the most on?"), and
+    per_month for the average of monthly totals ("average per month").
+    """
+
+    q = " ".join(query.lower().split())
+    op = _op(q)
+    if op is None:
+        return None
+
+    group_by = None
+    g = _GROUP_RE.search(q)
+    if g:
+        word = g.group(1) or "month"
+        group_by = "category" if word.startswith("categor") else "month" if word in ("month", "monthly") else "vendor"
+
+    rank = _rank(q)
+    if rank:
+        group_by = "vendor" if _RANK_VENDOR_RE.search(q) and not re.search(r"\bcategor", q) else "category"
+    per_month = op == "avg" and group_by == "month" and not _TXN_RE.search(q)
+
+    category = None
+    for cat in table.cmap:
+        if cat != "other" and (_word_in(cat, q) or _word_in(cat.rstrip("s"), q)):
+            category = cat
+            break
+    if category is None:
+        category = next((c for a, c in _CAT_ALIASES.items() if _word_in(a, q)), None)
+
+    # Vendor: a known vendor name, else a category keyword ("uber", "netflix").
+    vendor = next((v for v in table.vendors if _word_in(v, q)), None)
+    if vendor is None:
+        kws = sorted({kw for kws in table.cmap.values() for kw in kws if len(kw) >= 3}, key=len, reverse=True)
+        vendor = next((kw for kw in kws if _word_in(kw, q) and kw not in table.cmap
+                       and kw.rstrip("s") != (category or "").rstrip("s")), None)
+
+    dates = _parse_dates(q, table)
+
+    return {"op": op, "category": category, "vendor": vendor,
+            "date_from": dates[0] if dates else None, "date_to": dates[1] if dates else None,
+            "group_by": group_by, "rank": rank, "per_month": per_month}
+
+def _select(table: TxnTable, intent: Dict[str, Any]) -> List[int]:
+    lo, hi = intent.get("date_from"), intent.get("date_to")
+    if lo and hi:
+        idx = [i for ym in sorted(table.by_month) if lo[:7] <= ym <= hi[:7] for i in table.by_month[ym]]
+    else:
+        idx = range(len(table))
+
+    cat, vendor = intent.get("category"), intent.get("vendor")
+    out = []
+    for i in idx:
+        if table.amount[i] is None:
+            continue
+        if lo and hi and not (lo <= table.date[i][:10] <= hi):
+            continue
+        if cat and table.category[i] != cat:
+            continue
+        if vendor and vendor not in table.text[i]:
+            continue
+        out.append(i)
+
+    return out
+
+def _agg(op: str, table: TxnTable, idx: List[int]) -> Tuple[Optional[float], Optional[int]]:
+    """
+    (value, row index for max/min) of op over idx.
+    """
+
+    if not idx:
+        return (0 if op in ("sum", "count") else None), None
+    if op == "count":
+        return len(idx), None
+    if op == "sum":
+        return round(sum(table.amount[i] for i in idx), 2), None
+    if op == "avg":
+        return round(sum(table.amount[i] for i in idx) / len(idx), 2), None
+
+    pick = max if op == "max" else min
+    j = pick(idx, key=lambda i: table.amount[i])
+
+    return table.amount[j], j
+
+_OP_WORDS = {"sum": "Total spent", "count": "Number of transactions", "avg": "Average transaction",
+             "max": "Largest transaction", "min": "Smallest transaction"}
+
+def _describe(intent: Dict[str, Any]) -> str:
+    parts = []
+    if intent.get("category"):
+        parts.append(f"on {intent['category']}")
+    if intent.get("vendor"):
+        parts.append(f"at {intent['vendor']}")
+    lo, hi = intent.get("date_from"), intent.get("date_to")
+    if lo:
+        parts.append(f"on {lo}" if lo == hi else f"from {lo} to {hi}")
+
+    return " ".join(parts)
+
+def _fmt(op: str, v: Optional[float], currency: str) -> str:
+    if v is None:
+        return "n/a"
+    if op == "count":
+        return str(v)
+
+    return f"{v:,.2f}{(' ' + currency) if currency else ''}"
+
+def answer_aggregate(table: TxnTable, query: str, max_sources: int = 10) -> Optional[Dict[str, Any]]:
+    """
+    Answer an aggregate question from the table, or None if query is open-ended.
+    The result has run_rag's keys plus route="analytics", the parsed intent,
+    the value and, for grouped questions, the per-group values.
+    """
+
+    intent = parse_intent(query, table)
+    if intent is None:
+        return None
+
+    op = intent["op"]
+    idx = _select(table, intent)
+    currencies = {table.currency[i] for i in idx if table.currency[i]}
+    cur = currencies.pop() if len(currencies) == 1 else ""
+    what = " ".join(x for x in (_OP_WORDS[op], _describe(intent)) if x)
+
+    groups = None
+    pick = None
+    if intent.get("rank"):
+        totals: Dict[str, float] = defaultdict(float)
+        counts: Dict[str, int] = defaultdict(int)
+        col = table.category if intent["group_by"] == "category" else table.vendor
+        for i in idx:
+            totals[col[i]] += table.amount[i]
+            counts[col[i]] += 1
+        top = intent["rank"] == "max"
+        order = sorted(totals, key=lambda k: (-totals[k] if top else totals[k], k))
+        groups = {k: round(totals[k], 2) for k in order}
+        scope = _describe(intent)
+        head = f"{'Most' if top else 'Least'} spent by {intent['group_by']}" + (f" {scope}" if scope else "")
+        if order:
+            best = order[0]
+            value = groups[best]
+            idx = [i for i in idx if col[i] == best]
+            answer = (f"{head}: {best}, {_fmt('sum', value, cur)} "
+                      f"({counts[best]} transaction{'' if counts[best] == 1 else 's'}).")
+        else:
+            value = None
+            answer = f"{head}: no matching transactions."
+    elif intent.get("per_month"):
+        lo, hi = intent.get("date_from"), intent.get("date_to")
+        months = [ym for ym in sorted(table.by_month) if _ISO_MONTH_RE.fullmatch(ym) and (not lo or lo[:7] <= ym <= hi[:7])]
+        totals = {ym: 0.0 for ym in months}
+        for i in idx:
+            if table.month[i] in totals:
+                totals[table.month[i]] += table.amount[i]
+        groups = {ym: round(v, 2) for ym, v in totals.items()}
+        value = round(sum(totals.values()) / len(totals), 2) if totals else None
+        scope = _describe(intent)
+        lines = [f"{k}: {_fmt('sum', v, cur)}" for k, v in groups.items()]
+        answer = (f"Average monthly spending{(' ' + scope) if scope else ''}: {_fmt('avg', value, cur)}"
+                  f" over {len(groups)} month{'' if len(groups) == 1 else 's'}"
+                  + (f" ({'; '.join(lines)})." if lines else "."))
+    elif intent["group_by"]:
+        col = {"category": table.category, "month": table.month, "vendor": table.vendor}[intent["group_by"]]
+        buckets: Dict[str, List[int]] = defaultdict(list)
+        for i in idx:
+            buckets[col[i]].append(i)
+        groups = {k: _agg(op, table, v)[0] for k, v in buckets.items()}
+        order = sorted(groups) if intent["group_by"] == "month" else \
+            sorted(groups, key=lambda k: -(groups[k] or 0))
+        groups = {k: groups[k] for k in order}
+        value, pick = _agg(op, table, idx)
+        lines = [f"{k}: {_fmt(op, v, cur)}" for k, v in groups.items()]
+        answer = f"{what} by {intent['group_by']}: " + ("; ".join(lines) if lines else "no matching transactions") + "."
+    else:
+        value, pick = _agg(op, table, idx)
+        answer = f"{what}: {_fmt(op, value, cur)}"
+        answer += "." if op == "count" else f" ({len(idx)} transaction{'' if len(idx) == 1 else 's'})."
+        if pick is not None:
+            m = table.meta(pick)
+            answer = f"{what}: {_fmt(op, value, cur)} at {m.get('vendor')} on {m.get('date')}."
+
+    shown = [pick] if pick is not None else sorted(idx, key=lambda i: -(table.amount[i] or 0))[:max_sources]
+    sources = [table.meta(i) for i in shown]
+
+    return {
+        "answer": answer,
+        "sources": sources,
+        "fallback_sources": [],
+        "retrieved_count": len(idx),
+        "cited_ids": [m["txn_id"] for m in sources],
+        "route": "analytics",
+        "intent": intent,
+        "value": value,
+        "groups": groups,
+    }
+
+def last_rag_entry(query: str, res: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    s.last_rag record for an analytics answer (run_rag records its own).
+    """
+
+    return {
+        "query": query,
+        "route": "analytics",
+        "retrieved": res["retrieved_count"],
+        "sources_returned": len(res["sources"]),
+        "cited_ids": res["cited_ids"],
+        "intent": res["intent"],
+    }
+
+def run_query(s: State, query: str, table: Optional[TxnTable] = None, **rag_kwargs) -> Dict[str, Any]:
+    """
+    Route a question: aggregate intents are answered from the transaction
+    table (built from s.extracted and s.budget_vendor_map when not given);
+    anything else goes to run_rag(s, query, **rag_kwargs).
+    result["route"] says which path answered.
+    """
+
+    if table is None:
+        table = TxnTable(getattr(s, "extracted", []) or [], getattr(s, "budget_vendor_map", None))
+
+    res = answer_aggregate(table, query) if len(table) else None
+    if res is None:
+        from .rag_node import run_rag
+
+        res = dict(run_rag(s, query, **rag_kwargs), route="rag")
+        s.last_rag = dict(s.last_rag, route="rag")
+
+        return res
+
+    s.last_rag = last_rag_entry(query, res)
+
+    return res
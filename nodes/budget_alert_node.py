@@ -0,0 +1,256 @@
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .budget_node import _default_map, _cat_from_vendor_kw, _ym_from_date
+
+class BudgetMonitor:
+    """
+    Running month x category totals that raise an alert the moment a
+    transaction pushes a category over its monthly limit.
+
+    Each ingest is O(1): one dict update per total, plus a line appended to a
+    journal next to the snapshot at path, so a restart picks up where it left
+    off. violations() / results() match run_budget's violations and
+    budget_results for the same rows in the same order, without an LLM
+    (pass vendor_map=s.budget_vendor_map to reuse an LLM classification).
+    """
+
+    def __init__(self, budget_cfg: Optional[Dict[str, float]] = None, cmap: Optional[Dict[str, List[str]]] = None,
+                 vendor_map: Optional[Dict[str, str]] = None, path: Optional[str] = None,
+                 on_alert: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        budget_cfg is category -> monthly limit (the stored limits when None).
+        path enables persistence; on_alert is called with every alert event.
+        """
+
+        self.cmap = cmap or _default_map()
+        self.vendor_map = dict(vendor_map or {})
+        self.path = Path(path) if path else None
+        self.on_alert = on_alert
+
+        self.limits: Dict[str, float] = {}
+        self.month_cat: Dict[str, Dict[str, float]] = {}
+        self.cat_tot: Dict[str, float] = {}
+        self.month_tot: Dict[str, float] = {}
+        self.count = 0
+        # (month, category) cells over their limit -> (month order, category order)
+        self._over: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._journal = None
+
+        if self.path is not None:
+            self._load()
+        if budget_cfg is not None:
+            self.set_limits(budget_cfg)
+
+    def _category(self, vendor: str) -> str:
+        cat = self.vendor_map.get(vendor)
+        if cat is None:
+            cat = self.vendor_map[vendor] = _cat_from_vendor_kw(vendor, self.cmap)
+
+        return cat
+
+    def _add(self, ym: str, cat: str, a: float) -> Optional[Dict[str, Any]]:
+        cats = self.month_cat.get(ym)
+        if cats is None:
+            cats = self.month_cat[ym] = {}
+        val = cats[cat] = cats.get(cat, 0.0) + a
+        self.cat_tot[cat] = self.cat_tot.get(cat, 0.0) + a
+        self.month_tot[ym] = self.month_tot.get(ym, 0.0) + a
+        self.count += 1
+
+        limit = self.limits.get(cat)
+        if limit is None:
+            return None
+        if val > limit:
+            if (ym, cat) not in self._over:
+                self._over[(ym, cat)] = self._order(ym, cat)
+                return {"month": ym, "category": cat, "spent": round(val, 2), "limit": round(limit, 2),
+                        "excess": round(val - limit, 2)}
+        else:
+            # A refund can bring the category back under.
+            self._over.pop((ym, cat), None)
+
+        return None
+
+    def _order(self, ym: str, cat: str) -> Tuple[int, int]:
+        # run_budget lists violations by first appearance of the month, then of
+        # the category within it; only looked up when a cell goes over.
+        months = list(self.month_cat)
+
+        return months.index(ym), list(self.month_cat[ym]).index(cat)
+
+    def ingest(self, t: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Add one extracted transaction row. Returns (and passes to on_alert) an
+        alert event when this row takes its month's category over the limit,
+        else None. Rows without a numeric amount and credits are ignored, as in run_budget.
+        """
+
+        amt = t.get("amount")
+        if amt is None or t.get("credit"):
+            return None
+        try:
+            a = float(amt)
+        except Exception:
+            return None
+
+        vendor = (t.get("vendor") or t.get("desc") or "").strip()
+        ym = _ym_from_date(t.get("date"))
+        cat = self._category(vendor)
+        ev = self._add(ym, cat, a)
+        self._log(ym, cat, a)
+
+        if ev is not None:
+            ev.update(event="budget_exceeded", txn={k: t.get(k) for k in ("date", "vendor", "amount", "source")})
+            if self.on_alert is not None:
+                self.on_alert(ev)
+
+        return ev
+
+    def ingest_sms(self, msg: str) -> Dict[str, Any]:
+        """
+        Parse one SMS message and ingest it if it is a transaction.
+        Returns {"txn": row or None, "alert": event or None}.
+        """
+
+        from .extraction_node import _parse_sms_message
+
+        row = _parse_sms_message(msg)
+
+        return {"txn": row, "alert": self.ingest(row) if row else None}
+
+    def ingest_many(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ingest rows in order and return the alert events they raised.
+        """
+
+        out = []
+        for t in rows:
+            ev = self.ingest(t)
+            if ev is not None:
+                out.append(ev)
+
+        return out
+
+    def set_limits(self, budget_cfg: Dict[str, float]) -> None:
+        """
+        Replace the limits and recompute which cells are over (no alerts are raised).
+        """
+
+        self.limits = {k: v for k, v in budget_cfg.items() if v is not None}
+        self._over = {}
+        for i, (ym, cats) in enumerate(self.month_cat.items()):
+            for j, (cat, val) in enumerate(cats.items()):
+                limit = self.limits.get(cat)
+                if limit is not None and val > limit:
+                    self._over[(ym, cat)] = (i, j)
+        if self.path is not None:
+            self.save()
+
+    def violations(self) -> List[Dict[str, Any]]:
+        """
+        Current violations, in run_budget's format and order.
+        """
+
+        out = []
+        for ym, cat in sorted(self._over, key=self._over.get):
+            val, limit = self.month_cat[ym][cat], self.limits[cat]
+            out.append({"month": ym, "category": cat, "spent": round(val, 2), "limit": round(limit, 2),
+                        "excess": round(val - limit, 2)})
+
+        return out
+
+    def results(self) -> Dict[str, Any]:
+        """
+        The same dict run_budget stores in s.budget_results.
+        """
+
+        top_c = Counter(self.cat_tot).most_common(5)
+
+        return {
+            "count_indexed_txns": self.count,
+            "total_by_category": {k: round(v, 2) for k, v in self.cat_tot.items()},
+            "total_by_month": {k: round(v, 2) for k, v in self.month_tot.items()},
+            "month_category_breakdown": {m: {c: round(v, 2) for c, v in cats.items()}
+                                         for m, cats in self.month_cat.items()},
+            "top_categories": [{"category": k, "amount": round(v, 2)} for k, v in top_c],
+            "violations": self.violations(),
+        }
+
+    def _journal_path(self) -> Path:
+        return self.path.with_suffix(self.path.suffix + ".log")
+
+    def _log(self, ym: str, cat: str, a: float) -> None:
+        if self.path is None:
+            return
+        if self._journal is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self._journal_path(), "a", encoding="utf-8")
+        self._journal.write(json.dumps([ym, cat, a]) + "\n")
+        self._journal.flush()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            data = {}
+        self.limits = data.get("limits", {})
+        self.month_cat = data.get("month_cat", {})
+        self.cat_tot = data.get("cat_tot", {})
+        self.month_tot = data.get("month_tot", {})
+        self.count = data.get("count", 0)
+
+        try:
+            with open(self._journal_path(), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ym, cat, a = json.loads(line)
+                    except ValueError:
+                        break  # torn last line
+                    self._add(ym, cat, a)
+        except OSError:
+            pass
+        self.set_limits(self.limits)
+
+    def save(self) -> None:
+        """
+        Write the totals atomically and start a fresh journal.
+        """
+
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({
+            "limits": self.limits,
+            "month_cat": self.month_cat,
+            "cat_tot": self.cat_tot,
+            "month_tot": self.month_tot,
+            "count": self.count,
+        }, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        open(self._journal_path(), "w").close()
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+def replay(rows: Iterable[Dict[str, Any]], budget_cfg: Optional[Dict[str, float]] = None,
+           cmap: Optional[Dict[str, List[str]]] = None,
+           vendor_map: Optional[Dict[str, str]] = None) -> BudgetMonitor:
+    """
+    Feed rows through a fresh in-memory BudgetMonitor (e.g. to check it against run_budget).
+    """
+
+    mon = BudgetMonitor(budget_cfg or {}, cmap=cmap, vendor_map=vendor_map)
+    mon.ingest_many(rows)
+
+    return mon
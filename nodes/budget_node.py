@@ -56,6 +56,7 @@ def _ym_from_date(d: Optional[str]) -> str:
 def run_budget(s, budget_cfg: Optional[Dict[str, float]] = None, cmap: Optional[Dict[str, List[str]]] = None, use_llm: bool = True) -> Any:
     """ 
     Analyze budget based on extracted transactions in state s.
+    Credits (income, transfers in) are not spending and are skipped.
     """
     
     txns = getattr(s, "extracted", []) or []
@@ -92,7 +93,7 @@ def run_budget(s, budget_cfg: Optional[Dict[str, float]] = None, cmap: Optional[
     
     for t in txns:
         amt = t.get("amount")
-        if amt is None:
+        if amt is None or t.get("credit"):
             continue
        
         try:
@@ -1,51 +1,138 @@
 import os
+import json
+import hashlib
 from pathlib import Path
-from typing import Dict, Any, List
-import matplotlib.pyplot as plt
+from typing import Dict, Any, List, Optional
 from .trend_node import build_trends
 
+# matplotlib is imported inside _figure, so importing this module (or a
+# graph run with charts off, or one where every chart is unchanged) never
+# loads it.
+
+# Bump when the drawing code changes so existing PNGs are re-rendered.
+_RENDER_VERSION = 1
+_HASH_FILE = ".chart_hashes.json"
+
 def _ensure_dir(p: Path):
-    """ 
-    Ensure directory exists. 
     """
-    
+    Ensure directory exists.
+    """
+
     p.mkdir(parents=True, exist_ok=True)
 
+def _figure(title: str):
+    """
+    New Agg-backed Figure and Axes (object-oriented API, no pyplot global state).
+    """
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Amount")
+    ax.set_title(title)
+
+    return fig, ax
+
 def save_line_chart(x: List[str], ys: List[List[float]], labels: List[str], out_path: Path, title: str = ""):
     """
     Save a line chart to the specified path.
     """
-    
-    plt.figure(figsize=(10,5))
+
+    fig, ax = _figure(title)
     for y, lab in zip(ys, labels):
-        plt.plot(x, y, label=lab)
-    
-    plt.xlabel("Month")
-    plt.ylabel("Amount")
-    plt.title(title)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(str(out_path))
-    plt.close()
+        ax.plot(x, y, label=lab)
+
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(str(out_path))
 
 def save_bar_chart(x: List[str], heights: List[float], out_path: Path, title: str = ""):
-    """ 
+    """
     Save a bar chart to the specified path.
     """
-    
-    plt.figure(figsize=(10,5))
-    plt.bar(x, heights)
-    plt.xlabel("Month")
-    plt.ylabel("Amount")
-    plt.title(title)
-    plt.tight_layout()
-    plt.savefig(str(out_path))
-    plt.close()
-
-def make_charts(s, out_dir: str = "data/charts", top_n: int = 5):
-    """ 
+
+    fig, ax = _figure(title)
+    ax.bar(x, heights)
+    fig.tight_layout()
+    fig.savefig(str(out_path))
+
+def _render(spec: Dict[str, Any]) -> str:
+    """
+    Draw one chart spec; module-level so worker processes can run it.
+    """
+
+    if spec["kind"] == "line":
+        save_line_chart(spec["x"], spec["ys"], spec["labels"], Path(spec["path"]), title=spec["title"])
+    else:
+        save_bar_chart(spec["x"], spec["ys"][0], Path(spec["path"]), title=spec["title"])
+
+    return spec["path"]
+
+def _spec_hash(spec: Dict[str, Any]) -> str:
+    """
+    Hash of everything drawn into a chart (series, labels, title, kind).
+    """
+
+    blob = json.dumps([_RENDER_VERSION, spec["kind"], spec["title"], spec["x"], spec["ys"], spec.get("labels")],
+                      sort_keys=True, default=str)
+
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _chart_specs(td: Dict[str, Any], p: Path, top_n: int, per_category: bool) -> List[Dict[str, Any]]:
+    """
+    (name, kind, path, title, data) of every chart to draw from trend_data.
+    """
+
+    months = td.get("months", [])
+    top = td.get("top_categories", [])[:top_n]
+    cats = [c for c, _ in top]
+    specs = []
+
+    if cats:
+        specs.append({"name": "top_categories_trend", "kind": "line", "path": str(p / f"top_{top_n}_categories_trend.png"),
+                      "title": f"Top {top_n} categories - Monthly trend", "x": months, "labels": cats,
+                      "ys": [td["categories"].get(c, [0]*len(months)) for c in cats]})
+
+    if months:
+        specs.append({"name": "monthly_totals", "kind": "bar", "path": str(p / "monthly_totals.png"),
+                      "title": "Total spending per month", "x": months,
+                      "ys": [[td["monthly_totals"].get(m, 0.0) for m in months]]})
+
+    if per_category and months:
+        for c in sorted(td.get("categories", {})):
+            safe = "".join(ch if ch.isalnum() else "_" for ch in str(c))
+            specs.append({"name": f"category_{c}", "kind": "bar", "path": str(p / f"category_{safe}.png"),
+                          "title": f"{c} - spending per month", "x": months, "ys": [td["categories"][c]]})
+
+    return specs
+
+def _load_hashes(p: Path) -> Dict[str, str]:
+    try:
+        return json.loads((p / _HASH_FILE).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def _save_hashes(p: Path, hashes: Dict[str, str]) -> None:
+    tmp = p / (_HASH_FILE + ".tmp")
+    tmp.write_text(json.dumps(hashes, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(p / _HASH_FILE)
+
+def make_charts(s, out_dir: str = "data/charts", top_n: int = 5, per_category: bool = False,
+                workers: Optional[int] = None, parallel_min: int = 4, force: bool = False):
+    """
     Generate and save charts based on trend data in s.
     Returns the state object with chart_paths set.
+
+    A chart whose series hash matches the last render (recorded in
+    out_dir/.chart_hashes.json) and whose PNG still exists is not redrawn;
+    force=True redraws everything. per_category adds one bar chart per
+    category. When at least parallel_min charts need drawing they are
+    rendered on a process pool of `workers` (default: CPU count; 1 keeps
+    it serial). s.chart_stats counts rendered and skipped charts.
     """
 
     p = Path(out_dir)
@@ -56,27 +143,40 @@ def make_charts(s, out_dir: str = "data/charts", top_n: int = 5):
         s = build_trends(s)
         td = getattr(s, "trend_data", None)
 
-    months = td.get("months", [])
-    monthly_totals = [td["monthly_totals"].get(m, 0.0) for m in months]
-    top = td.get("top_categories", [])[:top_n]
-    cats = [c for c, _ in top]
-    ys = [td["categories"].get(c, [0]*len(months)) for c in cats]
-    out = {}
+    specs = _chart_specs(td, p, top_n, per_category)
+    hashes = _load_hashes(p)
+    todo = []
 
-    if cats:
-        fname = p / f"top_{top_n}_categories_trend.png"
-        save_line_chart(months, ys, cats, fname, title=f"Top {top_n} categories - Monthly trend")
-        out["top_categories_trend"] = str(fname)
+    for spec in specs:
+        spec["hash"] = _spec_hash(spec)
+        name = Path(spec["path"]).name
+        if force or hashes.get(name) != spec["hash"] or not Path(spec["path"]).exists():
+            todo.append(spec)
 
-    if months:
-        fname2 = p / "monthly_totals.png"
-        save_bar_chart(months, monthly_totals, fname2, title="Total spending per month")
-        out["monthly_totals"] = str(fname2)
+    n_workers = workers if workers is not None else (os.cpu_count() or 1)
+    if len(todo) >= parallel_min and n_workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(todo))) as ex:
+            list(ex.map(_render, todo))
+    else:
+        for spec in todo:
+            _render(spec)
+
+    if todo:
+        for spec in todo:
+            hashes[Path(spec["path"]).name] = spec["hash"]
+        _save_hashes(p, hashes)
+
+    out = {spec["name"]: spec["path"] for spec in specs}
+    stats = {"rendered": len(todo), "skipped": len(specs) - len(todo)}
 
     try:
         s.chart_paths = out
+        s.chart_stats = stats
     except (AttributeError, TypeError):
         if isinstance(s, dict):
             s["chart_paths"] = out
-    
+            s["chart_stats"] = stats
+
     return s
@@ -1,59 +1,183 @@
+import io
 import re
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from state.input_state import State
 
-_ts_re = re.compile(r'\[\d{4}-\d{2}-\d{2}[^]]*\]')
-_sms_like_re = re.compile(
-    r'(BankAlert|Debit|Credit|Credited|Debited|Acct|A/c|account|OTP|ending in|IMPS|UPI|NEFT|\d{10,})',
-    re.I
-)
-_bank_like_re = re.compile(
-    r'(BALANCE|BAL:|AVAIL|WITHDRAWAL|DEPOSIT|CREDITED|DEBITED|IMPS|NEFT|UPI|POS|ATM|REF NO|A/C)',
-    re.I
-)
+_SMS_HEADER_RE = re.compile(r'\s*\[\d{4}-\d{2}-\d{2}[^\]\n]*\]')
+_SMS_RULE_RE = re.compile(r'\s*-{3,}')
+_BANK_ROW_RE = re.compile(r'^\s*(\d{2}-[A-Za-z]{3}-\d{4})\s*\|\s*(.+)$', re.MULTILINE)
+_BANK_LINE_RE = re.compile(r'^\s*\d{2}-[A-Za-z]{3}-\d{4}.*$', re.MULTILINE)
+_BLOCK_SPLIT_RE = re.compile(r'\n\s*\n')
 
-def _split_blocks(txt):
+def _line_counter(txt: str):
     """
-    Split text into blocks separated by blank lines.
+    1-based line number of a position in txt; positions must be non-decreasing.
     """
-    
-    return [p.strip() for p in re.split(r'\n\s*\n', txt) if p.strip()]
 
-def clean_text(s: State):
-    """ 
-    Clean and categorize OCR output text in the State object.
+    pos, line = 0, 1
+
+    def at(p: int) -> int:
+        nonlocal pos, line
+        line += txt.count('\n', pos, p)
+        pos = p
+
+        return line
+
+    return at
+
+def _iter_sms_spans(lines: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+    """
+    (first line, last line, text) of each SMS message, see iter_sms_messages.
+    """
+
+    cur: List[str] = []
+    start = last = 0
+    for n, line in enumerate(lines, 1):
+        if _SMS_HEADER_RE.match(line):
+            if cur:
+                yield start, last, "".join(cur).strip()
+            cur = [line.lstrip()]
+            start = last = n
+        elif _SMS_RULE_RE.match(line):
+            if cur:
+                yield start, last, "".join(cur).strip()
+            cur = []
+        elif cur:
+            cur.append(line)
+            if line.strip():
+                last = n
+
+    if cur:
+        yield start, last, "".join(cur).strip()
+
+def iter_sms_messages(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Group SMS export lines into messages, yielding each one as soon as it ends.
+
+    A message starts at a line beginning with a [YYYY-MM-DD ...] timestamp and
+    takes following lines as its body until the next timestamp. A separator
+    rule (a line starting with ---) closes it, and anything before the first
+    timestamp is skipped. Only the current message is held in memory.
+    """
+
+    for _, _, msg in _iter_sms_spans(lines):
+        yield msg
+
+def _iter_blocks(txt: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    (start, end, stripped text) of each non-empty blank-line-separated block.
+    """
+
+    prev = 0
+    for m in _BLOCK_SPLIT_RE.finditer(txt):
+        yield prev, m.start(), txt[prev:m.start()]
+        prev = m.end()
+    yield prev, len(txt), txt[prev:]
+
+# kind: "sms" is one SMS message, "bank" one statement row, and "block" a
+# blank-line-separated chunk that may be either.
+def _record(kind: str, fn: str, page: Optional[int], start: int, end: int, text: str) -> Dict:
+    return {"kind": kind, "file": fn, "page": page, "line_start": start, "line_end": end, "text": text}
+
+def _bank_records(fn: str, page: Optional[int], txt: str, out: List[Dict]) -> None:
+    at = _line_counter(txt)
+    for m in _BANK_LINE_RE.finditer(txt):
+        row = m.group(0)
+        first = at(m.start() + len(row) - len(row.lstrip()))
+        out.append(_record("bank", fn, page, first, at(m.end()), row))
+
+def _sms_records(fn: str, page: Optional[int], txt: str, out: List[Dict]) -> bool:
+    n = len(out)
+    for start, end, msg in _iter_sms_spans(io.StringIO(txt)):
+        out.append(_record("sms", fn, page, start, end, msg))
+
+    return len(out) > n
+
+def _block_records(kind: str, fn: str, page: Optional[int], txt: str, out: List[Dict]) -> None:
+    at = _line_counter(txt)
+    for a, b, chunk in _iter_blocks(txt):
+        text = chunk.strip()
+        if text:
+            first = at(a + len(chunk) - len(chunk.lstrip()))
+            out.append(_record(kind, fn, page, first, at(a + len(chunk.rstrip())), text))
+
+def page_records(fn: str, page: int, txt: str) -> List[Dict]:
+    """
+    Records of one PDF page: statement rows if it has any, else SMS
+    messages, else the whole page as a single block.
     """
-    
-    raw = getattr(s, "ocr_output", {}) or {}
-    res = {"sms": [], "bank": []}
 
-    for fn, txt in raw.items():
+    out: List[Dict] = []
+    txt = txt.strip()
+    if not txt:
+        return out
+
+    if _BANK_ROW_RE.search(txt):
+        _bank_records(fn, page, txt, out)
+    elif not _sms_records(fn, page, txt, out):
+        out.append(_record("block", fn, page, 1, txt.count('\n') + 1, txt))
+
+    return out
+
+def text_records(fn: str, txt: str) -> List[Dict]:
+    """
+    Records of a whole text file. Files named like SMS/message exports are
+    split into messages (blank-line blocks as a fallback); other files into
+    statement rows, or blocks when no row is found.
+    """
+
+    out: List[Dict] = []
+    name = fn.lower()
+
+    if 'sms' in name or 'msg' in name:
+        if not _sms_records(fn, None, txt, out):
+            _block_records("sms", fn, None, txt, out)
+
+        return out
+
+    _bank_records(fn, None, txt, out)
+    if not out:
+        _block_records("block", fn, None, txt, out)
+
+    return out
+
+def build_records(ocr_output: Dict[str, str], ocr_pages: Optional[Dict[str, List[str]]] = None) -> List[Dict]:
+    """
+    Typed records (kind, file, page, line_start, line_end, text) for every
+    file, in file then page then line order. PDFs with page texts from OCR
+    get per-page records; everything else is split as text.
+    """
+
+    pages = ocr_pages or {}
+    out: List[Dict] = []
+
+    for fn, txt in ocr_output.items():
         if not isinstance(txt, str):
             txt = str(txt or '')
-        
-        txt = txt.replace('\r', '')
-        name = Path(fn).name.lower()
-
-        if 'sms' in name:
-            for b in _split_blocks(txt):
-                if _sms_like_re.search(b) or _ts_re.search(b):
-                    res['sms'].append(b)
-           
-            continue
-
-        if 'bank' in name:
-            for b in _split_blocks(txt):
-                if _bank_like_re.search(b):
-                    res['bank'].append(b)
-            
-            continue
-
-        for b in _split_blocks(txt):
-            if _sms_like_re.search(b) or _ts_re.search(b):
-                res['sms'].append(b)
-            elif _bank_like_re.search(b):
-                res['bank'].append(b)
 
+        if Path(fn).suffix.lower() == '.pdf' and fn in pages:
+            for i, page_txt in enumerate(pages[fn]):
+                out.extend(page_records(fn, i + 1, page_txt or ""))
+        else:
+            out.extend(text_records(fn, txt))
+
+    return out
+
+def clean_text(s: State):
+    """
+    Split OCR output into typed records for extraction.
+
+    s.clean_records holds the records; s.clean_text keeps the SMS and bank
+    texts by kind ("block" records are counted under bank).
+    """
+
+    records = build_records(getattr(s, "ocr_output", {}) or {}, getattr(s, "ocr_pages", None))
+    res = {"sms": [], "bank": []}
+    for r in records:
+        res["sms" if r["kind"] == "sms" else "bank"].append(r["text"])
+
+    s.clean_records = records
     s.clean_text = res
-    
+
     return s
@@ -0,0 +1,138 @@
+import datetime as dt
+from difflib import SequenceMatcher
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.vendor_norm import normalize_vendor
+from .budget_node import _default_map, _cat_from_vendor_kw
+
+def vendor_similarity(a: Tuple[frozenset, str], b: Tuple[frozenset, str]) -> float:
+    """
+    Max of token Jaccard and character similarity of the compact forms
+    (so "UBER EATS" ~ "UberEats" and "AMAZON MARKETPLACE" ~ "AMAZON MKTPLACE").
+    """
+
+    ta, ca = a
+    tb, cb = b
+    if not ca or not cb:
+        return 0.0
+
+    jac = len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+    if jac >= 1.0 or ca == cb:
+        return 1.0
+    if ca in cb or cb in ca:
+        return max(jac, 0.9)
+
+    return max(jac, SequenceMatcher(None, ca, cb).ratio())
+
+def _day(d: Optional[str]) -> Optional[int]:
+    try:
+        return dt.date.fromisoformat(d[:10]).toordinal()
+    except Exception:
+        return None
+
+def _cents(a: Any) -> Optional[int]:
+    try:
+        return int(round(float(a) * 100))
+    except Exception:
+        return None
+
+def _prov(t: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: t.get(k) for k in ("source", "file", "page", "date", "vendor", "desc")}
+
+def find_duplicates(txns: List[Dict[str, Any]], window_days: int = 2,
+                    threshold: float = 0.5, cmap: Optional[Dict[str, List[str]]] = None) -> List[Tuple[int, int, float]]:
+    """
+    Pairs (primary_idx, dup_idx, score) of the same payment seen in two sources.
+
+    Bank rows are the primaries and are indexed by (amount in cents, day).
+    Each other-source row probes only the 2*window_days+1 buckets with its
+    exact amount, so the work is linear in the number of rows plus block
+    sizes. Within a block the best unused vendor match at or above
+    threshold wins (ties go to the closest date). A same-day row whose
+    vendor names differ ("LANDLORD (RENT)" / "RENT_NOV") still matches at
+    threshold when both fall in the same keyword category (other than "other").
+    """
+
+    cmap = cmap or _default_map()
+    cats: Dict[int, str] = {}
+
+    def cat(k: int) -> str:
+        if k not in cats:
+            cats[k] = _cat_from_vendor_kw((txns[k].get("vendor") or txns[k].get("desc") or "").strip(), cmap)
+
+        return cats[k]
+
+    index: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    keys: List[Optional[Tuple[int, int]]] = []
+
+    for i, t in enumerate(txns):
+        c, d = _cents(t.get("amount")), _day(t.get("date"))
+        keys.append((c, d) if c is not None and d is not None else None)
+        if keys[i] and t.get("source") == "bank":
+            index[keys[i]].append(i)
+
+    used = set()
+    norm: Dict[int, Tuple[frozenset, str]] = {}
+    pairs = []
+
+    for j, t in enumerate(txns):
+        if keys[j] is None or t.get("source") == "bank":
+            continue
+
+        c, d = keys[j]
+        best = None
+        for off in range(-window_days, window_days + 1):
+            for i in index.get((c, d + off), ()):
+                if i in used or txns[i].get("file") == t.get("file"):
+                    continue
+
+                if i not in norm:
+                    norm[i] = normalize_vendor(txns[i])
+                if j not in norm:
+                    norm[j] = normalize_vendor(t)
+
+                score = vendor_similarity(norm[i], norm[j])
+                if score < threshold and off == 0 and cat(i) != "other" and cat(i) == cat(j):
+                    score = threshold
+                if score >= threshold and (best is None or (score, -abs(off)) > (best[2], -best[3])):
+                    best = (i, j, score, abs(off))
+
+        if best:
+            used.add(best[0])
+            pairs.append(best[:3])
+
+    return pairs
+
+def run_dedup(s, window_days: int = 2, threshold: float = 0.5) -> Any:
+    """
+    Merge cross-source duplicates in s.extracted (e.g. a bank debit and its SMS alert).
+
+    The bank row is kept and gains "duplicates": the provenance of every
+    merged row. s.dedup_stats reports counts before and after.
+    """
+
+    txns = getattr(s, "extracted", []) or []
+    pairs = find_duplicates(txns, window_days=window_days, threshold=threshold)
+
+    merged: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    drop = set()
+    for i, j, score in pairs:
+        merged[i].append(dict(_prov(txns[j]), score=round(score, 3)))
+        drop.add(j)
+
+    out = []
+    for k, t in enumerate(txns):
+        if k in drop:
+            continue
+        if k in merged:
+            t = dict(t)
+            t["duplicates"] = t.get("duplicates", []) + merged[k]
+        out.append(t)
+
+    s.extracted = out
+    s.extracted_count = len(out)
+    s.dedup_stats = {"input": len(txns), "output": len(out), "merged": len(drop),
+                     "window_days": window_days, "threshold": threshold}
+
+    return s
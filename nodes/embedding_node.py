@@ -1,30 +1,34 @@
 import os
 import math
-from typing import List
-from pathlib import Path
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from state.input_state import State
 from tools.validator import validate
-from .vector_db_node import VectorStore
+from tools.lazy_import import optional_import, load_env
+from tools.txn_ids import make_txn_id
+from .vector_db_node import open_store, _day_int
 
-try:
-    import openai
-except Exception:
-    openai = None
+def _numbered(arr: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+    """
+    (ID, row) for every valid row: its "txn_id" from extraction, else (rows
+    built elsewhere) its position within its file.
+    """
 
-try:
-    from sentence_transformers import SentenceTransformer
-except Exception:
-    SentenceTransformer = None
+    per_file = {}
+    for t in arr:
+        fn = t.get("file", "nofile")
+        i = per_file.get(fn, 0)
+        per_file[fn] = i + 1
+        if validate(t):
+            yield t.get("txn_id") or make_txn_id(fn, t.get("page"), i), t
 
-def _make_id(fn: str, page, idx: int) -> str:
-    """ 
-    Make a unique ID for a transaction embedding 
+def expected_ids(arr: Iterable[dict]) -> Dict[str, Optional[str]]:
+    """
+    ID -> date for the rows run_embeddings would store from arr; anything
+    else in the store is an orphan.
     """
-    
-    p = Path(fn).name
-    pg = "p{}".format(page) if page is not None else "pn"
-    
-    return f"txn::{p}::{pg}::{idx}"
+
+    return {tid: t.get("date") for tid, t in _numbered(arr)}
 
 def _text_for_embed(t: dict) -> str:
     """ 
@@ -44,51 +48,46 @@ def _openai_embeds(texts: List[str], model: str = "text-embedding-3-small"):
     Get embeddings for a list of texts using OpenAI API.
     """
     
+    openai = optional_import("openai")
     if openai is None:
         raise RuntimeError("openai package not available or not configured")
     
     res = openai.Embedding.create(model=model, input=texts)
     return [r["embedding"] for r in res["data"]]
 
-def _sbert_embeds(texts: List[str], model: str = "all-MiniLM-L6-v2"):
-    """ 
-    Get embeddings for a list of texts using SentenceTransformer.
+@lru_cache(maxsize=4)
+def _sbert_model(model: str):
     """
-    
+    Load a SentenceTransformer once per process and keep it warm.
+    """
+
+    SentenceTransformer = optional_import("sentence_transformers", "SentenceTransformer")
     if SentenceTransformer is None:
         raise RuntimeError("sentence-transformers not installed")
-    
-    m = SentenceTransformer(model)
-    return m.encode(texts, show_progress_bar=False).tolist()
 
-def run_embeddings(s: State, persist_dir: str = "data/vectorstore", collection_name: str = "transactions",
-                   model: str = None, batch_size: int = 64) -> State:
+    return SentenceTransformer(model)
+
+def _sbert_embeds(texts: List[str], model: str = "all-MiniLM-L6-v2"):
     """ 
-    Run the embedding process on extracted transactions and store them in the vector store.
+    Get embeddings for a list of texts using SentenceTransformer.
     """
     
-    arr = getattr(s, "extracted", []) or []
-    if not arr:
-        s.embedded_count = 0
-        return s
+    return _sbert_model(model).encode(texts, show_progress_bar=False).tolist()
 
-    vs = VectorStore(persist_dir=persist_dir, collection_name=collection_name)
+def _embed_rows(vs, rows: List[Tuple[str, dict]], model: Optional[str], batch_size: int) -> List[str]:
+    """
+    Embed (ID, row) pairs in batches and upsert them into vs; returns the IDs.
+    """
 
-    use_openai = False
-    if model and model.startswith("text-") and openai is not None and os.getenv("OPENAI_API_KEY"):
-        use_openai = True
+    load_env()
+    use_openai = bool(model and model.startswith("text-") and os.getenv("OPENAI_API_KEY")
+                      and optional_import("openai") is not None)
 
     texts = []
     ids = []
     metas = []
-    docs = []
 
-    for i, t in enumerate(arr):
-        if not validate(t):
-            continue
-        
-        tid = _make_id(t.get("file", "nofile"), t.get("page"), i)
-        txt = _text_for_embed(t)
+    for tid, t in rows:
         meta = {
             "txn_id": tid,
             "date": t.get("date"),
@@ -100,16 +99,15 @@ def run_embeddings(s: State, persist_dir: str = "data/vectorstore", collection_n
             "source": t.get("source"),
             "desc": t.get("desc")
         }
+        day = _day_int(t.get("date"))
+        if day is not None:
+            meta["day"] = day
         ids.append(tid)
-        texts.append(txt)
+        texts.append(_text_for_embed(t))
         metas.append(meta)
-        docs.append(txt)
 
-    total = len(texts)
-    emb_count = 0
-    
-    for st in range(0, total, batch_size):
-        ed = min(total, st + batch_size)
+    for st in range(0, len(texts), batch_size):
+        ed = min(len(texts), st + batch_size)
         batch_txt = texts[st:ed]
         
         if use_openai:
@@ -117,11 +115,75 @@ def run_embeddings(s: State, persist_dir: str = "data/vectorstore", collection_n
         else:
             emb = _sbert_embeds(batch_txt, model=(model or "all-MiniLM-L6-v2"))
         
-        vs.upsert(ids=ids[st:ed], embs=emb, docs=docs[st:ed], metadatas=metas[st:ed])
-        emb_count += len(batch_txt)
+        vs.upsert(ids=ids[st:ed], embs=emb, docs=batch_txt, metadatas=metas[st:ed])
+
+    return ids
+
+def run_embeddings(s: State, persist_dir: str = "data/vectorstore", collection_name: str = "transactions",
+                   model: str = None, batch_size: int = 64,
+                   only_files: Optional[Iterable[str]] = None,
+                   drop_files: Optional[Iterable[str]] = None,
+                   sync_files: Optional[Iterable[str]] = None,
+                   tenant: Optional[str] = None, partition_by_month: bool = False) -> State:
+    """ 
+    Run the embedding process on extracted transactions and store them in the vector store.
 
-    s.vector_store_info = {"persist_dir": persist_dir, "collection_name": collection_name}
-    s.embedded_count = emb_count
+    only_files limits embedding to rows from those files; drop_files deletes
+    those files' existing vectors first (modified or deleted inputs). IDs
+    are the rows' txn_id, so rows of untouched files keep their IDs.
+    sync_files (untouched inputs) reconciles those files' stored IDs with
+    their current rows: vectors of rows dedup now drops are deleted and
+    rows it no longer drops are embedded, even outside only_files.
+    tenant / partition_by_month store the rows in per-tenant, per-month
+    collections (see vector_db_node.PartitionedStore).
+    """
+    
+    arr = getattr(s, "extracted", []) or []
+    drop_files = list(drop_files or [])
+    if not arr and not drop_files:
+        s.embedded_count = 0
+        return s
+
+    vs = open_store(persist_dir, collection_name, tenant=tenant, partition_by_month=partition_by_month)
+    if drop_files:
+        vs.delete_files(drop_files)
+
+    only = set(only_files) if only_files is not None else None
+    missing = set()
+    sync = sorted(set(sync_files or []))
+    if sync:
+        stored = vs.file_ids(sync)
+        want = {tid for tid, t in _numbered(arr) if t.get("file", "nofile") in sync}
+        vs.delete_ids(sorted(stored - want))
+        missing = want - stored
+
+    rows = [(tid, t) for tid, t in _numbered(arr)
+            if only is None or t.get("file", "nofile") in only or tid in missing]
+    ids = _embed_rows(vs, rows, model, batch_size)
+
+    s.vector_store_info = {"persist_dir": persist_dir, "collection_name": collection_name,
+                           "tenant": tenant, "partition_by_month": partition_by_month}
+    s.embedded_count = len(ids)
     s.indexed_ids = ids
     
     return s
+
+def run_vector_gc(s: State, persist_dir: str = "data/vectorstore", collection_name: str = "transactions",
+                  tenant: Optional[str] = None, partition_by_month: bool = False,
+                  compact: bool = True, batch_size: int = 500, model: str = None) -> State:
+    """
+    Delete vectors whose IDs no longer match any extracted row (removed
+    inputs or rows) or whose stored document is not that row's text, compact
+    the store, then embed the rows left without a vector; s.vector_gc gets
+    the before/after report from VectorStore.maintain plus "reembedded".
+    """
+
+    arr = getattr(s, "extracted", []) or []
+    vs = open_store(persist_dir, collection_name, tenant=tenant, partition_by_month=partition_by_month)
+    s.vector_gc = vs.maintain(expected_ids(arr), batch_size=batch_size, compact=compact,
+                              docs={tid: _text_for_embed(t) for tid, t in _numbered(arr)})
+    stored = set().union(*vs.stored_ids().values())
+    missing = [(tid, t) for tid, t in _numbered(arr) if tid not in stored]
+    s.vector_gc["reembedded"] = len(_embed_rows(vs, missing, model, 64))
+
+    return s
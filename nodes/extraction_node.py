@@ -1,30 +1,62 @@
 import re
-from pathlib import Path
-from pypdf import PdfReader
 from state.input_state import State
 from typing import List, Dict, Optional
 from tools.validator import validate
+from tools.txn_ids import assign_txn_ids
+from nodes.cleaning_node import build_records
 
 _DATE_RE_GENERIC = re.compile(
     r'(\d{4}-\d{2}-\d{2})|(\d{2}-[A-Za-z]{3}-\d{4})|(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
     re.IGNORECASE,
 )
-_SMS_MSG_RE = re.compile(r'(\[\d{4}-\d{2}-\d{2}[^]]*\].*?)(?=(\[\d{4}-\d{2}-\d{2})|$)', re.S)
-_BANK_ROW_RE = re.compile(r'^\s*(\d{2}-[A-Za-z]{3}-\d{4})\s*\|\s*(.+)$', re.MULTILINE)
 _AMOUNT_RE = re.compile(
-    r'(?:(?:[$₹£€])\s*\d{1,3}(?:[,0-9]{3})*(?:\.\d{2})?)|(?:\d+\.\d{2})'
+    r'(?:(?:[$₹£€])\s*\d{1,3}(?:,?\d{3})*(?:\.\d{2})?)|(?:(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{2})'
 )
+_LOOSE_AMOUNT_RE = re.compile(r'[\d,]+\.\d{2}')
+_NON_NUMBER_RE = re.compile(r'[^\d\.\-]')
 _CURRENCY_SYMS = {'$': 'USD', '₹': 'INR', '£': 'GBP', '€': 'EUR'}
+_INR_RE = re.compile(r'\bINR\b', re.I)
+_USD_RE = re.compile(r'\bUSD\b', re.I)
+_MONTHS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
+
+# One anchored pattern for the three compact date layouts; the named group
+# that matched tells _normalize_date_token which layout it is.
+_DATE_TOKEN_RE = re.compile(
+    r'^(?:(?P<iso>\d{4}-\d{2}-\d{2})'
+    r'|(?P<dd>\d{2})-(?P<mon>[A-Za-z]{3})-(?P<yyyy>\d{4})'
+    r'|(?P<d>\d{1,2})[/-](?P<m>\d{1,2})[/-](?P<y>\d{2,4}))$'
+)
+_DATE_WORDS_RE = re.compile(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+(\d{1,2}),?\s+(\d{4})', re.I)
+
+# Balance / credit / debit markers of a bank column, found in a single scan.
+# The alternatives start on disjoint characters, so one finditer sees every
+# marker the separate searches would.
+_COL_FLAGS_RE = re.compile(
+    r'\b(?P<bal>BAL|BALANCE|AVAIL|AVAILBAL)\b|(?P<cr>\bCR\b|\bCREDIT\b|\+\b)|(?P<dr>\bDR\b|\bDEBIT\b|-)',
+    re.I,
+)
+
+# Money coming in; such SMS rows are flagged "credit" unless they also say debit.
+_SMS_CREDIT_RE = re.compile(r'\b(?:credited|received|refund(?:ed)?|deposit(?:ed)?)\b', re.I)
+_SMS_DEBIT_RE = re.compile(r'\bdebit(?:ed)?\b', re.I)
+
+_SMS_HEAD_RE = re.compile(r'^\[(\d{4}-\d{2}-\d{2})[^\]]*\]\s*(.*)$', re.S)
+_SMS_TXN_RE = re.compile(
+    r'\b(debit|paid|payment|charge|credited|withdrawn|transfer|spent|purchase|order total|total|fare|bill|deducted)\b',
+    re.I,
+)
+# Zero-width lookahead so every keyword position is reported, even inside an
+# earlier candidate's greedy vendor capture; the keyword order is the priority.
+_VENDOR_KWS = ('to', 'at', 'for', 'via')
+_VENDOR_RE = re.compile(r'(?=\b(to|at|for|via)\s+([A-Za-z0-9_\'\-\.\s&]+))', re.I)
+_VENDOR_FROM_RE = re.compile(r'from[:\s]+([A-Za-z0-9_\'\-\.\s&]+)', re.I)
 
 def _month_to_num(mon_str: str) -> int:
     """ 
     Convert 3-letter month abbreviation to month number.
     """
     
-    ms = mon_str[:3].lower()
-    mapping = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
-    
-    return mapping.get(ms, 0)
+    return _MONTHS.get(mon_str[:3].lower(), 0)
 
 def _normalize_date_token(tok: str) -> Optional[str]:
     """
@@ -35,26 +67,23 @@ def _normalize_date_token(tok: str) -> Optional[str]:
         return None
     
     tok = tok.strip()
-    m = re.match(r'^\d{4}-\d{2}-\d{2}$', tok)
+    m = _DATE_TOKEN_RE.match(tok)
     if m:
-        return tok
+        if m.group('iso'):
+            return tok
 
-    m = re.match(r'^(\d{2})-([A-Za-z]{3})-(\d{4})$', tok)
-    if m:
-        d, mon, y = m.groups()
-        monn = _month_to_num(mon)
-        if monn:
-            return f'{int(y):04d}-{monn:02d}-{int(d):02d}'
+        if m.group('dd'):
+            monn = _month_to_num(m.group('mon'))
+            if monn:
+                return f"{int(m.group('yyyy')):04d}-{monn:02d}-{int(m.group('dd')):02d}"
+        else:
+            y = m.group('y')
+            if len(y) == 2:
+                y = '20' + y
 
-    m = re.match(r'^(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})$', tok)
-    if m:
-        d, mo, y = m.groups()
-        if len(y) == 2:
-            y = '20' + y
-        
-        return f'{int(y):04d}-{int(mo):02d}-{int(d):02d}'
+            return f"{int(y):04d}-{int(m.group('m')):02d}-{int(m.group('d')):02d}"
 
-    m = re.search(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+(\d{1,2}),?\s+(\d{4})', tok, re.I)
+    m = _DATE_WORDS_RE.search(tok)
     if m:
         mon_str, d, y = m.groups()
         monn = _month_to_num(mon_str)
@@ -71,8 +100,7 @@ def _clean_number_token(tok: str) -> Optional[float]:
     if not tok:
         return None
     
-    t = tok.strip()
-    t2 = re.sub(r'[^\d\.\-]', '', t)
+    t2 = _NON_NUMBER_RE.sub('', tok.strip())
     if not t2:
         return None
     
@@ -90,16 +118,39 @@ def _guess_currency(text: str) -> Optional[str]:
         if s in text:
             return code
 
-    if re.search(r'\bINR\b', text, re.I): 
+    if _INR_RE.search(text): 
         return 'INR'
-    if re.search(r'\bUSD\b', text, re.I): 
+    if _USD_RE.search(text): 
         return 'USD'
     
     return None
 
+def _classify_col(c: str):
+    """
+    Scan a bank column once: returns (is_balance, is_credit, is_debit).
+    """
+
+    bal = cr = dr = False
+    for m in _COL_FLAGS_RE.finditer(c):
+        k = m.lastgroup
+        if k == 'bal':
+            bal = True
+        elif k == 'cr':
+            cr = True
+        else:
+            dr = True
+
+    return bal, cr, dr
+
+def _cell_amount(c: str) -> Optional[float]:
+    m = _AMOUNT_RE.search(c) or _LOOSE_AMOUNT_RE.search(c)
+
+    return _clean_number_token(m.group(0)) if m else None
+
 def _parse_bank_row(line: str) -> Optional[Dict]:
     """
     Parse a single bank statement row line (robust to trailing balance column).
+    "credit" is True when the amount was paid in rather than out.
     """
     
     cols = [c.strip() for c in line.split('|')]
@@ -110,65 +161,51 @@ def _parse_bank_row(line: str) -> Optional[Dict]:
     date = _normalize_date_token(date_tok)
     desc = cols[1] if len(cols) > 1 else None
 
+    debit = credit = None
+    amount = None
+
+    # DATE | DESCRIPTION | DEBIT | CREDIT | BALANCE with unmarked cells: the
+    # column a number sits in decides, and a row with only a balance (an
+    # opening balance) has no amount.
+    positional = len(cols) == 5 and not any(_COL_FLAGS_RE.search(c) for c in cols[2:])
+    if positional:
+        debit = _cell_amount(cols[2]) if cols[2] else None
+        if debit is None and cols[3]:
+            credit = _cell_amount(cols[3])
+
+    # (value, is_credit, is_debit) for each amount-bearing non-balance column
     numeric_cols = []
-    for idx, c in enumerate(cols[2:], start=2):
-        if re.search(r'\b(BAL|BALANCE|AVAIL|AVAILBAL)\b', c, re.I):
+    for c in cols[2:] if not positional else ():
+        if not c:
+            continue
+
+        bal, cr, dr = _classify_col(c)
+        if bal:
             continue
         
-        m = _AMOUNT_RE.search(c)
-        if m:
-            val = _clean_number_token(m.group(0))
-            if val is not None:
-                numeric_cols.append((idx, val, c))
+        val = _cell_amount(c)
+        if val is not None:
+            numeric_cols.append((val, cr, dr))
+
+    if len(numeric_cols) == 1:
+        val, cr, _ = numeric_cols[0]
+        if cr:
+            credit = val
         else:
-            m2 = re.search(r'[\d,]+\.\d{2}', c)
-            if m2:
-                val = _clean_number_token(m2.group(0))
-                if val is not None:
-                    numeric_cols.append((idx, val, c))
-
-    debit = credit = None
-    amount = None
+            debit = val
+    elif numeric_cols:
+        credit = next((val for val, cr, _ in numeric_cols if cr), None)
 
-    if not numeric_cols:
-        m = _AMOUNT_RE.search(line)
-        if m:
-            amount = _clean_number_token(m.group(0))
-    else:
-        if len(numeric_cols) == 1:
-            _, val, coltxt = numeric_cols[0]
-            if re.search(r'\bCR\b|\bCREDIT\b|\+\b', coltxt, re.I):
-                credit = val
-            else:
-                debit = val
-        else:
-            found = False
-            for idx, val, coltxt in numeric_cols:
-                if re.search(r'\bCR\b|\bCREDIT\b|\+\b', coltxt, re.I):
-                    credit = val
-                    found = True
-                    break
-            
-            if not found:
-                if len(numeric_cols) >= 2:
-                    candidates = numeric_cols[:-1]
-                    for idx, val, coltxt in candidates:
-                        if re.search(r'\bDR\b|\bDEBIT\b|\-', coltxt, re.I):
-                            debit = val
-                            break
-                    
-                    if debit is None:
-                        idx_sel, val_sel, _ = candidates[-1]
-                        debit = val_sel
-                else:
-                    debit = numeric_cols[0][1]
+        if credit is None:
+            candidates = numeric_cols[:-1]
+            debit = next((val for val, _, dr in candidates if dr), candidates[-1][0])
 
     if debit is not None:
         amount = debit
     elif credit is not None:
         amount = credit
 
-    if amount is None:
+    if amount is None and not positional:
         m = _AMOUNT_RE.search(line)
         if m:
             amount = _clean_number_token(m.group(0))
@@ -181,9 +218,25 @@ def _parse_bank_row(line: str) -> Optional[Dict]:
         "amount": amount,
         "currency": currency,
         "desc": line.strip(),
-        "source": "bank"
+        "source": "bank",
+        "credit": debit is None and credit is not None
     }
 
+def _sms_vendor(body: str) -> Optional[str]:
+    """
+    Vendor after the highest-priority keyword (to > at > for > via), leftmost occurrence.
+    """
+
+    best = None
+    for m in _VENDOR_RE.finditer(body):
+        rank = _VENDOR_KWS.index(m.group(1).lower())
+        if best is None or rank < best[0]:
+            best = (rank, m.group(2))
+            if rank == 0:
+                break
+
+    return best[1].strip(" .,-") if best else None
+
 def _parse_sms_message(msg: str) -> Optional[Dict]:
     """
     Parse a single SMS message text.
@@ -193,25 +246,28 @@ def _parse_sms_message(msg: str) -> Optional[Dict]:
         return None
     
     text = msg.strip()
-    m = re.match(r'^\[(\d{4}-\d{2}-\d{2})[^\]]*\]\s*(.*)$', text, re.S)
+    m = _SMS_HEAD_RE.match(text)
     date = None
     body = text
     
     if m:
         date = _normalize_date_token(m.group(1))
         body = m.group(2).strip()
-    if not re.search(r'\b(debit|paid|payment|charge|credited|withdrawn|transfer|spent|purchase|order total|total|fare|bill|deducted)\b', body, re.I):
+    if not _SMS_TXN_RE.search(body):
         return None
 
-    money_iter = list(re.finditer(_AMOUNT_RE, body))
     amount = None
     currency = None
+    first = None
     
-    for mm in money_iter:
+    for mm in _AMOUNT_RE.finditer(body):
+        if first is None:
+            first = mm
+
         span_start, span_end = mm.span()
         context = body[max(0, span_start-10): min(len(body), span_end+10)].lower()
         
-        if 'bal' in context or 'balance' in context:
+        if 'bal' in context:
             continue
         
         amount = _clean_number_token(mm.group(0))
@@ -219,21 +275,15 @@ def _parse_sms_message(msg: str) -> Optional[Dict]:
         
         break
 
-    if amount is None and money_iter:
-        amount = _clean_number_token(money_iter[0].group(0))
-        currency = _guess_currency(money_iter[0].group(0))
+    if amount is None and first is not None:
+        amount = _clean_number_token(first.group(0))
+        currency = _guess_currency(first.group(0))
     if amount is None:
         return None
 
-    vendor = None
-    for kw in (r'\bto\s+([A-Za-z0-9_\'\-\.\s&]+)', r'\bat\s+([A-Za-z0-9_\'\-\.\s&]+)', r'\bfor\s+([A-Za-z0-9_\'\-\.\s&]+)', r'\bvia\s+([A-Za-z0-9_\'\-\.\s&]+)'):
-        mm = re.search(kw, body, re.I)
-        if mm:
-            vendor = mm.group(1).strip(" .,-")
-            break
-    
+    vendor = _sms_vendor(body)
     if not vendor:
-        mm = re.search(r'from[:\s]+([A-Za-z0-9_\'\-\.\s&]+)', text, re.I)
+        mm = _VENDOR_FROM_RE.search(text)
         if mm:
             vendor = mm.group(1).strip(" .,-")
 
@@ -243,102 +293,89 @@ def _parse_sms_message(msg: str) -> Optional[Dict]:
         "amount": amount,
         "currency": currency if currency else 'USD',
         "desc": body if len(body) < 2000 else body[:2000] + '...',
-        "source": "sms"
+        "source": "sms",
+        "credit": bool(_SMS_CREDIT_RE.search(body)) and not _SMS_DEBIT_RE.search(body)
     }
 
-def run_extract(s: State) -> State:
+def _parse_record(rec: Dict) -> Optional[Dict]:
     """
-    Extract structured transaction data from OCR output text.
+    Parse one cleaning record by kind; a "block" is tried as a bank row, then as an SMS.
     """
-    
-    extracted: List[Dict] = []
-    ocr_out = getattr(s, 'ocr_output', {}) or {}
-
-    for fn, txt in ocr_out.items():
-        if not isinstance(txt, str):
-            txt = str(txt or '')
-
-        p = Path(fn)
-        if p.suffix.lower() == '.pdf':
-            try:
-                reader = PdfReader(str(p))
-                for i, page in enumerate(reader.pages):
-                    page_text = page.extract_text() or ""
-                    page_text = page_text.strip()
-                    
-                    if not page_text:
-                        continue
-
-                    rows = re.findall(_BANK_ROW_RE, page_text)
-                    if rows:
-                        for match in re.finditer(r'^\s*\d{2}-[A-Za-z]{3}-\d{4}.*$', page_text, re.MULTILINE):
-                            row_line = match.group(0)
-                            parsed = _parse_bank_row(row_line)
-                            
-                            if parsed and validate(parsed):
-                                parsed['file'] = fn
-                                parsed['page'] = i+1
-                                extracted.append(parsed)
-                        
-                        continue
-
-                    msgs = re.findall(_SMS_MSG_RE, page_text)
-                    if msgs:
-                        for tup in msgs:
-                            msg = tup[0]
-                            parsed = _parse_sms_message(msg)
-                            
-                            if parsed and validate(parsed):
-                                parsed['file'] = fn
-                                parsed['page'] = i+1
-                                extracted.append(parsed)
-                        
-                        continue
-
-                    parsed = _parse_bank_row(page_text) or _parse_sms_message(page_text)
-                    if parsed and validate(parsed):
-                        parsed['file'] = fn
-                        parsed['page'] = i+1
-                        extracted.append(parsed)
-                
-                continue
-            except Exception:
-                pass
-
-        fname_lower = fn.lower()
-        if 'sms' in fname_lower or 'msg' in fname_lower:
-            msgs = [m[0] for m in re.findall(_SMS_MSG_RE, txt)]
-            if not msgs:
-                msgs = [b.strip() for b in re.split(r'\n\s*\n', txt) if b.strip()]
-            for msg in msgs:
-                parsed = _parse_sms_message(msg)
-                if parsed and validate(parsed):
-                    parsed['file'] = fn
-                    parsed['page'] = None
-                    extracted.append(parsed)
-            
-            continue
 
-        rows = [m.group(0) for m in re.finditer(r'^\s*\d{2}-[A-Za-z]{3}-\d{4}.*$', txt, re.MULTILINE)]
-        if rows:
-            for row in rows:
-                parsed = _parse_bank_row(row)
-                if parsed and validate(parsed):
-                    parsed['file'] = fn
-                    parsed['page'] = None
-                    extracted.append(parsed)
+    kind, text = rec.get("kind"), rec.get("text") or ""
+    if kind == "bank":
+        return _parse_bank_row(text)
+    if kind == "sms":
+        return _parse_sms_message(text)
 
-            continue
+    return _parse_bank_row(text) or _parse_sms_message(text)
+
+def _extract_records(records: List[Dict]) -> List[Dict]:
+    """
+    Parse records into validated rows carrying the record's file and page.
+    """
+
+    out: List[Dict] = []
+    for rec in records:
+        parsed = _parse_record(rec)
+        if parsed and validate(parsed):
+            parsed['file'] = rec.get("file")
+            parsed['page'] = rec.get("page")
+            out.append(parsed)
+
+    return out
+
+def _extract_parallel(records: List[Dict], workers: int, pages_per_task: int) -> List[Dict]:
+    """
+    Shard records by file (and PDFs by page range) across a process pool.
+    Shards are returned in submission order, matching the serial path.
+    """
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    units: List[List[Dict]] = []
+    last = None
+    for rec in records:
+        page = rec.get("page")
+        key = (rec.get("file"), None if page is None else (page - 1) // pages_per_task)
+        if key != last:
+            units.append([])
+            last = key
+        units[-1].append(rec)
 
-        chunks = [b.strip() for b in re.split(r'\n\s*\n', txt) if b.strip()]
-        for ch in chunks:
-            parsed = _parse_bank_row(ch) or _parse_sms_message(ch)
-            if parsed and validate(parsed):
-                parsed['file'] = fn
-                parsed['page'] = None
-                extracted.append(parsed)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return [r for rows in ex.map(_extract_records, units) for r in rows]
+
+def run_extract(s: State, workers: Optional[int] = None, pages_per_task: int = 8,
+                snapshot_path: Optional[str] = None) -> State:
+    """
+    Extract structured transaction data from the cleaning stage's records.
+
+    Uses s.clean_records when clean_text has run, otherwise splits
+    s.ocr_output / s.ocr_pages itself, so text is only split once either way.
+    workers > 1 spreads files and PDF page ranges over a process pool;
+    rows come back in the same order and with the same file/page as the
+    serial path. Every row gets a "txn_id" (tools.txn_ids) numbering it
+    within its file. snapshot_path also writes the rows as a Parquet /
+    Arrow IPC snapshot (see tools.snapshot.load_snapshot).
+    """
+    
+    records = getattr(s, 'clean_records', None)
+    if not records:
+        records = build_records(getattr(s, 'ocr_output', {}) or {}, getattr(s, 'ocr_pages', None))
+
+    if workers and workers > 1 and records:
+        extracted = _extract_parallel(records, workers, max(1, pages_per_task))
+    else:
+        extracted = _extract_records(records)
+    assign_txn_ids(extracted)
 
     s.extracted = extracted
     s.extracted_count = len(extracted)
+
+    if snapshot_path:
+        from tools.snapshot import write_snapshot
+
+        write_snapshot(extracted, snapshot_path)
     
     return s
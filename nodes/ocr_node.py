@@ -1,20 +1,25 @@
 from pathlib import Path
-from tools.ocr_tool import ocr_file
+from tools.ocr_tool import ocr_file, ocr_pages
 from state.input_state import State
 
 def run_ocr(s: State):
     """ 
     Run OCR on all raw files in the State object. 
+    PDF page texts are also kept in s.ocr_pages so later stages never re-read the PDF.
     """
     
     out = {}
+    pages = {}
     
     try:
         for f in getattr(s, "raw_files", []):
             try:
                 ext = Path(f).suffix.lower()
                 
-                if ext in ['.pdf', '.png', '.jpg', '.jpeg', '.tiff']:
+                if ext == '.pdf':
+                    pages[f] = ocr_pages(f)
+                    out[f] = "\n".join(pages[f])
+                elif ext in ['.png', '.jpg', '.jpeg', '.tiff']:
                     out[f] = ocr_file(f)
                 else:
                     out[f] = Path(f).read_text(encoding='utf-8', errors='ignore')
@@ -22,8 +27,10 @@ def run_ocr(s: State):
                 out[f] = ""  
         
         s.ocr_output = out
+        s.ocr_pages = pages
     
     except Exception as e:
         s.ocr_output = out
+        s.ocr_pages = pages
     
     return s
@@ -1,49 +1,20 @@
 import os
+import re
 import json
+import asyncio
+import inspect
 from pathlib import Path
-from typing import List, Dict, Any
-from dotenv import load_dotenv
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable
 from state.input_state import State
-from .retrieval_node import run_retrieval
-
-load_dotenv()
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
+from tools.lazy_import import optional_import, load_env
+from tools.context_packer import pack_context
+from .retrieval_node import run_retrieval, embed_query
 
 PROMPT_PATH = Path(__file__).resolve().parents[1] / "prompts" / "rag_prompt.txt"
 SYSTEM_PROMPT = PROMPT_PATH.read_text(encoding="utf-8").strip() if PROMPT_PATH.exists() else (
     "You are an assistant answering questions about financial transactions. Use only the provided CONTEXT to answer."
 )
 
-def _build_context(retrieved: List[Dict[str, Any]], max_chars: int = 3000) -> str:
-    """ 
-    Builds context string from retrieved documents, limited to max_chars.
-    """
-    
-    parts = []
-    total = 0
-    for r in retrieved:
-        meta = r.get("meta") or {}
-        doc = r.get("doc") or meta.get("desc") or ""
-        block = (
-            f"TXN_ID: {meta.get('txn_id','?')}\n"
-            f"DATE: {meta.get('date')}\n"
-            f"VENDOR: {meta.get('vendor')}\n"
-            f"AMOUNT: {meta.get('amount')}\n"
-            f"SOURCE: {meta.get('file')} (page {meta.get('page')})\n"
-            f"DESC: {doc}\n"
-        )
-        
-        if total + len(block) > max_chars:
-            break
-        
-        parts.append(block)
-        total += len(block)
-    
-    return "\n\n---\n\n".join(parts)
-
 def _make_messages(query: str, context: str) -> List[Dict[str, str]]:
     """ 
     Constructs messages for OpenAI chat completion.
@@ -84,46 +55,13 @@ def _extract_text_from_response(resp) -> str:
     
     return str(resp)
 
-def run_rag(
-    s: State,
-    query: str,
-    top_k: int = 6,
-    model: str = "gpt-4.1-mini",
-    persist_dir: str = "data/vectorstore",
-    collection_name: str = "transactions",
-    temperature: float = 0.0,
-) -> Dict[str, Any]:
+def _build_result(s: State, query: str, out_text: str, retrieved: List[Dict[str, Any]],
+                  packed: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Runs a RAG (Retrieval-Augmented Generation) process:
+    Parse the LLM reply (JSON, or cited lines as a fallback), map its
+    citations back to retrieved rows and record s.last_rag.
     """
 
-    retrieved = run_retrieval(
-        s,
-        query,
-        top_k=top_k,
-        persist_dir=persist_dir,
-        collection_name=collection_name,
-        model=None,
-    )
-    context = _build_context(retrieved)
-    messages = _make_messages(query, context)
-
-    if OpenAI is None:
-        raise RuntimeError("openai package (v1+) not available. Install via `pip install openai`.")
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set. Set it to use run_rag().")
-
-    client = OpenAI(api_key=api_key)
-    resp = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=600,
-    )
-
-    out_text = _extract_text_from_response(resp)
     cited_ids: List[str] = []
     parsed_json = None
     
@@ -166,6 +104,7 @@ def run_rag(
         "fallback_sources": fallback,
         "retrieved_count": len(retrieved),
         "cited_ids": cited_ids,
+        "context": packed,
     }
 
     s.last_rag = {
@@ -173,6 +112,317 @@ def run_rag(
         "retrieved": len(retrieved),
         "sources_returned": len(sources),
         "cited_ids": cited_ids,
+        "context_tokens": packed["used"],
     }
 
     return result
+
+def make_client() -> Any:
+    """
+    OpenAI client for run_rag; raises if openai or OPENAI_API_KEY is missing.
+    """
+
+    OpenAI = optional_import("openai", "OpenAI")
+    if OpenAI is None:
+        raise RuntimeError("openai package (v1+) not available. Install via `pip install openai`.")
+
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not set. Set it to use run_rag().")
+
+    return OpenAI(api_key=api_key)
+
+def _prepare(s: State, query: str, top_k: int, model: str, persist_dir: str, collection_name: str,
+             vs: Optional[Any], context_tokens: int, cache: Optional[Any],
+             date_from: Optional[str] = None, date_to: Optional[str] = None,
+             candidates: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Everything before the LLM call: the answer-cache lookup, then retrieval
+    and context packing. Returns {"hit": cached result} or the retrieved
+    rows, packed-context report, messages and the cache key parts.
+    """
+
+    emb = version = tenant = None
+    # Answers for different date ranges or candidate pools must not be served for each other.
+    extra = [x for x in (date_from, date_to, candidates) if x]
+    cache_model = "|".join([model, date_from or "", date_to or "", str(candidates or "")]) if extra else model
+    if cache is not None:
+        from .vector_db_node import VectorStore
+
+        if vs is None:
+            vs = VectorStore(persist_dir=persist_dir, collection_name=collection_name)
+        emb = embed_query(query)
+        version, tenant = vs.version(), vs.collection_name
+        hit = cache.get(emb, version, cache_model, top_k, tenant=tenant)
+        if hit is not None:
+            s.last_rag = {
+                "query": query,
+                "retrieved": hit.get("retrieved_count", 0),
+                "sources_returned": len(hit.get("sources") or []),
+                "cited_ids": hit.get("cited_ids") or [],
+                "context_tokens": 0,
+                "cached": True,
+            }
+
+            return {"hit": dict(hit, cached=True)}
+
+    retrieved = run_retrieval(
+        s,
+        query,
+        top_k=top_k,
+        persist_dir=persist_dir,
+        collection_name=collection_name,
+        model=None,
+        vs=vs,
+        emb=emb,
+        date_from=date_from,
+        date_to=date_to,
+        candidates=candidates,
+    )
+    context, packed = pack_context(retrieved, token_budget=context_tokens, model=model)
+
+    return {"retrieved": retrieved, "packed": packed, "messages": _make_messages(query, context),
+            "emb": emb, "version": version, "cache_model": cache_model, "cache_tenant": tenant}
+
+def run_rag(
+    s: State,
+    query: str,
+    top_k: int = 6,
+    model: str = "gpt-4.1-mini",
+    persist_dir: str = "data/vectorstore",
+    collection_name: str = "transactions",
+    temperature: float = 0.0,
+    vs: Optional[Any] = None,
+    client: Optional[Any] = None,
+    context_tokens: int = 800,
+    cache: Optional[Any] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    candidates: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Runs a RAG (Retrieval-Augmented Generation) process:
+    retrieve top_k transactions, ask the LLM, and map its citations back to rows.
+
+    vs (an open VectorStore) and client (an OpenAI-compatible client) let a
+    long-running caller reuse warm handles instead of opening new ones.
+    The retrieved rows are packed into a table of at most context_tokens
+    tokens (see tools.context_packer); result["context"] reports usage.
+
+    With cache (a tools.answer_cache.AnswerCache), a query similar enough to
+    one already answered against the same store version returns that answer
+    (with cached=True and its similarity) without retrieval or an LLM call.
+    date_from/date_to (ISO dates) restrict retrieval to that range.
+    candidates > top_k retrieves that many neighbours and reranks them down
+    to top_k (see run_retrieval), so the prompt stays small without losing recall.
+    """
+
+    prep = _prepare(s, query, top_k, model, persist_dir, collection_name, vs, context_tokens, cache,
+                    date_from, date_to, candidates)
+    if "hit" in prep:
+        return prep["hit"]
+
+    if client is None:
+        client = make_client()
+
+    resp = client.chat.completions.create(
+        model=model,
+        messages=prep["messages"],
+        temperature=temperature,
+        max_tokens=600,
+    )
+
+    out_text = _extract_text_from_response(resp)
+    result = _build_result(s, query, out_text, prep["retrieved"], prep["packed"])
+
+    if cache is not None:
+        cache.put(query, prep["emb"], prep["version"], prep["cache_model"], top_k, result, tenant=prep["cache_tenant"])
+
+    return result
+
+class _AnswerStream:
+    """
+    Pulls the "answer" string out of a JSON reply as it streams in, so a UI
+    can show the answer text rather than raw JSON. Replies that do not start
+    with "{" are passed through unchanged.
+    """
+
+    _ESC = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.mode = None  # None (undecided), "json", "text"
+        self.state = "seek"  # seek -> answer -> done
+
+    def feed(self, delta: str) -> str:
+        self.buf += delta
+        if self.mode is None:
+            head = self.buf.lstrip()
+            if not head:
+                return ""
+            self.mode = "json" if head.startswith("{") else "text"
+            if self.mode == "text":
+                return self.buf
+        elif self.mode == "text":
+            return delta
+
+        out = []
+        if self.state == "seek":
+            m = re.search(r'"answer"\s*:\s*"', self.buf)
+            if not m:
+                return ""
+            self.pos, self.state = m.end(), "answer"
+
+        while self.state == "answer" and self.pos < len(self.buf):
+            c = self.buf[self.pos]
+            if c == '"':
+                self.state = "done"
+            elif c == "\\":
+                nxt = self.buf[self.pos + 1:self.pos + 2]
+                if not nxt:
+                    break
+                if nxt == "u":
+                    code = self.buf[self.pos + 2:self.pos + 6]
+                    if len(code) < 4:
+                        break
+                    out.append(chr(int(code, 16)))
+                    self.pos += 4
+                else:
+                    out.append(self._ESC.get(nxt, nxt))
+                self.pos += 1
+            else:
+                out.append(c)
+            self.pos += 1
+
+        return "".join(out)
+
+def _delta_text(chunk: Any) -> str:
+    try:
+        return chunk.choices[0].delta.content or ""
+    except (AttributeError, IndexError, TypeError):
+        pass
+
+    try:
+        return chunk["choices"][0]["delta"].get("content") or ""
+    except Exception:
+        return ""
+
+async def _aclose(stream: Any) -> None:
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is not None:
+        res = close()
+        if inspect.isawaitable(res):
+            await res
+
+def make_async_client() -> Any:
+    """
+    AsyncOpenAI client for arun_rag; raises if openai or OPENAI_API_KEY is missing.
+    """
+
+    AsyncOpenAI = optional_import("openai", "AsyncOpenAI")
+    if AsyncOpenAI is None:
+        raise RuntimeError("openai package (v1+) not available. Install via `pip install openai`.")
+
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not set. Set it to use arun_rag().")
+
+    return AsyncOpenAI(api_key=api_key)
+
+async def astream_rag(
+    s: State,
+    query: str,
+    top_k: int = 6,
+    model: str = "gpt-4.1-mini",
+    persist_dir: str = "data/vectorstore",
+    collection_name: str = "transactions",
+    temperature: float = 0.0,
+    vs: Optional[Any] = None,
+    client: Optional[Any] = None,
+    context_tokens: int = 800,
+    cache: Optional[Any] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    candidates: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async run_rag that streams the reply. Yields {"type": "token", "text":
+    raw delta, "answer": answer-text delta} as the LLM streams, then one
+    {"type": "result", "result": ...} shaped like run_rag's return value.
+
+    The cache lookup, embedding, retrieval and context packing run in a worker
+    thread so the event loop stays free. client is an async OpenAI-compatible
+    client (AsyncOpenAI by default). Cancelling the consumer closes the stream.
+    """
+
+    prep = await asyncio.to_thread(_prepare, s, query, top_k, model, persist_dir, collection_name,
+                                   vs, context_tokens, cache, date_from, date_to, candidates)
+    if "hit" in prep:
+        hit = prep["hit"]
+        yield {"type": "token", "text": hit.get("answer", ""), "answer": hit.get("answer", "")}
+        yield {"type": "result", "result": hit}
+        return
+
+    if client is None:
+        client = make_async_client()
+
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=prep["messages"],
+        temperature=temperature,
+        max_tokens=600,
+        stream=True,
+    )
+
+    parts: List[str] = []
+    answer = _AnswerStream()
+    try:
+        async for chunk in stream:
+            delta = _delta_text(chunk)
+            if delta:
+                parts.append(delta)
+                yield {"type": "token", "text": delta, "answer": answer.feed(delta)}
+    finally:
+        await _aclose(stream)
+
+    result = _build_result(s, query, "".join(parts).strip(), prep["retrieved"], prep["packed"])
+    if cache is not None:
+        await asyncio.to_thread(cache.put, query, prep["emb"], prep["version"], prep["cache_model"], top_k, result,
+                                tenant=prep["cache_tenant"])
+
+    yield {"type": "result", "result": result}
+
+async def arun_rag(
+    s: State,
+    query: str,
+    top_k: int = 6,
+    model: str = "gpt-4.1-mini",
+    timeout: Optional[float] = None,
+    on_token: Optional[Callable[[str], Any]] = None,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Await a streamed RAG answer (see astream_rag; kwargs are passed through).
+
+    on_token (plain or async callable) receives each answer-text delta as it
+    arrives. timeout bounds the whole request in seconds and raises
+    asyncio.TimeoutError; on timeout or cancellation the LLM stream is closed.
+    A retrieval already running in its worker thread finishes in the
+    background, but its result is discarded.
+    """
+
+    async def _consume() -> Dict[str, Any]:
+        async for ev in astream_rag(s, query, top_k=top_k, model=model, **kwargs):
+            if ev["type"] == "result":
+                return ev["result"]
+            if on_token is not None and ev["answer"]:
+                res = on_token(ev["answer"])
+                if inspect.isawaitable(res):
+                    await res
+
+        raise RuntimeError("RAG stream ended without a result")
+
+    return await asyncio.wait_for(_consume(), timeout)
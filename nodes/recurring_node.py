@@ -0,0 +1,245 @@
+import datetime as dt
+from calendar import monthrange
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.vendor_norm import NON_ALNUM_RE, STOPWORDS
+from .dedup_node import _day
+from .budget_node import _default_map, _cat_from_vendor_kw
+
+# name -> (period in days, allowed deviation of a one-period gap in days)
+PERIODS = {
+    "weekly": (7.0, 1.5),
+    "biweekly": (14.0, 2.5),
+    "monthly": (30.44, 5.0),
+    "quarterly": (91.31, 12.0),
+    "yearly": (365.25, 20.0),
+}
+
+_EXTRA_STOP = STOPWORDS | {"BAL", "AVL", "CARD", "PURCHASE", "RECURRING", "SUB", "WWW", "NET", "CO", "LTD", "CORP"}
+
+def vendor_key(vendor: Optional[str]) -> str:
+    """
+    Normalised vendor for grouping: upper-case tokens without punctuation,
+    numbers (store / reference IDs) or filler words, so "STARBUCKS #404"
+    and "Starbucks 0131" group together and "NETFLIX.COM" matches "NETFLIX".
+    """
+
+    toks = [x for x in NON_ALNUM_RE.split((vendor or "").upper())
+            if x and not x.isdigit() and x not in _EXTRA_STOP]
+
+    return " ".join(toks)
+
+def _amount_clusters(rows: List[Tuple[float, int, int]], tol: float) -> List[List[Tuple[float, int, int]]]:
+    """
+    Split (amount, day, row index) tuples into runs of similar amounts: sorted
+    by amount, a new cluster starts when an amount is more than tol (relative)
+    above the cluster's first amount.
+    """
+
+    rows.sort()
+    out: List[List[Tuple[float, int, int]]] = []
+    for r in rows:
+        if out and r[0] <= out[-1][0][0] * (1 + tol) + 0.01:
+            out[-1].append(r)
+        else:
+            out.append([r])
+
+    return out
+
+def _median(xs: List[float]) -> float:
+    s = sorted(xs)
+    n = len(s)
+
+    return s[n // 2] if n % 2 else (s[n // 2 - 1] + s[n // 2]) / 2
+
+# Gaps of up to this many periods count as on period (skipped payments).
+_MAX_SKIP = 2
+
+def _periods_in(gap: int, days: float, dev: float) -> int:
+    """
+    k when gap is k whole periods (1 <= k <= _MAX_SKIP), else 0. Payment
+    days jitter around the schedule rather than drifting, so the allowed
+    deviation grows by only half of dev per skipped period.
+    """
+
+    k = round(gap / days)
+
+    return k if 1 <= k <= _MAX_SKIP and abs(gap - k * days) <= dev * (k + 1) / 2 else 0
+
+def _period(gaps: List[int]) -> Optional[str]:
+    """
+    The period the median gap between sorted payment dates matches. Failing
+    that (a skipped payment can pull the median between two periods), the
+    period most gaps are whole multiples of: at least one gap must be a
+    single period and more than half must fit, ties going to the longer
+    period (a monthly bill's gaps are also two fortnights).
+    """
+
+    med = _median(gaps)
+    for name, (days, dev) in PERIODS.items():
+        if abs(med - days) <= dev:
+            return name
+
+    best, score = None, 0.5
+    for name, (days, dev) in PERIODS.items():
+        ks = [_periods_in(g, days, dev) for g in gaps]
+        fit = sum(k > 0 for k in ks) / len(gaps)
+        if 1 in ks and (fit > score or best and fit == score):
+            best, score = name, fit
+
+    return best
+
+def _bin(day: int, period: str) -> int:
+    """
+    Index of the calendar period (week, fortnight, month, quarter, year) a day falls in.
+    """
+
+    if period == "weekly":
+        return day // 7
+    if period == "biweekly":
+        return day // 14
+
+    d = dt.date.fromordinal(day)
+    if period == "monthly":
+        return d.year * 12 + d.month - 1
+    if period == "quarterly":
+        return d.year * 4 + (d.month - 1) // 3
+
+    return d.year
+
+def _next_date(last: dt.date, period: str, days: float) -> dt.date:
+    if period in ("monthly", "quarterly", "yearly"):
+        months = {"monthly": 1, "quarterly": 3, "yearly": 12}[period]
+        y, m = divmod(last.month - 1 + months, 12)
+        y, m = last.year + y, m + 1
+
+        return dt.date(y, m, min(last.day, monthrange(y, m)[1]))
+
+    return last + dt.timedelta(days=round(days))
+
+def detect_recurring(txns: List[Dict[str, Any]], amount_tol: float = 0.1, min_occurrences: int = 3,
+                     min_regularity: float = 0.75, cmap: Optional[Dict[str, List[str]]] = None,
+                     vendor_map: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Find recurring payments (rent, subscriptions, memberships, bills).
+    Credits (rows flagged "credit", e.g. payroll) and refunds (negative
+    amounts) are not payments and are skipped.
+
+    Rows are grouped by vendor_key, each group is split into clusters of
+    amounts within amount_tol of each other, and _period picks a cluster's
+    period (PERIODS) from the gaps between its sorted payment dates: the
+    median gap, else the period most gaps are whole multiples of, so a
+    skipped payment does not hide a bill. The cluster
+    counts as recurring with at least min_occurrences payments (2 for
+    yearly) when its regularity reaches min_regularity and few gaps are
+    shorter than half a period (extra payments). Regularity is the better
+    of the share of gaps matching one to _MAX_SKIP periods and the share
+    of spanned calendar periods with a payment, so a bill
+    paid on the 18th one month and the 14th the next still counts.
+    Grouping is linear and the sorts make it O(n log n) overall; vendor
+    keys and dates are parsed once per distinct string.
+
+    Returns {"as_of", "count", "monthly_cost", "subscriptions": [...]}, most
+    expensive per year first; "active" subscriptions have not missed their
+    next expected date as of the latest transaction.
+    """
+
+    cmap = cmap or _default_map()
+    vendor_map = vendor_map or {}
+    keys: Dict[str, str] = {}
+    days: Dict[Any, Optional[int]] = {}
+    groups: Dict[str, List[Tuple[float, int, int]]] = defaultdict(list)
+    as_of = None
+
+    for i, t in enumerate(txns):
+        if t.get("credit"):
+            continue
+        try:
+            a = float(t.get("amount"))
+        except (TypeError, ValueError):
+            continue
+        d = t.get("date")
+        day = days.get(d, 0)
+        if day == 0:
+            day = days[d] = _day(d) if isinstance(d, str) else None
+        if day is None or a <= 0:
+            continue
+        raw = t.get("vendor") or t.get("desc") or ""
+        k = keys.get(raw)
+        if k is None:
+            k = keys[raw] = vendor_key(raw)
+        if not k:
+            continue
+        groups[k].append((a, day, i))
+        if as_of is None or day > as_of:
+            as_of = day
+
+    subs = []
+    for k, rows in groups.items():
+        if len(rows) < 2:
+            continue
+        for cl in _amount_clusters(rows, amount_tol):
+            dates = sorted({d for _, d, _ in cl})
+            if len(dates) < 2:
+                continue
+            gaps = [b - a for a, b in zip(dates, dates[1:])]
+            period = _period(gaps)
+            if period is None or len(dates) < (2 if period == "yearly" else min_occurrences):
+                continue
+            days_p, dev = PERIODS[period]
+            on_period = sum(_periods_in(g, days_p, dev) > 0 for g in gaps) / len(gaps)
+            bins = {_bin(d, period) for d in dates}
+            covered = len(bins) / (max(bins) - min(bins) + 1)
+            regular = max(on_period, covered)
+            extra = sum(g < days_p / 2 for g in gaps)
+            if regular < min_regularity or extra > max(1, 0.2 * len(gaps)):
+                continue
+            # Period length from the on-period gaps, each divided by the periods it spans.
+            spans = [(g, _periods_in(g, days_p, dev)) for g in gaps]
+            med = _median([g / k for g, k in spans if k] or gaps)
+
+            amounts = sorted(a for a, _, _ in cl)
+            amount = amounts[len(amounts) // 2]
+            vendor = Counter(txns[i].get("vendor") or txns[i].get("desc") for _, _, i in cl).most_common(1)[0][0]
+            last = dt.date.fromordinal(dates[-1])
+            nxt = _next_date(last, period, med)
+            per_year = 365.25 / PERIODS[period][0]
+            subs.append({
+                "vendor": vendor,
+                "vendor_key": k,
+                "category": vendor_map.get(vendor) or _cat_from_vendor_kw(vendor, cmap),
+                "amount": round(amount, 2),
+                "amount_range": [round(amounts[0], 2), round(amounts[-1], 2)],
+                "period": period,
+                "period_days": round(med, 1),
+                "occurrences": len(dates),
+                "regularity": round(regular, 3),
+                "first_date": dt.date.fromordinal(dates[0]).isoformat(),
+                "last_date": last.isoformat(),
+                "next_expected": nxt.isoformat(),
+                "active": nxt.toordinal() + PERIODS[period][1] >= as_of,
+                "annual_cost": round(amount * per_year, 2),
+            })
+
+    subs.sort(key=lambda r: (-r["annual_cost"], r["vendor_key"]))
+    active = [r for r in subs if r["active"]]
+
+    return {
+        "as_of": dt.date.fromordinal(as_of).isoformat() if as_of else None,
+        "count": len(subs),
+        "active_count": len(active),
+        "monthly_cost": round(sum(r["annual_cost"] for r in active) / 12, 2),
+        "subscriptions": subs,
+    }
+
+def run_recurring(s, amount_tol: float = 0.1, min_occurrences: int = 3, min_regularity: float = 0.75) -> Any:
+    """
+    Detect recurring payments in s.extracted into s.recurring_payments.
+    """
+
+    s.recurring_payments = detect_recurring(getattr(s, "extracted", []) or [], amount_tol=amount_tol,
+                                            min_occurrences=min_occurrences, min_regularity=min_regularity,
+                                            vendor_map=getattr(s, "budget_vendor_map", None))
+
+    return s
@@ -1,37 +1,86 @@
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from state.input_state import State
-from .vector_db_node import VectorStore
+from .vector_db_node import VectorStore, open_store
+from tools.lazy_import import optional_import, load_env
 from .embedding_node import _openai_embeds, _sbert_embeds
 
-try:
-    import openai
-except Exception:
-    openai = None
-
 def _query_emb(query: str, use_openai: bool = False, model: str = None):
     """ 
     Get embedding for a query string using specified model.
     """
     
     if use_openai:
-        if openai is None:
+        if optional_import("openai") is None:
             raise RuntimeError("openai package not available")
         
         return _openai_embeds([query], model=model)[0]
     
     return _sbert_embeds([query], model=(model or "all-MiniLM-L6-v2"))[0]
 
+def embed_query(query: str, model: str = None) -> List[float]:
+    """
+    Query embedding as run_retrieval computes it (OpenAI for "text-*" models
+    when a key is set, otherwise SentenceTransformer).
+    """
+
+    load_env()
+    use_openai = bool(model and model.startswith("text-") and os.getenv("OPENAI_API_KEY")
+                      and optional_import("openai") is not None)
+
+    return _query_emb(query, use_openai=use_openai, model=model)
+
 def run_retrieval(s: State, query: str, top_k: int = 5, persist_dir: str = "data/vectorstore",
-                  collection_name: str = "transactions", model: str = None) -> List[Dict[str, Any]]:
+                  collection_name: str = "transactions", model: str = None,
+                  vs: Optional[VectorStore] = None,
+                  emb: Optional[List[float]] = None,
+                  tenant: Optional[str] = None, partition_by_month: bool = False,
+                  date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  candidates: Optional[int] = None, rerank_method: str = "auto",
+                  budget_ms: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
     """
     Run retrieval on the vector store using a query string.
-    
+    Pass an open vs to reuse its handle (persist_dir/collection_name are then ignored),
+    and emb when the query embedding is already known. tenant/partition_by_month
+    select a partitioned store; date_from/date_to (ISO dates) limit the hits
+    to that range, searching only the overlapping month partitions.
+
+    candidates > top_k makes it a two-stage cascade: fetch that many vector
+    neighbours, re-score them with tools.reranker (rerank_method) and return
+    the best top_k. budget_ms {"vector": ms, "rerank": ms} bounds each stage:
+    a slow vector stage skips the rerank, a slow cross-encoder falls back
+    to lexical scoring. s.last_query["cascade"] reports stage timings.
     """
-    vs = VectorStore(persist_dir=persist_dir, collection_name=collection_name)
-    use_openai = bool(openai is not None and os.getenv("OPENAI_API_KEY") and model and model.startswith("text-"))
-    emb = _query_emb(query, use_openai=use_openai, model=model)
-    res = vs.query_by_embedding(emb, n_results=top_k)
+
+    t0 = time.perf_counter()
+    if vs is None:
+        vs = open_store(persist_dir, collection_name, tenant=tenant, partition_by_month=partition_by_month)
+    if emb is None:
+        emb = embed_query(query, model=model)
+
+    cascade = bool(candidates and candidates > top_k)
+    n = candidates if cascade else top_k
+    t1 = time.perf_counter()
+    if date_from or date_to:
+        res = vs.query_by_embedding(emb, n_results=n, date_from=date_from, date_to=date_to)
+    else:
+        res = vs.query_by_embedding(emb, n_results=n)
+    t2 = time.perf_counter()
     s.last_query = {"query": query, "results_count": len(res)}
+
+    if cascade:
+        budget_ms = budget_ms or {}
+        vector_ms = (t2 - t1) * 1000
+        report = {"embed_ms": round((t1 - t0) * 1000, 3), "vector_ms": round(vector_ms, 3), "candidates": len(res)}
+        if budget_ms.get("vector") is not None and vector_ms > budget_ms["vector"]:
+            res = res[:top_k]
+            report["rerank"] = {"method": "skipped", "fallback": "budget"}
+        else:
+            from tools.reranker import rerank
+
+            res, report["rerank"] = rerank(query, res, top_n=top_k, method=rerank_method,
+                                           budget_ms=budget_ms.get("rerank"))
+        s.last_query = {"query": query, "results_count": len(res), "cascade": report}
     
     return res
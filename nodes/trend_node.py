@@ -8,7 +8,7 @@ def _ym(d: Optional[str]) -> str:
 
 def build_trends(s):
     """
-    Build trend data from extracted transactions in state s.
+    Build trend data from extracted transactions in state s (credits skipped, as in run_budget).
     """
     
     txns = getattr(s, "extracted", []) or []
@@ -17,6 +17,8 @@ def build_trends(s):
     
     for t in txns:
         amt = t.get("amount")
+        if t.get("credit"):
+            continue
         
         try:
             a = float(amt)
@@ -1,10 +1,66 @@
 import os
-from typing import List, Dict, Any, Optional
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from tools.lazy_import import optional_import
 
-try:
-    from chromadb import PersistentClient
-except Exception as e:
-    raise ImportError("chromadb is required: pip install chromadb") from e
+def _rows(res: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten a single-query Chroma result into [{"id", "doc", "meta", "distance"}].
+    """
+
+    out = []
+    ids = res.get("ids", [[]])[0]
+    dists = (res.get("distances") or [[]])[0]
+    docs = (res.get("documents") or [[]])[0]
+    metas = (res.get("metadatas") or [[]])[0]
+
+    for i in range(len(ids)):
+        out.append({
+            "id": ids[i],
+            "doc": docs[i] if i < len(docs) else None,
+            "meta": metas[i] if i < len(metas) else None,
+            "distance": dists[i] if i < len(dists) else None
+        })
+
+    return out
+
+def _day_int(d: Optional[str]) -> Optional[int]:
+    """
+    "2025-10-03" -> 20251003, for range filters on the "day" metadata field
+    (Chroma only compares numbers).
+    """
+
+    m = re.match(r"(\d{4})-(\d{2})-(\d{2})", d or "")
+
+    return int("".join(m.groups())) if m else None
+
+def _day_where(lo: Optional[int], hi: Optional[int]) -> Optional[Dict[str, Any]]:
+    conds = []
+    if lo is not None:
+        conds.append({"day": {"$gte": lo}})
+    if hi is not None:
+        conds.append({"day": {"$lte": hi}})
+
+    return conds[0] if len(conds) == 1 else ({"$and": conds} if conds else None)
+
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+def _disk_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+
+    return total
 
 class VectorStore:
     """ 
@@ -18,9 +74,15 @@ class VectorStore:
         
         self.persist_dir = persist_dir
         self.collection_name = collection_name
+        PersistentClient = optional_import("chromadb", "PersistentClient")
+        if PersistentClient is None:
+            raise ImportError("chromadb is required: pip install chromadb")
+
         os.makedirs(self.persist_dir, exist_ok=True)
         self.client = PersistentClient(path=self.persist_dir)
-        
+        self._open()
+
+    def _open(self) -> None:
         try:
             self.col = self.client.get_collection(name=self.collection_name)
         except Exception:
@@ -37,47 +99,429 @@ class VectorStore:
             documents=docs,
             metadatas=metadatas
         )
+        self.bump_version()
 
-    def query_by_embedding(self, emb: List[float], n_results: int = 5) -> List[Dict[str, Any]]:
-        """ 
-        Query the vector store using an embedding vector.
+    def _version_path(self) -> str:
+        return os.path.join(self.persist_dir, f".{self.collection_name}.version")
+
+    def version(self) -> str:
         """
-        
-        res = self.col.query(query_embeddings=[emb], n_results=n_results)
+        Stamp that changes whenever this collection is written (upsert or delete),
+        so caches of query results can tell they are stale.
+        """
+
+        try:
+            with open(self._version_path(), encoding="utf-8") as f:
+                return f.read().strip() or "0"
+        except OSError:
+            return "0"
+
+    def bump_version(self) -> str:
+        """
+        Record a new version stamp (atomically) and return it.
+        """
+
+        v = uuid.uuid4().hex
+        tmp = self._version_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(v)
+        os.replace(tmp, self._version_path())
+
+        return v
+
+    def delete_files(self, files: List[str], batch_size: int = 500) -> None:
+        """
+        Delete every vector whose metadata "file" is one of files.
+        """
+
+        for st in range(0, len(files), batch_size):
+            self.col.delete(where={"file": {"$in": list(files[st:st + batch_size])}})
+        if files:
+            self.bump_version()
+
+    def _collections(self) -> List[Tuple[str, Any]]:
+        """
+        (name, collection) pairs backing this store.
+        """
+
+        return [(self.collection_name, self.col)]
+
+    def _reopen(self) -> None:
+        self.col = self.client.get_collection(name=self.collection_name)
+
+    def count(self) -> int:
+        return self.col.count()
+
+    def stored_ids(self, batch_size: int = 5000) -> Dict[str, Set[str]]:
+        """
+        IDs stored in each backing collection, read in pages without embeddings.
+        """
+
+        out = {}
+        for name, col in self._collections():
+            ids: Set[str] = set()
+            offset = 0
+            while True:
+                page = col.get(include=[], limit=batch_size, offset=offset)["ids"]
+                ids.update(page)
+                offset += len(page)
+                if len(page) < batch_size:
+                    break
+            out[name] = ids
+
+        return out
+
+    def compact(self, batch_size: int = 1000) -> None:
+        """
+        Rebuild every backing collection so deleted vectors leave the HNSW
+        index, remove the segment directories Chroma leaves behind for dropped
+        collections, and VACUUM its SQLite file.
+
+        Each collection is copied to a temporary one which then takes over the
+        name; the original is renamed aside and only dropped after the swap.
+        """
+
+        for name, col in self._collections():
+            tmp = self.client.create_collection(name=f"compact-{uuid.uuid4().hex[:12]}")
+            offset = 0
+            while True:
+                page = col.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+                if len(page["ids"]):
+                    tmp.upsert(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                               metadatas=page["metadatas"])
+                offset += len(page["ids"])
+                if len(page["ids"]) < batch_size:
+                    break
+            old = f"stale-{uuid.uuid4().hex[:12]}"
+            col.modify(name=old)
+            tmp.modify(name=name)
+            self.client.delete_collection(name=old)
+        self._reopen()
+
+        db = os.path.join(self.persist_dir, "chroma.sqlite3")
+        if not os.path.exists(db):
+            return
+        con = sqlite3.connect(db, timeout=30)
+        try:
+            live = {r[0] for r in con.execute("SELECT id FROM segments")}
+            for d in os.listdir(self.persist_dir):
+                p = os.path.join(self.persist_dir, d)
+                if _UUID_RE.match(d) and d not in live and os.path.isdir(p):
+                    shutil.rmtree(p, ignore_errors=True)
+            con.execute("VACUUM")
+        finally:
+            con.close()
+
+    def _probe_ms(self, probes: List[List[float]], n_results: int = 5) -> Dict[str, float]:
+        from tools.instrumentation import percentiles
+
+        t = []
+        n = min(n_results, self.count())
+        for emb in probes if n else []:
+            t0 = time.perf_counter()
+            self.query_by_embedding(emb, n_results=n)
+            t.append(time.perf_counter() - t0)
+
+        return {k: round(v * 1000, 3) for k, v in percentiles(t, (50, 95)).items()} if t else {}
+
+    def file_ids(self, files: List[str], batch_size: int = 500) -> Set[str]:
+        """
+        IDs of every vector whose metadata "file" is one of files, in every
+        backing collection.
+        """
+
+        out: Set[str] = set()
+        for _, col in self._collections():
+            for st in range(0, len(files), batch_size):
+                out.update(col.get(where={"file": {"$in": list(files[st:st + batch_size])}}, include=[])["ids"])
+
+        return out
+
+    def delete_ids(self, ids: List[str], batch_size: int = 500) -> None:
+        """
+        Delete the vectors stored under ids from every backing collection.
+        """
+
+        for _, col in self._collections():
+            for st in range(0, len(ids), batch_size):
+                col.delete(ids=list(ids[st:st + batch_size]))
+        if ids:
+            self.bump_version()
+
+    def _sample_embeddings(self, ids: Iterable[str], n: int) -> List[List[float]]:
+        want = list(ids)[:n]
         out = []
-        ids = res.get("ids", [[]])[0]
-        dists = res.get("distances", [[]])[0]
-        docs = res.get("documents", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        
-        for i in range(len(ids)):
-            out.append({
-                "id": ids[i],
-                "doc": docs[i] if i < len(docs) else None,
-                "meta": metas[i] if i < len(metas) else None,
-                "distance": dists[i] if i < len(dists) else None
-            })
-        
+        for _, col in self._collections():
+            if len(out) >= n or not want:
+                break
+            got = col.get(ids=want, include=["embeddings"])
+            out.extend([list(map(float, e)) for e in got["embeddings"]])
+
+        return out[:n]
+
+    def _orphans(self, name: str, ids: Set[str], keep: Dict[str, Optional[str]]) -> Set[str]:
+        return ids - keep.keys()
+
+    def _stale(self, col, ids: List[str], docs: Dict[str, str], batch_size: int) -> Set[str]:
+        out: Set[str] = set()
+        for st in range(0, len(ids), batch_size):
+            got = col.get(ids=ids[st:st + batch_size], include=["documents"])
+            out.update(i for i, d in zip(got["ids"], got["documents"]) if d != docs.get(i))
+
         return out
 
+    def maintain(self, keep: Dict[str, Optional[str]], batch_size: int = 500, compact: bool = True,
+                 probes: int = 20, docs: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Garbage-collect orphaned vectors: delete (in batches) every stored ID
+        not in keep, the ID -> date mapping of the current extracted rows
+        (embedding_node.expected_ids), then compact() unless nothing was
+        deleted or compact is False. With docs (ID -> expected document) a
+        kept ID whose stored document differs is deleted as well ("stale").
+        Returns collection size, disk use and query latency (the same probe
+        queries) before and after.
+        """
+
+        stored = self.stored_ids()
+        live = sorted(set().union(*stored.values()) & keep.keys())
+        sample = self._sample_embeddings(live[:: max(1, len(live) // max(1, probes))], probes)
+
+        def snapshot() -> Dict[str, Any]:
+            return {"vectors": self.count(), "disk_bytes": _disk_bytes(self.persist_dir),
+                    "query_ms": self._probe_ms(sample)}
+
+        report: Dict[str, Any] = {"before": snapshot()}
+        cols = dict(self._collections())
+        deleted = stale = 0
+        t0 = time.perf_counter()
+        for name, ids in stored.items():
+            orphans = self._orphans(name, ids, keep)
+            if docs is not None:
+                bad = self._stale(cols[name], sorted(ids - orphans), docs, batch_size)
+                stale += len(bad)
+                orphans |= bad
+            orphans = sorted(orphans)
+            for st in range(0, len(orphans), batch_size):
+                cols[name].delete(ids=orphans[st:st + batch_size])
+            deleted += len(orphans)
+        if deleted:
+            self.bump_version()
+        report["deleted"] = deleted
+        report["stale"] = stale
+        report["delete_s"] = round(time.perf_counter() - t0, 3)
+
+        report["compacted"] = bool(compact and deleted)
+        if report["compacted"]:
+            t0 = time.perf_counter()
+            self.compact()
+            report["compact_s"] = round(time.perf_counter() - t0, 3)
+        report["after"] = snapshot()
+
+        return report
+
+    def query_by_embedding(self, emb: List[float], n_results: int = 5, date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """ 
+        Query the vector store using an embedding vector, optionally limited to
+        rows dated within [date_from, date_to] (needs the "day" metadata field).
+        """
+        
+        where = _day_where(_day_int(date_from), _day_int(date_to))
+        kwargs = {"where": where} if where else {}
+
+        return _rows(self.col.query(query_embeddings=[emb], n_results=n_results, **kwargs))
+
     def query_by_text(self, text: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """ 
         Query the vector store using a text string.
         """
         
-        res = self.col.query(query_texts=[text], n_results=n_results)
+        return _rows(self.col.query(query_texts=[text], n_results=n_results))
+
+_NO_DATE = "nodate"
+
+def _month(d: Optional[str]) -> str:
+    return d[:7] if _day_int(d) else _NO_DATE
+
+def _tenant_id(tenant: str) -> str:
+    """
+    Collection-name-safe tenant id: a readable slug plus a hash of the raw id,
+    so "alice@x.com" and "alice.x.com" (same slug) still get distinct names.
+    Slugs hold no "_", so the "__" separators around it are unambiguous.
+    """
+
+    raw = str(tenant)
+    slug = re.sub(r"[^a-z0-9]+", "-", raw.lower()).strip("-")[:40] or "t"
+
+    return f"{slug}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]}"
+
+class PartitionedStore(VectorStore):
+    """
+    VectorStore split into one Chroma collection per (tenant, month):
+    "{collection_name}__{tenant id}__{YYYY-MM}" (see _tenant_id; rows without
+    a date go to a "nodate" partition). Queries only open the tenant's
+    partitions that overlap the requested date range and merge the hits by
+    distance, and retention drops whole partitions instead of deleting row
+    by row.
+    """
+
+    def __init__(self, persist_dir: str = "data/vectorstore", collection_name: str = "transactions",
+                 tenant: str = "default"):
+        self.tenant = tenant
+        self.base_name = collection_name
+        # collection_name names the version stamp file; one stamp covers all of the tenant's partitions.
+        self.prefix = f"{collection_name}__{_tenant_id(tenant)}__"
+        self._partition_re = re.compile(re.escape(self.prefix) + r"(\d{4}-\d{2}|" + _NO_DATE + ")")
+        super().__init__(persist_dir=persist_dir, collection_name=self.prefix[:-2])
+
+    def _open(self) -> None:
+        self.col = None
+        self._cols: Dict[str, Any] = {}
+
+    def partitions(self) -> List[str]:
+        """
+        Months ("YYYY-MM", or "nodate") this tenant has partitions for, sorted.
+        """
+
         out = []
-        ids = res.get("ids", [[]])[0]
-        dists = res.get("distances", [[]])[0]
-        docs = res.get("documents", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        
-        for i in range(len(ids)):
-            out.append({
-                "id": ids[i],
-                "doc": docs[i] if i < len(docs) else None,
-                "meta": metas[i] if i < len(metas) else None,
-                "distance": dists[i] if i < len(dists) else None
-            })
-        
-        return out
+        for c in self.client.list_collections():
+            m = self._partition_re.fullmatch(getattr(c, "name", c))
+            if m:
+                out.append(m.group(1))
+
+        return sorted(out)
+
+    def _col(self, month: str, create: bool = False):
+        col = self._cols.get(month)
+        if col is None:
+            name = self.prefix + month
+            col = self.client.get_or_create_collection(name=name) if create else self.client.get_collection(name=name)
+            self._cols[month] = col
+
+        return col
+
+    def upsert(self, ids: List[str], embs: List[List[float]], docs: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Upsert rows into their month partitions (by metadata "date"), adding an
+        integer "day" field used for date-range filters.
+        """
+
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for i, m in enumerate(metadatas):
+            groups[_month((m or {}).get("date"))].append(i)
+
+        for month, idx in groups.items():
+            metas = []
+            for i in idx:
+                m = dict(metadatas[i] or {})
+                day = _day_int(m.get("date"))
+                if day is not None:
+                    m["day"] = day
+                metas.append(m)
+            self._col(month, create=True).upsert(
+                ids=[ids[i] for i in idx],
+                embeddings=[embs[i] for i in idx],
+                documents=[docs[i] for i in idx],
+                metadatas=metas,
+            )
+        if ids:
+            self.bump_version()
+
+    def delete_files(self, files: List[str], batch_size: int = 500) -> None:
+        """
+        Delete every vector whose metadata "file" is one of files, in every partition.
+        """
+
+        for month in self.partitions():
+            col = self._col(month)
+            for st in range(0, len(files), batch_size):
+                col.delete(where={"file": {"$in": list(files[st:st + batch_size])}})
+        if files:
+            self.bump_version()
+
+    def drop_months(self, before: str) -> List[str]:
+        """
+        Retention: drop every partition for months earlier than before ("YYYY-MM").
+        Returns the dropped months.
+        """
+
+        dropped = [m for m in self.partitions() if m != _NO_DATE and m < before]
+        for m in dropped:
+            self.client.delete_collection(name=self.prefix + m)
+            self._cols.pop(m, None)
+        if dropped:
+            self.bump_version()
+
+        return dropped
+
+    def count(self) -> int:
+        return sum(self._col(m).count() for m in self.partitions())
+
+    def _collections(self) -> List[Tuple[str, Any]]:
+        return [(self.prefix + m, self._col(m)) for m in self.partitions()]
+
+    def _reopen(self) -> None:
+        self._cols = {}
+
+    def _orphans(self, name: str, ids: Set[str], keep: Dict[str, Optional[str]]) -> Set[str]:
+        # A row whose date moved leaves its old copy behind in another month.
+        month = name[len(self.prefix):]
+
+        return {i for i in ids if i not in keep or _month(keep[i]) != month}
+
+    def query_by_embedding(self, emb: List[float], n_results: int = 5, date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Nearest rows across the partitions overlapping [date_from, date_to]
+        (ISO dates, either may be None; no range searches every partition,
+        "nodate" included). Partitions cut by the range are filtered on "day".
+        """
+
+        lo, hi = _day_int(date_from), _day_int(date_to)
+        ranged = lo is not None or hi is not None
+        hits: List[Dict[str, Any]] = []
+
+        for month in self.partitions():
+            if month == _NO_DATE:
+                if ranged:
+                    continue
+                where = None
+            else:
+                first, last = int(month.replace("-", "")) * 100 + 1, int(month.replace("-", "")) * 100 + 31
+                if (lo is not None and last < lo) or (hi is not None and first > hi):
+                    continue
+                # Only partitions cut by the range need a filter.
+                where = _day_where(lo if lo is not None and first < lo else None,
+                                   hi if hi is not None and last > hi else None)
+
+            col = self._col(month)
+            n = min(n_results, col.count())
+            if n == 0:
+                continue
+            kwargs = {"where": where} if where else {}
+            hits.extend(_rows(col.query(query_embeddings=[emb], n_results=n, **kwargs)))
+
+        hits.sort(key=lambda r: (r["distance"] is None, r["distance"] or 0.0, r["id"]))
+
+        return hits[:n_results]
+
+    def query_by_text(self, text: str, n_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Embed text as run_retrieval does (embed_query), then query_by_embedding.
+        """
+
+        from .retrieval_node import embed_query
+
+        return self.query_by_embedding(embed_query(text), n_results=n_results)
+
+def open_store(persist_dir: str = "data/vectorstore", collection_name: str = "transactions",
+               tenant: Optional[str] = None, partition_by_month: bool = False) -> VectorStore:
+    """
+    The single "transactions" collection by default; a PartitionedStore when a
+    tenant is given or partition_by_month is set.
+    """
+
+    if tenant is None and not partition_by_month:
+        return VectorStore(persist_dir=persist_dir, collection_name=collection_name)
+
+    return PartitionedStore(persist_dir=persist_dir, collection_name=collection_name, tenant=tenant or "default")
@@ -0,0 +1,253 @@
+"""
+Asyncio entry point that runs the pipeline for many users at once.
+
+    import asyncio
+    from pipeline_service import PipelineService
+
+    svc = PipelineService(cpu_workers=4, embed_slots=1, llm_slots=8)
+    out = asyncio.run(svc.run_many([
+        {"user_id": "alice", "data_dir": "uploads/alice", "query": "total spent on food in October"},
+        {"user_id": "bob", "data_dir": "uploads/bob", "budget_cfg": {"food": 200}},
+    ]))
+    out["results"]["alice"]["last_rag"], out["metrics"]
+
+Each user gets their own State and their own month-partitioned vector
+collections (vector_db_node.PartitionedStore with tenant=user_id), so
+users never see each other's rows (tenant ids are hashed into the
+collection names, so ids sharing a prefix cannot collide) and a question
+about a date range only searches that range's partitions. Stages are gated
+by one semaphore per resource class, shared by all users:
+
+    cpu    input -> ocr -> clean -> extract -> dedup, on a process pool
+    embed  embedding + upsert into the user's collection
+    llm    LLM vendor classification / summaries and RAG answers
+
+Budget, trends, recurring-payment detection and analytics answers are
+cheap and run without a slot, in a worker thread so they never block the
+event loop.
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from tools.instrumentation import LatencyRecorder
+
+RESOURCES = ("cpu", "embed", "llm")
+
+def _parse(data_dir: str, enable_dedup: bool = True):
+    """
+    input..dedup for one user's upload directory (runs in a worker process).
+    """
+
+    from nodes.input_node import read_inputs
+    from nodes.ocr_node import run_ocr
+    from nodes.cleaning_node import clean_text
+    from nodes.extraction_node import run_extract
+    from nodes.dedup_node import run_dedup
+
+    s = run_extract(clean_text(run_ocr(read_inputs(data_dir))))
+    if enable_dedup:
+        s = run_dedup(s)
+
+    # Only what the later stages need crosses the process boundary.
+    s.ocr_output, s.ocr_pages, s.clean_text, s.clean_records = {}, {}, {}, []
+
+    return s
+
+class PipelineService:
+    """
+    Runs per-user pipelines concurrently with global limits per resource class.
+    """
+
+    def __init__(self, persist_dir: str = "data/vectorstore", cpu_workers: Optional[int] = None,
+                 embed_slots: int = 1, llm_slots: int = 4, llm_client: Optional[Any] = None,
+                 rag_model: str = "gpt-4.1-mini"):
+        """
+        cpu_workers sizes the parsing process pool (os.cpu_count() by default) and
+        the cpu slot count; embed_slots and llm_slots bound concurrent embedding
+        and LLM work. llm_client is an async OpenAI-compatible client for RAG
+        (e.g. tools.mock_llm.MockAsyncChatClient); AsyncOpenAI is created otherwise.
+        """
+
+        self.persist_dir = persist_dir
+        self.cpu_workers = max(1, cpu_workers or os.cpu_count() or 1)
+        self.slots = {"cpu": self.cpu_workers, "embed": max(1, embed_slots), "llm": max(1, llm_slots)}
+        self.client = llm_client
+        self.rag_model = rag_model
+
+        self.stage_latency = LatencyRecorder()
+        self.wait_latency = LatencyRecorder()
+        self._busy = {r: 0.0 for r in RESOURCES}
+        self._limits: Optional[Dict[str, asyncio.Semaphore]] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _limit(self, resource: str) -> asyncio.Semaphore:
+        # Created lazily so they bind to the running loop.
+        if self._limits is None:
+            self._limits = {r: asyncio.Semaphore(n) for r, n in self.slots.items()}
+
+        return self._limits[resource]
+
+    @asynccontextmanager
+    async def _slot(self, resource: str, stage: str):
+        """
+        Hold one resource slot for a stage, recording queueing and run time.
+        """
+
+        t0 = time.perf_counter()
+        async with self._limit(resource):
+            t1 = time.perf_counter()
+            self.wait_latency.add(stage, t1 - t0)
+            ok = False
+            try:
+                yield
+                ok = True
+            finally:
+                dt = time.perf_counter() - t1
+                self._busy[resource] += dt
+                self.stage_latency.add(stage, dt, ok)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def run_user(self, user_id: str, data_dir: str, budget_cfg: Optional[Dict[str, float]] = None,
+                       query: Optional[str] = None, use_llm: bool = False, enable_embed: bool = True,
+                       enable_dedup: bool = True, top_k: int = 6) -> Dict[str, Any]:
+        """
+        One user's pipeline: parse, then embedding and budget/trends side by
+        side, then the query (analytics fast path, else streamed RAG over the
+        user's collection). Returns a report like run_finance_pipeline's.
+        """
+
+        from nodes.budget_node import run_budget
+        from nodes.trend_node import build_trends
+        from nodes.recurring_node import run_recurring
+
+        stages: Dict[str, float] = {}
+        t_start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        t0 = time.perf_counter()
+        async with self._slot("cpu", "parse"):
+            s = await loop.run_in_executor(self._executor(), _parse, data_dir, enable_dedup)
+        stages["parse"] = time.perf_counter() - t0
+
+        async def embed():
+            from nodes.embedding_node import run_embeddings
+
+            t0 = time.perf_counter()
+            async with self._slot("embed", "embed"):
+                await asyncio.to_thread(run_embeddings, s, persist_dir=self.persist_dir, tenant=user_id,
+                                        partition_by_month=True, batch_size=256)
+            stages["embed"] = time.perf_counter() - t0
+
+        async def budget():
+            t0 = time.perf_counter()
+            if use_llm:
+                async with self._slot("llm", "budget_llm"):
+                    await asyncio.to_thread(run_budget, s, budget_cfg=budget_cfg, use_llm=True)
+            else:
+                await asyncio.to_thread(run_budget, s, budget_cfg=budget_cfg, use_llm=False)
+            await asyncio.to_thread(build_trends, s)
+            await asyncio.to_thread(run_recurring, s)
+            stages["budget"] = time.perf_counter() - t0
+
+        await asyncio.gather(*([embed()] if enable_embed else []), budget())
+
+        if query:
+            t0 = time.perf_counter()
+            s.last_rag = await self._answer(s, query, user_id, top_k)
+            stages["query"] = time.perf_counter() - t0
+
+        return {
+            "ok": True,
+            "user_id": user_id,
+            "tenant": user_id,
+            "files": s.raw_files,
+            "extracted_count": s.extracted_count,
+            "dedup_stats": getattr(s, "dedup_stats", {}),
+            "embedded_count": getattr(s, "embedded_count", 0),
+            "budget_results": s.budget_results,
+            "recurring_payments": s.recurring_payments,
+            "last_rag": s.last_rag if query else {},
+            "stage_s": {k: round(v, 4) for k, v in stages.items()},
+            "wall_s": round(time.perf_counter() - t_start, 4),
+        }
+
+    async def _answer(self, s, query: str, user_id: str, top_k: int) -> Dict[str, Any]:
+        from nodes.analytics_node import TxnTable, answer_aggregate, last_rag_entry, date_range
+
+        table = await asyncio.to_thread(TxnTable, s.extracted, getattr(s, "budget_vendor_map", None))
+        res = await asyncio.to_thread(answer_aggregate, table, query)
+        if res is not None:
+            s.last_rag = last_rag_entry(query, res)
+        else:
+            from nodes.rag_node import arun_rag, make_async_client
+            from nodes.vector_db_node import PartitionedStore
+
+            vs = await asyncio.to_thread(PartitionedStore, persist_dir=self.persist_dir, tenant=user_id)
+            dates = date_range(query, table) or (None, None)
+            if self.client is None:
+                self.client = make_async_client()
+            async with self._slot("llm", "rag"):
+                res = dict(await arun_rag(s, query, top_k=top_k, model=self.rag_model, vs=vs, client=self.client,
+                                          date_from=dates[0], date_to=dates[1]),
+                           route="rag")
+
+        return dict(s.last_rag, answer=res.get("answer"), sources=res.get("sources", []), route=res["route"],
+                    value=res.get("value"), groups=res.get("groups"))
+
+    async def run_many(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run every job (run_user keyword arguments; user_id and data_dir required)
+        concurrently. A failing user is reported with ok=False and does not
+        stop the others. Returns {"results": {user_id: report}, "metrics": ...}.
+        """
+
+        self._busy = {r: 0.0 for r in RESOURCES}
+        t0 = time.perf_counter()
+        out = await asyncio.gather(*(self.run_user(**job) for job in jobs), return_exceptions=True)
+        wall = time.perf_counter() - t0
+
+        results: Dict[str, Any] = {}
+        for job, res in zip(jobs, out):
+            if isinstance(res, BaseException):
+                res = {"ok": False, "user_id": job["user_id"], "error": f"{type(res).__name__}: {res}"}
+            results[job["user_id"]] = res
+
+        return {"results": results, "metrics": self.metrics(results, wall)}
+
+    def metrics(self, results: Dict[str, Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+        """
+        Throughput over a batch plus per-stage run/queue latencies and resource utilisation.
+        """
+
+        ok = [r for r in results.values() if r.get("ok")]
+        rows = sum(r.get("extracted_count") or 0 for r in ok)
+
+        return {
+            "users": len(results),
+            "ok": len(ok),
+            "failed": len(results) - len(ok),
+            "wall_s": round(wall_s, 3),
+            "users_per_s": round(len(ok) / wall_s, 2) if wall_s else None,
+            "rows": rows,
+            "rows_per_s": round(rows / wall_s, 1) if wall_s else None,
+            "slots": dict(self.slots),
+            "utilisation": {r: round(self._busy[r] / (wall_s * self.slots[r]), 3) if wall_s else None
+                            for r in RESOURCES},
+            "stage_ms": self.stage_latency.summary(),
+            "queue_ms": self.wait_latency.summary(),
+        }
@@ -0,0 +1,423 @@
+"""
+Long-running query service: keeps the encoder, vector-store handle, LLM
+client and extracted transactions warm, and answers retrieval / RAG /
+budget queries over a local HTTP or Unix-socket API.
+
+    python query_service.py --port 8765
+    python query_service.py --socket /tmp/finance.sock --mock-llm
+
+    curl -s localhost:8765/rag -d '{"query": "rent payments", "top_k": 6}'
+    curl -s localhost:8765/query -d '{"query": "total spent on transport in October 2025"}'
+    curl -s localhost:8765/stats                     # p50/p95/p99 per endpoint
+    curl -s localhost:8765/ingest -d '{"sms": "[2025-10-04 12:01] FROM: BankAlert | Debit $40.00 to PIZZA HUT."}'
+
+Endpoints: GET /health, GET /stats, POST /retrieve, /rag, /query, /budget, /ingest, /reload.
+/query answers aggregate questions from the transaction table and sends
+everything else to RAG. /ingest adds one SMS ("sms") or extracted row
+("txn") to the running budget totals and returns the alert it raised, if
+any (needs --budget-limits).
+"""
+
+import os
+import json
+import time
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from tools.instrumentation import LatencyRecorder
+
+class QueryService:
+    """
+    Warm handles plus the query methods served over the API.
+    """
+
+    def __init__(self, persist_dir: str = "data/vectorstore", collection_name: str = "transactions",
+                 data_dir: str = "data", snapshot_path: Optional[str] = None,
+                 rag_model: str = "gpt-4.1-mini", top_k: int = 6,
+                 llm_client: Optional[Any] = None, max_concurrency: int = 8,
+                 answer_cache: Optional[Any] = None, rerank_candidates: Optional[int] = None,
+                 budget_monitor: Optional[Any] = None):
+        """
+        llm_client is any OpenAI-compatible client (e.g. tools.mock_llm.MockChatClient);
+        by default an OpenAI client is created on warm-up. max_concurrency bounds
+        the requests doing work at once; further requests wait their turn.
+        answer_cache (a tools.answer_cache.AnswerCache) lets /rag reuse answers
+        to near-duplicate queries. rerank_candidates > top_k retrieves that
+        many neighbours and reranks them down to top_k. budget_monitor (a
+        nodes.budget_alert_node.BudgetMonitor) backs /ingest; when it holds no
+        totals yet it is seeded from transactions() on first use.
+        """
+
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
+        self.data_dir = data_dir
+        self.snapshot_path = snapshot_path
+        self.rag_model = rag_model
+        self.top_k = top_k
+        self.client = llm_client
+        self.cache = answer_cache
+        self.rerank_candidates = rerank_candidates
+        self.monitor = budget_monitor
+        self.latency = LatencyRecorder()
+        self.started = time.time()
+
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._lock = threading.Lock()
+        self._vs = None
+        self._txns: Optional[List[Dict[str, Any]]] = None
+        self._table = None
+
+    def warm(self, llm: bool = True) -> Dict[str, float]:
+        """
+        Open the vector store, load the query encoder, run one query (so the
+        store loads its index), create the LLM client and build the transaction table
+        now rather than on the first request. Returns seconds spent on each.
+        """
+
+        from nodes.retrieval_node import _query_emb
+
+        out = {}
+        t0 = time.perf_counter()
+        vs = self.vector_store()
+        out["vector_store_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        emb = _query_emb("warm-up")
+        out["encoder_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        vs.query_by_embedding(emb, n_results=1)
+        out["index_s"] = time.perf_counter() - t0
+
+        if llm:
+            t0 = time.perf_counter()
+            self.llm()
+            out["llm_client_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        self.table()
+        out["transactions_s"] = time.perf_counter() - t0
+
+        return {k: round(v, 4) for k, v in out.items()}
+
+    def vector_store(self):
+        with self._lock:
+            if self._vs is None:
+                from nodes.vector_db_node import VectorStore
+
+                self._vs = VectorStore(persist_dir=self.persist_dir, collection_name=self.collection_name)
+
+            return self._vs
+
+    def llm(self):
+        with self._lock:
+            if self.client is None:
+                from nodes.rag_node import make_client
+
+                self.client = make_client()
+
+            return self.client
+
+    def transactions(self) -> List[Dict[str, Any]]:
+        """
+        Extracted (deduplicated) rows for budget queries: from snapshot_path
+        when set, else extracted once from data_dir.
+        """
+
+        with self._lock:
+            if self._txns is None:
+                self._txns = self._load_transactions()
+
+            return self._txns
+
+    def table(self):
+        """
+        Columnar transaction table for analytics queries, built once from transactions().
+        """
+
+        txns = self.transactions()
+        with self._lock:
+            if self._table is None:
+                from nodes.analytics_node import TxnTable
+
+                self._table = TxnTable(txns)
+
+            return self._table
+
+    def _load_transactions(self) -> List[Dict[str, Any]]:
+        if self.snapshot_path:
+            from tools.snapshot import load_snapshot
+
+            return load_snapshot(self.snapshot_path).extracted
+
+        from nodes.input_node import read_inputs
+        from nodes.ocr_node import run_ocr
+        from nodes.cleaning_node import clean_text
+        from nodes.extraction_node import run_extract
+        from nodes.dedup_node import run_dedup
+
+        return run_dedup(run_extract(clean_text(run_ocr(read_inputs(self.data_dir))))).extracted
+
+    def reload(self) -> Dict[str, Any]:
+        """
+        Drop the vector-store handle and cached transactions (after a pipeline run).
+        """
+
+        with self._lock:
+            self._vs = None
+            self._txns = None
+            self._table = None
+
+        return {"ok": True, "transactions": len(self.transactions())}
+
+    def retrieve(self, query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+        from state.input_state import State
+        from nodes.retrieval_node import run_retrieval
+
+        res = run_retrieval(State(), query, top_k=top_k or self.top_k, vs=self.vector_store(),
+                            candidates=self.rerank_candidates)
+
+        return {"query": query, "results": res}
+
+    def rag(self, query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+        from state.input_state import State
+        from nodes.rag_node import run_rag
+
+        return run_rag(State(), query, top_k=top_k or self.top_k, model=self.rag_model,
+                       vs=self.vector_store(), client=self.llm(), cache=self.cache,
+                       candidates=self.rerank_candidates)
+
+    def query(self, query: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Aggregate questions from the table in-process; open-ended ones via rag().
+        """
+
+        from nodes.analytics_node import answer_aggregate
+
+        res = answer_aggregate(self.table(), query)
+        if res is not None:
+            return res
+
+        return dict(self.rag(query, top_k), route="rag")
+
+    def budget(self, budget_cfg: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        from state.input_state import State
+        from nodes.budget_node import run_budget
+
+        s = State()
+        s.extracted = self.transactions()
+        run_budget(s, budget_cfg=budget_cfg, use_llm=False)
+
+        return s.budget_results
+
+    def ingest(self, sms: Optional[str] = None, txn: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Feed one SMS message or extracted row to the budget monitor.
+        """
+
+        if self.monitor is None:
+            raise ValueError("no budget monitor configured (start with --budget-limits)")
+
+        if self.monitor.count == 0:
+            txns = self.transactions()
+            with self._lock:
+                if self.monitor.count == 0:
+                    self.monitor.ingest_many(txns)
+        with self._lock:
+            if sms is not None:
+                res = self.monitor.ingest_sms(sms)
+            else:
+                res = {"txn": txn, "alert": self.monitor.ingest(txn)}
+
+        return dict(res, violations=len(self.monitor.violations()))
+
+    def stats(self) -> Dict[str, Any]:
+        out = {"uptime_s": round(time.time() - self.started, 1), "latency_ms": self.latency.summary()}
+        if self.cache is not None:
+            out["answer_cache"] = self.cache.stats()
+
+        return out
+
+    def handle(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run one API call, bounded by max_concurrency and timed under its endpoint.
+        """
+
+        if endpoint in ("retrieve", "rag", "query") and not payload.get("query"):
+            raise ValueError("query is required")
+        if endpoint == "ingest" and not (payload.get("sms") or isinstance(payload.get("txn"), dict)):
+            raise ValueError("sms (message text) or txn (row object) is required")
+
+        with self._slots, self.latency.time(endpoint):
+            if endpoint == "retrieve":
+                return self.retrieve(payload["query"], payload.get("top_k"))
+            if endpoint == "rag":
+                return self.rag(payload["query"], payload.get("top_k"))
+            if endpoint == "query":
+                return self.query(payload["query"], payload.get("top_k"))
+            if endpoint == "budget":
+                return self.budget(payload.get("budget_cfg"))
+            if endpoint == "ingest":
+                return self.ingest(payload.get("sms"), payload.get("txn"))
+            if endpoint == "reload":
+                return self.reload()
+
+        raise KeyError(endpoint)
+
+_POST = ("retrieve", "rag", "query", "budget", "ingest", "reload")
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: QueryService = None
+    verbose = False
+
+    def _send(self, code: int, obj: Any) -> None:
+        body = json.dumps(obj, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.strip("/")
+        if path == "health":
+            self._send(200, {"ok": True})
+        elif path == "stats":
+            self._send(200, self.service.stats())
+        else:
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        endpoint = self.path.strip("/")
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+
+        if endpoint not in _POST:
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+            return
+
+        try:
+            payload = json.loads(raw or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("body must be a JSON object")
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+
+        try:
+            self._send(200, self.service.handle(endpoint, payload))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service: QueryService, host: str = "127.0.0.1", port: int = 8765,
+                socket_path: Optional[str] = None, verbose: bool = False):
+    """
+    Threaded HTTP server for service on host:port, or on a Unix socket when
+    socket_path is set (port 0 picks a free port). Call serve_forever() on it.
+    """
+
+    # Responses are written as headers then body; without TCP_NODELAY the
+    # second write waits for the client's delayed ACK (~40 ms per request).
+    handler = type("Handler", (_Handler,), {"service": service, "verbose": verbose,
+                                            "disable_nagle_algorithm": not socket_path})
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return _UnixHTTPServer(socket_path, handler)
+
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+
+    return srv
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Serve retrieval/RAG/budget queries with warm models.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--socket", default=None, metavar="PATH", help="listen on a Unix socket instead of TCP")
+    ap.add_argument("--persist-dir", default="data/vectorstore")
+    ap.add_argument("--collection", default="transactions")
+    ap.add_argument("--data-dir", default="data")
+    ap.add_argument("--snapshot", default=None, metavar="PATH", help="load budget transactions from a snapshot")
+    ap.add_argument("--rag-model", default="gpt-4.1-mini")
+    ap.add_argument("--top-k", type=int, default=6)
+    ap.add_argument("--max-concurrency", type=int, default=8)
+    ap.add_argument("--answer-cache", default="data/.cache/answer_cache.sqlite", metavar="PATH",
+                    help="SQLite file for cached RAG answers")
+    ap.add_argument("--no-answer-cache", action="store_true", help="always retrieve and call the LLM")
+    ap.add_argument("--cache-threshold", type=float, default=0.92,
+                    help="cosine similarity at which a cached answer is reused")
+    ap.add_argument("--rerank", type=int, default=None, metavar="N",
+                    help="retrieve N candidates and rerank them down to top-k")
+    ap.add_argument("--budget-limits", default=None, metavar="JSON",
+                    help='monthly limits for /ingest alerts, e.g. \'{"food": 200, "transport": 80}\'')
+    ap.add_argument("--budget-state", default="data/.cache/budget_state.json", metavar="PATH",
+                    help="where the running budget totals are kept")
+    ap.add_argument("--mock-llm", action="store_true", help="answer with a local mock instead of OpenAI")
+    ap.add_argument("--mock-latency", type=float, default=0.0, help="seconds the mock LLM sleeps per call")
+    ap.add_argument("--verbose", action="store_true", help="log every request")
+    args = ap.parse_args(argv)
+
+    client = None
+    if args.mock_llm:
+        from tools.mock_llm import MockChatClient
+
+        client = MockChatClient(latency_s=args.mock_latency)
+
+    cache = None
+    if not args.no_answer_cache:
+        from tools.answer_cache import AnswerCache
+
+        cache = AnswerCache(args.answer_cache, threshold=args.cache_threshold)
+
+    monitor = None
+    if args.budget_limits:
+        from nodes.budget_alert_node import BudgetMonitor
+
+        monitor = BudgetMonitor(json.loads(args.budget_limits), path=args.budget_state)
+
+    service = QueryService(persist_dir=args.persist_dir, collection_name=args.collection, data_dir=args.data_dir,
+                           snapshot_path=args.snapshot, rag_model=args.rag_model, top_k=args.top_k,
+                           llm_client=client, max_concurrency=args.max_concurrency, answer_cache=cache,
+                           rerank_candidates=args.rerank, budget_monitor=monitor)
+    try:
+        warm = service.warm()
+    except Exception as e:
+        print(f"warm-up incomplete ({e}); remaining handles load on first request")
+        warm = {}
+
+    srv = make_server(service, args.host, args.port, args.socket, args.verbose)
+    where = args.socket or "http://{}:{}".format(*srv.server_address[:2])
+    print(f"query service listening on {where} (warm-up: {warm})", flush=True)
+
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
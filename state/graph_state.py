@@ -1,4 +1,13 @@
-from typing import TypedDict, Optional, Dict, List, Any
+import operator
+from typing import TypedDict, Optional, Dict, List, Any, Annotated
+
+
+def _merge_dicts(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reducer merging per-node dict updates written by concurrent branches.
+    """
+
+    return {**(a or {}), **(b or {})}
 
 
 class GraphState(TypedDict, total=False):
@@ -7,18 +16,23 @@ class GraphState(TypedDict, total=False):
     """
 
     raw_files: List[str]                   
+    ingest: Dict[str, Any]
     claim: Optional[str]                   
     context: Optional[str]                   
 
     ocr_output: Dict[str, str]             
+    ocr_pages: Dict[str, List[str]]
     clean_text: Dict[str, List[str]]        
+    clean_records: List[Dict[str, Any]]
 
     extracted: List[Dict[str, Any]]        
     extracted_count: int
+    dedup_stats: Dict[str, Any]
 
     indexed_ids: List[str]                  
     embedded_count: int
     vector_store_info: Dict[str, Any]     
+    vector_gc: Dict[str, Any]
 
     last_query: Dict[str, Any]           
     last_rag: Dict[str, Any]               
@@ -30,32 +44,45 @@ class GraphState(TypedDict, total=False):
     budget_vendor_map: Dict[str, str]        
     budget_report: Optional[str]             
     budget_recommendations: List[str]       
+    recurring_payments: Dict[str, Any]
 
     trend_data: Dict[str, Any]              
     chart_paths: Dict[str, str]             
+    chart_stats: Dict[str, int]
+
+    options: Dict[str, Any]
+    report: Dict[str, Any]
+    node_timings: Annotated[Dict[str, float], _merge_dicts]
+    node_metrics: Annotated[Dict[str, Dict[str, Any]], _merge_dicts]
 
-    logs: List[str]                          
+    logs: Annotated[List[str], operator.add]
     extra: Dict[str, Any]                    
 
 
 def initialize_state(raw_files: Optional[List[str]] = None,
                      claim: Optional[str] = None,
-                     context: Optional[str] = None) -> GraphState:
+                     context: Optional[str] = None,
+                     options: Optional[Dict[str, Any]] = None) -> GraphState:
     """
     Initialize a GraphState with default values.
     """
     
     return GraphState({
         "raw_files": raw_files or [],
+        "ingest": {},
         "claim": claim,
         "context": context,
         "ocr_output": {},
+        "ocr_pages": {},
         "clean_text": {"sms": [], "bank": []},
+        "clean_records": [],
         "extracted": [],
         "extracted_count": 0,
+        "dedup_stats": {},
         "indexed_ids": [],
         "embedded_count": 0,
         "vector_store_info": {},
+        "vector_gc": {},
         "last_query": {},
         "last_rag": {},
         "retrieved_docs": [],
@@ -65,8 +92,14 @@ def initialize_state(raw_files: Optional[List[str]] = None,
         "budget_vendor_map": {},
         "budget_report": None,
         "budget_recommendations": [],
+        "recurring_payments": {},
         "trend_data": {},
         "chart_paths": {},
+        "chart_stats": {},
+        "options": dict(options or {}),
+        "report": {},
+        "node_timings": {},
+        "node_metrics": {},
         "logs": [],
         "extra": {},
     })
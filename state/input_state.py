@@ -6,4 +6,6 @@ class State:
     def __init__(self):
         self.raw_files = []
         self.ocr_output = {}
+        self.ocr_pages = {}
         self.clean_text = {}
+        self.clean_records = []
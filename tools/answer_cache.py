@@ -0,0 +1,180 @@
+import json
+import math
+import time
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from tools.lazy_import import optional_import
+
+BASE = Path(__file__).resolve().parents[1]
+DEFAULT_PATH = BASE / "data" / ".cache" / "answer_cache.sqlite"
+
+def _unit(v: List[float]) -> List[float]:
+    n = math.sqrt(sum(x * x for x in v)) or 1.0
+
+    return [x / n for x in v]
+
+class AnswerCache:
+    """
+    RAG answers keyed by query-embedding similarity and vector-store version.
+
+    A lookup hits when a stored query for the same (tenant, store version,
+    model, top_k) has cosine similarity >= threshold with the new query and
+    is younger than ttl_s. Entries are persisted in SQLite; each tenant's
+    entries for its current version are also held in memory, and the
+    tenant's entries for other versions are purged the first time a new
+    version is seen, so indexing new transactions invalidates that tenant's
+    answers without touching anyone else's.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.92,
+                 ttl_s: Optional[float] = 86400.0, max_entries: int = 2000):
+        """
+        Open (and create if needed) the cache database at path.
+        """
+
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._versions: Dict[str, str] = {}
+        self._rows: Dict[Tuple[str, str, int], List[Tuple[int, List[float], float, Dict[str, Any]]]] = {}
+        self._mats: Dict[Tuple[str, str, int], Any] = {}
+
+        with self._conn() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "id INTEGER PRIMARY KEY, version TEXT NOT NULL, model TEXT NOT NULL, top_k INTEGER NOT NULL, "
+                "query TEXT NOT NULL, emb BLOB NOT NULL, payload TEXT NOT NULL, created REAL NOT NULL, "
+                "tenant TEXT NOT NULL DEFAULT '')"
+            )
+            # Caches created before entries were scoped by tenant.
+            if "tenant" not in {r[1] for r in con.execute("PRAGMA table_info(answers)")}:
+                con.execute("ALTER TABLE answers ADD COLUMN tenant TEXT NOT NULL DEFAULT ''")
+            con.execute("DROP INDEX IF EXISTS answers_key")
+            con.execute("CREATE INDEX IF NOT EXISTS answers_tenant_key ON answers (tenant, version, model, top_k)")
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def _use_version(self, tenant: str, version: str) -> None:
+        """
+        Switch tenant to version: drop the tenant's entries for other versions and load this one's.
+        """
+
+        if self._versions.get(tenant) == version:
+            return
+
+        with self._conn() as con:
+            con.execute("DELETE FROM answers WHERE tenant = ? AND version != ?", (tenant, version))
+            rows = con.execute("SELECT id, model, top_k, emb, payload, created FROM answers "
+                               "WHERE tenant = ? AND version = ? ORDER BY id", (tenant, version)).fetchall()
+
+        for key in [k for k in self._rows if k[0] == tenant]:
+            del self._rows[key]
+            self._mats.pop(key, None)
+        for rid, model, top_k, blob, payload, created in rows:
+            vec = array("f")
+            vec.frombytes(blob)
+            self._rows.setdefault((tenant, model, top_k), []).append((rid, list(vec), created, json.loads(payload)))
+        self._versions[tenant] = version
+
+    def _best(self, key: Tuple[str, str, int], q: List[float]) -> Tuple[int, float]:
+        """
+        (index, cosine) of the stored query most similar to unit vector q.
+        """
+
+        rows = self._rows.get(key) or []
+        np = optional_import("numpy")
+        if np is not None:
+            mat = self._mats.get(key)
+            if mat is None or len(mat) != len(rows):
+                mat = self._mats[key] = np.asarray([r[1] for r in rows], dtype=np.float32)
+            sims = mat @ np.asarray(q, dtype=np.float32)
+            i = int(sims.argmax())
+
+            return i, float(sims[i])
+
+        best = (-1, -1.0)
+        for i, r in enumerate(rows):
+            sim = sum(a * b for a, b in zip(r[1], q))
+            if sim > best[1]:
+                best = (i, sim)
+
+        return best
+
+    def get(self, emb: List[float], version: str, model: str, top_k: int,
+            tenant: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Cached result for a query embedding, with "similarity" and "cached_query"
+        added, or None on a miss. tenant scopes the entry (e.g. the vector
+        store's collection name), version is that store's version stamp.
+        """
+
+        q = _unit(list(emb))
+        with self._lock:
+            self._use_version(tenant, version)
+            key = (tenant, model, int(top_k))
+            if not self._rows.get(key):
+                self.misses += 1
+                return None
+
+            i, sim = self._best(key, q)
+            _, _, created, payload = self._rows[key][i]
+            fresh = self.ttl_s is None or time.time() - created <= self.ttl_s
+            if sim < self.threshold or not fresh:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return dict(payload["result"], similarity=round(sim, 4), cached_query=payload["query"])
+
+    def put(self, query: str, emb: List[float], version: str, model: str, top_k: int,
+            result: Dict[str, Any], tenant: str = "") -> None:
+        """
+        Store a RAG result for query under tenant's current store version.
+        """
+
+        q = _unit(list(emb))
+        payload = {"query": query, "result": result}
+        now = time.time()
+        key = (tenant, model, int(top_k))
+        with self._lock:
+            self._use_version(tenant, version)
+            with self._conn() as con:
+                cur = con.execute(
+                    "INSERT INTO answers (tenant, version, model, top_k, query, emb, payload, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (tenant, version, model, int(top_k), query, array("f", q).tobytes(),
+                     json.dumps(payload, default=str), now),
+                )
+                rid = cur.lastrowid
+                n = con.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+                if n > self.max_entries:
+                    con.execute("DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY id LIMIT ?)",
+                                (n - self.max_entries,))
+                    # Eviction can hit any tenant; reload lazily.
+                    self._rows, self._mats, self._versions = {}, {}, {}
+
+            if tenant in self._versions:
+                self._rows.setdefault(key, []).append((rid, q, now, payload))
+                self._mats.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock, self._conn() as con:
+            con.execute("DELETE FROM answers")
+            self._rows, self._mats, self._versions = {}, {}, {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = sum(len(v) for v in self._rows.values())
+
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "threshold": self.threshold}
@@ -2,13 +2,7 @@ import os
 import json
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
-
-load_dotenv()
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
+from tools.lazy_import import optional_import, load_env
 
 BASE = Path(__file__).resolve().parents[1]
 PROM_CAT = BASE / "prompts" / "budget_categorize_prompt.txt"
@@ -20,11 +14,13 @@ def _load_prompt(p: Path) -> str:
     return p.read_text(encoding="utf-8").strip() if p.exists() else ""
 
 def _client() -> Optional[Any]:
-    if OpenAI is None:
-        return None
+    load_env()
     key = os.getenv("OPENAI_API_KEY")
     if not key:
         return None
+    OpenAI = optional_import("openai", "OpenAI")
+    if OpenAI is None:
+        return None
     return OpenAI(api_key=key)
 
 def _call_llm_system(system_prompt: str, user_content: str, model: str="gpt-4.1-mini") -> str:
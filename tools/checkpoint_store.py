@@ -0,0 +1,108 @@
+import json
+import pickle
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+BASE = Path(__file__).resolve().parents[1]
+DEFAULT_PATH = BASE / "data" / ".cache" / "checkpoints.sqlite"
+
+def input_hash(node: str, material: Any) -> str:
+    """
+    Stable hash of a node name and the inputs it reads.
+    """
+
+    blob = json.dumps(material, sort_keys=True, default=str, ensure_ascii=False)
+
+    return hashlib.sha256(f"{node}\0{blob}".encode("utf-8")).hexdigest()
+
+def file_fingerprint(paths: Iterable[str]) -> list:
+    """
+    (path, size, mtime) for each path, so hashes change when files do.
+    """
+
+    out = []
+    for f in sorted(paths or []):
+        try:
+            st = Path(f).stat()
+            out.append((f, st.st_size, st.st_mtime_ns))
+        except OSError:
+            out.append((f, None, None))
+
+    return out
+
+class CheckpointStore:
+    """
+    SQLite store of node outputs keyed by (node, input hash).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (and create if needed) the checkpoint database at path.
+        """
+
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._conn() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "node TEXT NOT NULL, key TEXT NOT NULL, payload BLOB NOT NULL, "
+                "created REAL DEFAULT (julianday('now')), PRIMARY KEY (node, key))"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def get(self, node: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored output for node/key, or None on a miss.
+        """
+
+        with self._conn() as con:
+            row = con.execute("SELECT payload FROM checkpoints WHERE node = ? AND key = ?", (node, key)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return None
+
+    def put(self, node: str, key: str, updates: Dict[str, Any]) -> None:
+        """
+        Store a node's output, replacing older checkpoints of the same node.
+        """
+
+        blob = pickle.dumps(updates, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._conn() as con:
+            con.execute("DELETE FROM checkpoints WHERE node = ?", (node,))
+            con.execute("INSERT INTO checkpoints (node, key, payload) VALUES (?, ?, ?)", (node, key, blob))
+
+    def invalidate(self, nodes: Optional[Iterable[str]] = None) -> int:
+        """
+        Drop checkpoints for the given nodes (all nodes when None). Returns rows removed.
+        """
+
+        with self._conn() as con:
+            if nodes is None:
+                cur = con.execute("DELETE FROM checkpoints")
+            else:
+                nodes = list(nodes)
+                if not nodes:
+                    return 0
+                marks = ",".join("?" for _ in nodes)
+                cur = con.execute(f"DELETE FROM checkpoints WHERE node IN ({marks})", nodes)
+
+        return cur.rowcount
+
+    def nodes(self) -> Dict[str, str]:
+        """
+        Map of node name to the input hash of its stored checkpoint.
+        """
+
+        with self._conn() as con:
+            rows = con.execute("SELECT node, key FROM checkpoints").fetchall()
+
+        return {n: k for n, k in rows}
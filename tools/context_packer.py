@@ -0,0 +1,129 @@
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from tools.lazy_import import optional_import
+from tools.vendor_norm import normalize_vendor
+
+HEADER = "txn_id|date|vendor|amount|currency|source|note"
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """
+    tiktoken encoding for model (o200k_base for unknown models), or None without tiktoken.
+    """
+
+    tiktoken = optional_import("tiktoken")
+    if tiktoken is None:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return tiktoken.get_encoding("o200k_base")
+
+def tokenizer_name(model: str = "gpt-4.1-mini") -> str:
+    enc = _encoding(model)
+
+    return enc.name if enc is not None else "chars/4"
+
+def count_tokens(text: str, model: str = "gpt-4.1-mini") -> int:
+    """
+    Tokens in text for model. Without tiktoken, estimates one token per 4 characters.
+    """
+
+    enc = _encoding(model)
+    if enc is None:
+        return math.ceil(len(text) / 4)
+
+    return len(enc.encode(text, disallowed_special=()))
+
+def _cell(v: Any) -> str:
+    return "" if v is None else str(v).replace("|", "/").replace("\n", " ").strip()
+
+def _amount(v: Any) -> str:
+    try:
+        return f"{float(v):.2f}"
+    except (TypeError, ValueError):
+        return _cell(v)
+
+def row_line(r: Dict[str, Any], desc_chars: int = 60) -> str:
+    """
+    One table line for a retrieved row. Bank descriptions repeat the row's
+    own columns, so only other sources get a (truncated) note.
+    """
+
+    meta = r.get("meta") or {}
+    note = ""
+    if meta.get("source") != "bank":
+        note = _cell(meta.get("desc") or r.get("doc"))
+        if len(note) > desc_chars:
+            note = note[:desc_chars - 3].rstrip() + "..."
+
+    src = _cell(meta.get("source"))
+    if meta.get("page") is not None:
+        src += f" p{meta.get('page')}"
+
+    return "|".join([_cell(meta.get("txn_id", "?")), _cell(meta.get("date")), _cell(meta.get("vendor")),
+                     _amount(meta.get("amount")), _cell(meta.get("currency")), src, note])
+
+def _dup_key(r: Dict[str, Any]) -> Optional[Tuple]:
+    meta = r.get("meta") or {}
+    try:
+        amt = round(float(meta.get("amount")), 2)
+    except (TypeError, ValueError):
+        return None
+
+    return meta.get("date"), amt, normalize_vendor(meta)[1]
+
+def pack_context(retrieved: List[Dict[str, Any]], token_budget: int = 800, model: str = "gpt-4.1-mini",
+                 desc_chars: int = 60) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pack retrieved rows into a compact table (one line per transaction) that
+    fits token_budget tokens, header included.
+
+    Rows are taken most relevant first (smallest distance). A row with the
+    same date, amount and normalised vendor as one already packed is
+    dropped as a duplicate, and a row that would overflow the budget is
+    skipped so smaller, less relevant ones can still fill the space.
+    Returns (text, report) where report has budget, used tokens, rows packed,
+    duplicates dropped, rows skipped for budget and the tokenizer used.
+    """
+
+    order = sorted(range(len(retrieved)),
+                   key=lambda i: (retrieved[i].get("distance") is None, retrieved[i].get("distance") or 0.0, i))
+
+    lines = [HEADER]
+    used = count_tokens(HEADER, model)
+    seen = set()
+    dups = skipped = 0
+
+    for i in order:
+        r = retrieved[i]
+        key = _dup_key(r)
+        if key is not None and key in seen:
+            dups += 1
+            continue
+
+        line = row_line(r, desc_chars)
+        cost = count_tokens("\n" + line, model)
+        if used + cost > token_budget:
+            skipped += 1
+            continue
+
+        lines.append(line)
+        used += cost
+        if key is not None:
+            seen.add(key)
+
+    text = "\n".join(lines) if len(lines) > 1 else ""
+    report = {
+        "budget": token_budget,
+        "used": count_tokens(text, model) if text else 0,
+        "rows": len(lines) - 1,
+        "candidates": len(retrieved),
+        "duplicates_dropped": dups,
+        "skipped_for_budget": skipped,
+        "tokenizer": tokenizer_name(model),
+    }
+
+    return text, report
@@ -0,0 +1,132 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+BASE = Path(__file__).resolve().parents[1]
+DEFAULT_PATH = BASE / "data" / ".cache" / "ingest_manifest.json"
+
+def file_sha256(path: str, chunk: int = 1 << 20) -> str:
+    """
+    Content hash of a file, read in chunks.
+    """
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(chunk), b""):
+            h.update(b)
+
+    return h.hexdigest()
+
+class IngestManifest:
+    """
+    Persistent record of ingested files (size, mtime, content hash) and the rows
+    extracted from each, so unchanged files are never re-read.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Load the manifest at path (an empty one if it does not exist yet).
+        """
+
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        if self.path.exists():
+            try:
+                self.files = json.loads(self.path.read_text(encoding="utf-8")).get("files", {})
+            except Exception:
+                self.files = {}
+
+    def diff(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Classify paths against the manifest into new / modified / unchanged,
+        plus manifest entries that no longer exist (deleted). "stats" carries
+        the fresh size/mtime/hash that merge() records.
+
+        Size+mtime matches are trusted without hashing; otherwise the content
+        hash decides, so a touched-but-identical file still counts as unchanged.
+        """
+
+        out = {"new": [], "modified": [], "unchanged": [], "deleted": [], "stats": {}}
+        seen = set()
+
+        for f in sorted(paths):
+            seen.add(f)
+            st = Path(f).stat()
+            stat = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            old = self.files.get(f)
+
+            if old and old.get("size") == stat["size"] and old.get("mtime_ns") == stat["mtime_ns"]:
+                out["unchanged"].append(f)
+                continue
+
+            digest = file_sha256(f)
+            out["stats"][f] = dict(stat, sha256=digest)
+
+            if old is None:
+                out["new"].append(f)
+            elif old.get("sha256") == digest:
+                out["unchanged"].append(f)
+            else:
+                out["modified"].append(f)
+
+        out["deleted"] = sorted(f for f in self.files if f not in seen)
+
+        return out
+
+    def merge(self, diff: Dict[str, List[str]], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Record freshly extracted rows for new/modified files, forget deleted
+        files, and return the full row set (stored rows for unchanged files)
+        in path order.
+        """
+
+        by_file: Dict[str, List[Dict[str, Any]]] = {}
+        for r in rows:
+            by_file.setdefault(r.get("file"), []).append(r)
+
+        stats = diff.get("stats", {})
+        for f in diff.get("deleted", []):
+            self.files.pop(f, None)
+
+        for f in diff.get("new", []) + diff.get("modified", []):
+            self.files[f] = dict(stats.get(f, {}), rows=by_file.get(f, []))
+
+        for f in diff.get("unchanged", []):
+            if f in stats and f in self.files:
+                self.files[f].update(stats[f])
+
+        out: List[Dict[str, Any]] = []
+        for f in sorted(self.files):
+            out.extend(dict(r) for r in self.files[f].get("rows", []))
+
+        return out
+
+    def _pending_path(self) -> Path:
+        return self.path.with_suffix(self.path.suffix + ".pending")
+
+    def save(self, pending: bool = False) -> None:
+        """
+        Write the manifest atomically. With pending=True it is written next to
+        the manifest instead, and only takes effect once commit() promotes it
+        (after the rows are embedded), so a failed run re-ingests its files.
+        """
+
+        target = self._pending_path() if pending else self.path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"files": self.files}, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(target)
+
+    def commit(self) -> bool:
+        """
+        Promote a pending save to the manifest. Returns False when there is none.
+        """
+
+        try:
+            self._pending_path().replace(self.path)
+        except FileNotFoundError:
+            return False
+
+        return True
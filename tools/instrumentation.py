@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import threading
+import tracemalloc
+from pathlib import Path
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Sequence
+
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_starts = 0
+
+def count_items(v: Any) -> int:
+    """
+    Item count of a node input/output: ints are taken as-is, containers by length.
+    """
+
+    if v is None:
+        return 0
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, int):
+        return v
+
+    try:
+        return len(v)
+    except TypeError:
+        return 1
+
+def _start_tracing() -> tuple:
+    """
+    Start (or join) tracing; returns the token _stop_tracing needs. The peak is
+    only reset when no other block is being traced, so concurrent blocks never
+    lose each other's peaks.
+    """
+
+    global _trace_users, _trace_starts
+
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        alone = _trace_users == 0
+        if alone:
+            tracemalloc.reset_peak()
+        _trace_users += 1
+        _trace_starts += 1
+        current, _ = tracemalloc.get_traced_memory()
+
+        return current, _trace_starts, alone
+
+def _stop_tracing(token: tuple) -> tuple:
+    """
+    (peak bytes above the block's starting usage, whether another traced block overlapped it).
+    """
+
+    global _trace_users
+
+    baseline, starts, alone = token
+    with _trace_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _trace_users -= 1
+        overlapped = not alone or _trace_starts != starts or _trace_users > 0
+        if _trace_users == 0:
+            tracemalloc.stop()
+
+    return max(0, peak - baseline), overlapped
+
+@contextmanager
+def measure(name: str, trace_memory: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block and yield a metrics dict that is filled in when the block exits.
+
+    Records wall time, CPU time of the calling thread, and (with trace_memory)
+    the tracemalloc peak above the memory in use when the block started.
+    tracemalloc is process-wide, so when traced blocks overlap (concurrent
+    graph branches) the peak also counts the others' allocations, and
+    "peak_mem_shared" is set on every block involved.
+    Callers may set "items_in"/"items_out" on the dict; rows_per_sec is derived
+    from the larger of the two, so fan-in (extract) and fan-out nodes both read sensibly.
+    """
+
+    m: Dict[str, Any] = {"node": name, "items_in": 0, "items_out": 0}
+    token = _start_tracing() if trace_memory else None
+
+    ts = time.time()
+    t0 = time.perf_counter()
+    c0 = time.thread_time()
+
+    try:
+        yield m
+    finally:
+        wall = time.perf_counter() - t0
+        m["start_us"] = int(ts * 1e6)
+        m["wall_s"] = round(wall, 6)
+        m["cpu_s"] = round(time.thread_time() - c0, 6)
+        if token is not None:
+            m["peak_mem_bytes"], m["peak_mem_shared"] = _stop_tracing(token)
+        else:
+            m["peak_mem_bytes"] = m["peak_mem_shared"] = None
+        rows = max(m["items_in"], m["items_out"])
+        m["rows_per_sec"] = round(rows / wall, 1) if wall > 0 and rows else None
+        m["pid"] = os.getpid()
+        m["tid"] = threading.get_ident()
+
+def chrome_trace(metrics: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert per-node metrics into Chrome trace-event JSON (chrome://tracing, Perfetto).
+    """
+
+    events = []
+    for name, m in metrics.items():
+        args = {k: v for k, v in m.items() if k not in ("node", "start_us", "pid", "tid")}
+        events.append({
+            "name": name,
+            "cat": "node",
+            "ph": "X",
+            "ts": m.get("start_us", 0),
+            "dur": int((m.get("wall_s") or 0) * 1e6),
+            "pid": m.get("pid", 0),
+            "tid": m.get("tid", 0),
+            "args": args,
+        })
+
+    return {"traceEvents": sorted(events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+def write_chrome_trace(metrics: Dict[str, Dict[str, Any]], path: str) -> str:
+    """
+    Write metrics as a Chrome trace file and return its path.
+    """
+
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(chrome_trace(metrics), indent=1), encoding="utf-8")
+
+    return str(p)
+
+def percentiles(values: Iterable[float], qs: Sequence[float] = (50, 95, 99)) -> Dict[str, float]:
+    """
+    Nearest-rank percentiles of values, keyed "p50", "p95", ...
+    """
+
+    v = sorted(values)
+    if not v:
+        return {f"p{q:g}": None for q in qs}
+
+    out = {}
+    for q in qs:
+        k = max(0, min(len(v) - 1, int(-(-q * len(v) // 100)) - 1))
+        out[f"p{q:g}"] = v[k]
+
+    return out
+
+class LatencyRecorder:
+    """
+    Thread-safe rolling window of request latencies per endpoint.
+    """
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def add(self, endpoint: str, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+            if not ok:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    @contextmanager
+    def time(self, endpoint: str) -> Iterator[None]:
+        """
+        Record the duration of the block under endpoint (as an error if it raises).
+        """
+
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.add(endpoint, time.perf_counter() - t0, ok)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per endpoint: request and error counts plus p50/p95/p99/max latency in ms
+        over the window.
+        """
+
+        with self._lock:
+            snap = {k: list(v) for k, v in self._samples.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+
+        out = {}
+        for k, v in snap.items():
+            ms: List[float] = [x * 1000 for x in v]
+            pct = {p: round(x, 3) for p, x in percentiles(ms).items()}
+            out[k] = dict(count=counts.get(k, 0), errors=errors.get(k, 0), **pct, max=round(max(ms), 3))
+
+        return out
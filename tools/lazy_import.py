@@ -0,0 +1,27 @@
+import importlib
+from functools import lru_cache
+from typing import Any, Optional
+
+@lru_cache(maxsize=None)
+def optional_import(module: str, attr: Optional[str] = None) -> Any:
+    """
+    Import module (and return module.attr) on first use, or None if it is not
+    installed. Results are cached, so later calls are a dict lookup.
+    """
+
+    try:
+        mod = importlib.import_module(module)
+    except Exception:
+        return None
+
+    return getattr(mod, attr, None) if attr else mod
+
+@lru_cache(maxsize=1)
+def load_env() -> bool:
+    """
+    Load .env into os.environ once, the first time a credential is needed.
+    """
+
+    load_dotenv = optional_import("dotenv", "load_dotenv")
+
+    return bool(load_dotenv and load_dotenv())
@@ -0,0 +1,105 @@
+import re
+import json
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+_TXN_ID_RE = re.compile(r'txn::\S+?::p\w+::\d+')
+
+class MockChatClient:
+    """
+    Offline stand-in for an OpenAI client. chat.completions.create answers in
+    the rag_prompt JSON shape, citing the first transaction IDs found in the
+    prompt, after an optional fixed latency.
+    """
+
+    def __init__(self, latency_s: float = 0.0, cite: int = 3):
+        self.latency_s = latency_s
+        self.cite = cite
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str = None, messages: List[Dict[str, str]] = None, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+        content = _reply(messages, self.cite)
+
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def _reply(messages: List[Dict[str, str]], cite: int) -> str:
+    prompt = "\n".join(m.get("content", "") for m in messages or [])
+    ids = list(dict.fromkeys(_TXN_ID_RE.findall(prompt)))[:cite]
+
+    return json.dumps({"answer": f"Mock answer based on {len(ids)} transactions.", "sources": ids})
+
+class _MockStream:
+    """
+    Async iterator of chat.completion.chunk-shaped objects, like the stream
+    AsyncOpenAI returns for stream=True.
+    """
+
+    def __init__(self, pieces: List[str], latency_s: float, token_delay_s: float):
+        self._pieces = iter(pieces)
+        self._latency_s = latency_s
+        self._token_delay_s = token_delay_s
+        self._first = True
+        self.closed = False
+        self.sent = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        if self.closed:
+            raise StopAsyncIteration
+
+        await asyncio.sleep(self._latency_s if self._first else self._token_delay_s)
+        self._first = False
+        piece = next(self._pieces, None)
+        if piece is None:
+            raise StopAsyncIteration
+
+        self.sent += 1
+
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    async def close(self) -> None:
+        self.closed = True
+
+class MockAsyncChatClient:
+    """
+    Async counterpart of MockChatClient. With stream=True the reply arrives in
+    chunk_chars-sized deltas: the first after latency_s, then one every
+    token_delay_s. streams keeps every stream handed out (to check closing).
+    """
+
+    def __init__(self, latency_s: float = 0.0, token_delay_s: float = 0.0, cite: int = 3, chunk_chars: int = 4):
+        self.latency_s = latency_s
+        self.token_delay_s = token_delay_s
+        self.cite = cite
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self.streams: List[_MockStream] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str = None, messages: List[Dict[str, str]] = None, stream: bool = False,
+                      **kwargs) -> Any:
+        self.calls += 1
+        content = _reply(messages, self.cite)
+
+        if not stream:
+            await asyncio.sleep(self.latency_s + self.token_delay_s * (len(content) // self.chunk_chars))
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        n = self.chunk_chars
+        s = _MockStream([content[i:i + n] for i in range(0, len(content), n)], self.latency_s, self.token_delay_s)
+        self.streams.append(s)
+
+        return s
@@ -1,6 +1,16 @@
-from pypdf import PdfReader
 from pathlib import Path
 
+def ocr_pages(path):
+    """
+    Text of each page of a PDF, in page order.
+    """
+
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+
+    return [page.extract_text() or "" for page in reader.pages]
+
 def ocr_file(path):
     """ 
     Perform OCR on the given file path.
@@ -10,9 +20,7 @@ def ocr_file(path):
     ext = p.suffix.lower()
     
     if ext == '.pdf':
-        reader = PdfReader(path)
-        pages = [page.extract_text() or "" for page in reader.pages]
-        
-        return "\n".join(pages)
+        return "\n".join(ocr_pages(path))
     else:
         return Path(path).read_text(encoding='utf-8', errors='ignore')
+
@@ -0,0 +1,122 @@
+import re
+import math
+import time
+from functools import lru_cache
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from tools.lazy_import import optional_import
+
+CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+def _text(r: Dict[str, Any]) -> str:
+    meta = r.get("meta") or {}
+
+    return r.get("doc") or " ".join(str(meta.get(k) or "") for k in ("vendor", "desc", "date", "source"))
+
+def bm25_scores(query: str, docs: List[str], k1: float = 1.2, b: float = 0.75) -> List[float]:
+    """
+    BM25 score of each doc for query, with IDF taken over docs themselves
+    (the candidate set), which is all a reranker sees.
+    """
+
+    toks = [_tokens(d) for d in docs]
+    n = len(toks)
+    if not n:
+        return []
+
+    avgdl = sum(len(t) for t in toks) / n or 1.0
+    df = Counter(w for t in toks for w in set(t))
+    q = set(_tokens(query))
+    out = []
+    for t in toks:
+        tf = Counter(t)
+        s = 0.0
+        for w in q:
+            if w in tf:
+                idf = math.log(1 + (n - df[w] + 0.5) / (df[w] + 0.5))
+                s += idf * tf[w] * (k1 + 1) / (tf[w] + k1 * (1 - b + b * len(t) / avgdl))
+        out.append(s)
+
+    return out
+
+def _rrf(*rankings: List[int], k: int = 60) -> List[float]:
+    """
+    Reciprocal-rank fusion: rankings are candidate indices, best first.
+    """
+
+    score = [0.0] * len(rankings[0])
+    for order in rankings:
+        for rank, i in enumerate(order):
+            score[i] += 1.0 / (k + rank + 1)
+
+    return score
+
+@lru_cache(maxsize=2)
+def _cross_encoder(model: str):
+    CrossEncoder = optional_import("sentence_transformers", "CrossEncoder")
+
+    return CrossEncoder(model) if CrossEncoder is not None else None
+
+def _lexical(query: str, candidates: List[Dict[str, Any]]) -> List[float]:
+    """
+    BM25 fused with the vector order (candidates arrive nearest first), so
+    rows matching the query's words rise without losing semantic neighbours
+    that share no words with it.
+    """
+
+    bm = bm25_scores(query, [_text(r) for r in candidates])
+    by_bm = sorted(range(len(candidates)), key=lambda i: -bm[i])
+
+    return _rrf(list(range(len(candidates))), by_bm)
+
+def rerank(query: str, candidates: List[Dict[str, Any]], top_n: int = 6, method: str = "auto",
+           budget_ms: Optional[float] = None, model: str = CROSS_ENCODER,
+           batch_size: int = 16) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Re-score vector candidates and keep the best top_n.
+
+    method "cross" scores (query, row) pairs with a local CPU cross-encoder
+    (sentence-transformers), "lexical" uses BM25 fused with the vector order,
+    and "auto" picks the cross-encoder when it is installed. The cross-encoder
+    scores in batches and falls back to lexical when budget_ms runs out.
+    Returns (rows with "rerank_score", report of method/fallback/ms).
+    """
+
+    t0 = time.perf_counter()
+    report: Dict[str, Any] = {"method": method, "candidates": len(candidates), "fallback": False}
+    if not candidates:
+        report["ms"] = 0.0
+        return [], report
+
+    scores = None
+    if method in ("auto", "cross"):
+        ce = _cross_encoder(model)
+        if ce is None:
+            if method == "cross":
+                report["fallback"] = "sentence_transformers not installed"
+        else:
+            pairs = [(query, _text(r)) for r in candidates]
+            got: List[float] = []
+            for st in range(0, len(pairs), batch_size):
+                got.extend(float(x) for x in ce.predict(pairs[st:st + batch_size]))
+                if budget_ms is not None and (time.perf_counter() - t0) * 1000 > budget_ms and len(got) < len(pairs):
+                    report["fallback"] = "budget"
+                    break
+            else:
+                scores = got
+                report["method"] = "cross"
+
+    if scores is None:
+        scores = _lexical(query, candidates)
+        report["method"] = "lexical"
+
+    order = sorted(range(len(candidates)), key=lambda i: -scores[i])[:top_n]
+    out = [dict(candidates[i], rerank_score=round(scores[i], 6), vector_rank=i) for i in order]
+    report["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+
+    return out, report
@@ -0,0 +1,108 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tools.txn_ids import make_txn_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    pq = None
+
+# Extracted-row fields followed by provenance columns.
+COLUMNS = ["date", "vendor", "amount", "currency", "desc", "source", "credit", "file", "page", "txn_id"]
+
+def _schema():
+    return pa.schema([
+        ("date", pa.string()),
+        ("vendor", pa.string()),
+        ("amount", pa.float64()),
+        ("currency", pa.string()),
+        ("desc", pa.string()),
+        ("source", pa.string()),
+        ("credit", pa.bool_()),
+        ("file", pa.string()),
+        ("page", pa.int32()),
+        ("txn_id", pa.string()),
+    ])
+
+def _require():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for snapshots: pip install pyarrow")
+
+def to_table(rows: List[Dict[str, Any]]):
+    """
+    Build an Arrow table from extracted rows. txn_id is the row's ID from
+    extraction (the key of its vector); rows without one are numbered
+    within their file the same way.
+    """
+
+    _require()
+    cols: Dict[str, List[Any]] = {c: [] for c in COLUMNS}
+    per_file: Dict[str, int] = {}
+
+    for r in rows:
+        fn = r.get("file")
+        i = per_file.get(fn, 0)
+        per_file[fn] = i + 1
+
+        for c in COLUMNS[:-1]:
+            cols[c].append(r.get(c))
+        cols["txn_id"].append(r.get("txn_id") or make_txn_id(fn or "nofile", r.get("page"), i))
+
+    cols["amount"] = [float(a) if a is not None else None for a in cols["amount"]]
+
+    return pa.table(cols, schema=_schema())
+
+def write_snapshot(rows: List[Dict[str, Any]], path: str) -> str:
+    """
+    Write rows as Parquet (.parquet) or uncompressed Arrow IPC (any other
+    suffix, e.g. .arrow), which load_snapshot can memory-map. Returns the path.
+    """
+
+    table = to_table(rows)
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+
+    if p.suffix.lower() == ".parquet":
+        pq.write_table(table, str(tmp))
+    else:
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as w:
+            w.write_table(table)
+
+    tmp.replace(p)
+
+    return str(p)
+
+def read_table(path: str, columns: Optional[List[str]] = None):
+    """
+    Read a snapshot as an Arrow table (memory-mapped for Arrow IPC files).
+    """
+
+    _require()
+    if Path(path).suffix.lower() == ".parquet":
+        return pq.read_table(path, columns=columns, memory_map=True)
+
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+    return table.select(columns) if columns else table
+
+def load_snapshot(path: str, s: Any = None) -> Any:
+    """
+    Load a snapshot into s.extracted / s.extracted_count (a fresh State when s
+    is None) so run_budget and build_trends can start without re-extracting.
+    """
+
+    if s is None:
+        from state.input_state import State
+        s = State()
+
+    table = read_table(path)
+    # Snapshots written before the "credit" / "txn_id" columns simply lack them.
+    rows = table.select([c for c in COLUMNS if c in table.column_names]).to_pylist()
+    s.extracted = rows
+    s.extracted_count = len(rows)
+
+    return s
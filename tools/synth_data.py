@@ -0,0 +1,223 @@
+import random
+import datetime as dt
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# (bank description, sms sender, sms vendor token, min amount, max amount)
+_VENDORS = [
+    ("TRANSFER TO LANDLORD (RENT)", "BankAlert", "LANDLORD_RENT", 1200.00, 1200.00),
+    ("SHELL GAS STATION", "ChaseBank", "SHELL GAS STATION", 25.00, 80.00),
+    ("FRESH GROCER ONLINE", "FreshGrocer", "FRESHGROCER", 40.00, 180.00),
+    ("JOE'S PIZZA", "BankAlert", "JOE'S PIZZA", 12.00, 60.00),
+    ("VERIZON WIRELESS", "Verizon", "VERIZON WIRELESS", 65.00, 65.00),
+    ("NETFLIX.COM", "BankAlert", "NETFLIX", 15.99, 15.99),
+    ("AMAZON MARKETPLACE", "BankAlert", "AMAZON MKTPLACE", 8.00, 250.00),
+    ("UBER EATS", "UberEats", "UBER EATS", 15.00, 45.00),
+    ("CITY POWER COMPANY", "PowerComp", "CITY POWER", 80.00, 140.00),
+    ("IRON PUMP GYM", "Gym", "GYM MEMBERSHIP", 45.00, 45.00),
+    ("CVS PHARMACY", "BankAlert", "CVS PHARMACY", 5.00, 60.00),
+    ("TICKETMASTER", "BankAlert", "TICKETMASTER", 40.00, 250.00),
+    ("TRADER JOES", "ChaseBank", "TRADER JOES", 20.00, 120.00),
+    ("AMC THEATRES", "BankAlert", "AMC THEATRES", 12.00, 40.00),
+    ("LYFT RIDES", "Lyft", "LYFT", 8.00, 45.00),
+    ("STARBUCKS COFFEE", "BankAlert", "STARBUCKS", 3.50, 12.00),
+    ("SPOTIFY PREMIUM", "BankAlert", "SPOTIFY", 11.99, 11.99),
+    ("TARGET SUPERSTORE", "ChaseBank", "TARGET", 20.00, 200.00),
+    ("STEAM GAMES", "BankAlert", "STEAM", 5.00, 70.00),
+    ("ATM WITHDRAWAL", "BankAlert", "ATM", 20.00, 200.00),
+    ("DELTA AIRLINES", "BankAlert", "DELTA AIRLINES", 150.00, 650.00),
+    ("DOWNTOWN BAR", "BankAlert", "DOWNTOWN BAR", 20.00, 90.00),
+]
+
+_SMS_TEMPLATES = [
+    "Debit ${amt} to {vendor}. Bal: ${bal}.",
+    "Trans of ${amt} at {vendor} approved.",
+    "Debit ${amt} at {vendor}.",
+    "Debit ${amt} for {vendor}.",
+    "You spent ${amt} at {vendor}.",
+    "Alert: Purchase ${amt} at {vendor}.",
+]
+
+_SMS_NOISE = [
+    ("888-999", "Your Uber code is {code}. Do not share."),
+    ("Amazon", "Your package has arrived."),
+    ("BankAlert", "Low Balance Alert: Balance is ${bal}."),
+]
+
+_MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+def _money(v: float) -> str:
+    return f"{v:,.2f}"
+
+def _dates(n: int, start: dt.date, days: int) -> Iterator[dt.date]:
+    """
+    n non-decreasing dates spread evenly over `days` days from start.
+    """
+
+    for i in range(n):
+        yield start + dt.timedelta(days=(i * days) // max(n, 1))
+
+def bank_lines(n: int, seed: int = 0, start: dt.date = dt.date(2024, 1, 1), days: int = 730) -> Iterator[str]:
+    """
+    Yield a bank statement with n transaction rows in the data/bank.txt layout.
+    """
+
+    rng = random.Random(seed)
+    bal = 4500.00
+    yield "ACCOUNT SUMMARY: CHECKING #99887766"
+    end = start + dt.timedelta(days=days)
+    yield f"PERIOD: {start.day:02d}-{_MONTHS[start.month-1]}-{start.year} TO {end.day:02d}-{_MONTHS[end.month-1]}-{end.year}"
+    yield ""
+    yield "DATE        | DESCRIPTION                  | DEBIT (-)  | CREDIT (+) | BALANCE"
+    yield "-" * 79
+
+    month = None
+    for d in _dates(n, start, days):
+        tok = f"{d.day:02d}-{_MONTHS[d.month-1]}-{d.year}"
+        if month is not None and d.month != month:
+            yield "-" * 79
+        month = d.month
+
+        if rng.random() < 0.05:
+            amt = round(rng.uniform(200, 3000), 2)
+            bal += amt
+            yield f"{tok} | {'EMPLOYER PAYROLL':<28} | {'':<10} | {_money(amt):<10} | {_money(bal)}"
+            continue
+
+        desc, _, _, lo, hi = rng.choice(_VENDORS)
+        amt = round(rng.uniform(lo, hi), 2)
+        bal -= amt
+        yield f"{tok} | {desc:<28} | {_money(amt):<10} | {'':<10} | {_money(bal)}"
+
+def sms_lines(n: int, seed: int = 0, start: dt.date = dt.date(2024, 1, 1), days: int = 730,
+              noise: float = 0.1) -> Iterator[str]:
+    """
+    Yield n SMS alerts in the data/sms.txt layout; about `noise` of them are non-transactional.
+    """
+
+    rng = random.Random(seed + 1)
+    bal = 4500.00
+    month = None
+
+    for d in _dates(n, start, days):
+        if d.month != month:
+            if month is not None:
+                yield ""
+            yield f"---------- {dt.date(d.year, d.month, 1).strftime('%B').upper()} {d.year} ----------"
+            month = d.month
+
+        ts = f"[{d.isoformat()} {rng.randrange(7, 23):02d}:{rng.randrange(60):02d}]"
+        if rng.random() < noise:
+            sender, tpl = rng.choice(_SMS_NOISE)
+            yield f"{ts} FROM: {sender} | " + tpl.format(code=rng.randrange(1000, 9999), bal=_money(bal))
+            continue
+
+        _, sender, vendor, lo, hi = rng.choice(_VENDORS)
+        amt = round(rng.uniform(lo, hi), 2)
+        bal = max(bal - amt, 0.0) + (3000.0 if bal < amt else 0.0)
+        body = rng.choice(_SMS_TEMPLATES).format(amt=_money(amt), vendor=vendor, bal=_money(bal))
+        yield f"{ts} FROM: {sender} | {body}"
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, lines: Iterator[str], lines_per_page: int = 60) -> int:
+    """
+    Write lines as a plain-text multi-page PDF (Helvetica, no dependencies). Returns page count.
+    """
+
+    pages: List[List[str]] = []
+    cur: List[str] = []
+    for ln in lines:
+        cur.append(ln)
+        if len(cur) >= lines_per_page:
+            pages.append(cur)
+            cur = []
+    if cur or not pages:
+        pages.append(cur)
+
+    objs: Dict[int, bytes] = {}
+    n_pages = len(pages)
+    font_id = 3
+    page_ids = [4 + 2 * i for i in range(n_pages)]
+    objs[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objs[2] = f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {n_pages} >>".encode()
+    objs[font_id] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    for pid, pg in zip(page_ids, pages):
+        body = "BT /F1 8 Tf 11 TL 30 810 Td " + " ".join(f"({_pdf_escape(ln)}) Tj T*" for ln in pg) + " ET"
+        stream = body.encode("latin-1", errors="replace")
+        objs[pid] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                     f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {pid + 1} 0 R >>").encode()
+        objs[pid + 1] = f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for oid in sorted(objs):
+        offsets[oid] = len(out)
+        out += f"{oid} 0 obj\n".encode() + objs[oid] + b"\nendobj\n"
+
+    xref = len(out)
+    size = max(objs) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for oid in range(1, size):
+        out += f"{offsets[oid]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    Path(path).write_bytes(bytes(out))
+
+    return n_pages
+
+def generate_dataset(out_dir: str, n_rows: int, seed: int = 0, sms_share: float = 0.5,
+                     pdf_rows: int = 0) -> Dict[str, str]:
+    """
+    Write a deterministic synthetic inbox with about n_rows transactions.
+
+    bank.txt and sms.txt split n_rows by sms_share; pdf_rows > 0 also writes
+    bank_statement.pdf (a bank statement) with that many rows. Files are streamed
+    line by line, so memory stays flat even at millions of rows.
+    """
+
+    p = Path(out_dir)
+    p.mkdir(parents=True, exist_ok=True)
+    n_sms = int(n_rows * sms_share)
+    n_bank = n_rows - n_sms
+    out = {}
+
+    with open(p / "bank.txt", "w", encoding="utf-8") as f:
+        for ln in bank_lines(n_bank, seed=seed):
+            f.write(ln + "\n")
+    out["bank"] = str(p / "bank.txt")
+
+    with open(p / "sms.txt", "w", encoding="utf-8") as f:
+        for ln in sms_lines(n_sms, seed=seed):
+            f.write(ln + "\n")
+    out["sms"] = str(p / "sms.txt")
+
+    if pdf_rows:
+        write_pdf(str(p / "bank_statement.pdf"), bank_lines(pdf_rows, seed=seed + 7))
+        out["pdf"] = str(p / "bank_statement.pdf")
+
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    python -m tools.synth_data OUT_DIR --rows N [--seed S] [--pdf-rows M]
+    """
+
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Generate a synthetic bank/SMS inbox.")
+    ap.add_argument("out_dir")
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--pdf-rows", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    for k, v in generate_dataset(args.out_dir, args.rows, seed=args.seed, pdf_rows=args.pdf_rows).items():
+        print(f"{k}: {v}")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import Dict, List
+
+def make_txn_id(fn: str, page, idx: int) -> str:
+    """
+    Transaction ID of the idx-th extracted row of file fn (0-based, counted
+    across its pages); the same ID keys the row's vector and snapshot row.
+    """
+
+    pg = "p{}".format(page) if page is not None else "pn"
+
+    return f"txn::{Path(fn).name}::{pg}::{idx}"
+
+def assign_txn_ids(rows: List[Dict]) -> None:
+    """
+    Set "txn_id" on rows in extraction order. Numbered before dedup drops
+    any row, so an ID always names the same row of an unchanged file.
+    """
+
+    per_file: Dict[str, int] = {}
+    for r in rows:
+        fn = r.get("file") or "nofile"
+        i = per_file.get(fn, 0)
+        per_file[fn] = i + 1
+        r["txn_id"] = make_txn_id(fn, r.get("page"), i)
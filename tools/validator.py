@@ -1,5 +1,3 @@
-import jsonschema
-
 schema = {
   'type': 'object',
   'properties': {
@@ -8,18 +6,56 @@ schema = {
     'amount': {'type': ['number', 'null']},
     'currency': {'type': ['string', 'null']},
     'desc': {'type': ['string', 'null']},
-    'source': {'type': 'string'}
+    'source': {'type': 'string'},
+    'credit': {'type': 'boolean'}
   },
   'required': ['amount', 'source']
 }
 
+# Checking the schema itself costs ~100x more than checking an instance,
+# so build the validator once instead of calling jsonschema.validate per row.
+# It is only built when a row misses the fast path, so most runs never
+# import jsonschema.
+_validator = None
+_optional_str = ('date', 'vendor', 'currency', 'desc')
+
+def _fast_valid(x) -> bool:
+    """
+    True when x is certainly valid: the common row shape, checked without jsonschema.
+    False only means "let jsonschema decide".
+    """
+
+    if type(x) is not dict or 'amount' not in x or type(x.get('source')) is not str:
+        return False
+
+    a = x['amount']
+    if a is not None and type(a) not in (int, float):
+        return False
+    if type(x.get('credit', False)) is not bool:
+        return False
+
+    for k in _optional_str:
+        v = x.get(k)
+        if v is not None and type(v) is not str:
+            return False
+
+    return True
+
+def _get_validator():
+    global _validator
+    if _validator is None:
+        import jsonschema
+
+        _validator = jsonschema.validators.validator_for(schema)(schema)
+
+    return _validator
+
 def validate(x):
     """ 
     Validate x against the predefined schema.
     """
     
     try:
-        jsonschema.validate(instance=x, schema=schema)
-        return True
+        return _fast_valid(x) or _get_validator().is_valid(x)
     except Exception:
         return False
@@ -0,0 +1,27 @@
+import re
+import calendar
+from typing import Any, Dict, List, Optional, Tuple
+
+NON_ALNUM_RE = re.compile(r'[^A-Z0-9]+')
+STOPWORDS = {"TRANSFER", "TO", "AT", "FOR", "FROM", "THE", "PAYMENT", "DEBIT", "CREDIT", "POS", "COM", "INC", "LLC", "ONLINE"}
+# Reference-style suffixes ("RENT_SEPT", "INVOICE 2025") name the period, not the payee.
+PERIOD_WORDS = {m.upper() for m in calendar.month_name[1:] + calendar.month_abbr[1:]} | {"SEPT"}
+
+def vendor_tokens(vendor: Optional[str]) -> List[str]:
+    """
+    Upper-case vendor tokens without punctuation, filler words, numbers or month names.
+    """
+
+    return [x for x in NON_ALNUM_RE.split((vendor or "").upper())
+            if x and x not in STOPWORDS and x not in PERIOD_WORDS and not x.isdigit()]
+
+def normalize_vendor(t: Dict[str, Any]) -> Tuple[frozenset, str]:
+    """
+    (token set, compact string) of a row's vendor (its desc when there is
+    none), for similarity scoring and duplicate keys; "RENT_SEPT" reads as
+    "RENT" and "Uber Eats" and "UBER EATS" compact to the same string.
+    """
+
+    toks = vendor_tokens(t.get("vendor") or t.get("desc"))
+
+    return frozenset(toks), "".join(toks)